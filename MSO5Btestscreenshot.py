@@ -1,12 +1,12 @@
 # For MSO58 Series Scope
 # Connect to scope to set up, trigger, and save image.
 
-import time
 import os
 import pyvisa
 rm = pyvisa.ResourceManager('@py')
 from tm_devices import DeviceManager
 from tm_devices.drivers import MSO5B  # CHANGE FOR YOUR PARTICULAR SCOPE USING Intellisense!
+from scope_files import save_screenshot, transfer_report
 
 
 # List available resources
@@ -29,17 +29,8 @@ with DeviceManager(verbose=True) as device_manager:
     # Create image filename 
     imagefilename = os.path.join(savePath , 'myimage.png')
     print('imagefile = ', imagefilename)
-    # Save image to instrument's local disk, flash drive, or TekDrive
-    scope.write('SAVE:IMAGe \"C:/Temp.png\"')
-    # Wait for instrument to finish writing image to disk
-    time.sleep(5)
-
-    scope.write('FILESystem:READfile \"C:/Temp.png\"')
-    
-    image_data = scope.read_raw()
- 
-    # Save image data to local disk
-    file = open(imagefilename, "wb")
-    file.write(image_data)
-    file.close()
+    # Save image to instrument's local disk, flash drive, or TekDrive, waiting on *OPC? instead of a fixed delay,
+    # then stream it straight into the local file and delete the scope copy
+    _, transfer = save_screenshot(scope, imagefilename, scope_path="C:/Temp.png")
+    print('image transfer: ', transfer_report(transfer))
 
@@ -10,14 +10,24 @@ Equipment- Tektronix scopes, e.g., DPO4k and MSO58 series
 
 Software- No NI-VISA, licensing, or accounts required. Uses pyvisa for generic scope SCPI communications.
 
-User inputs IP address, sample time in seconds with default of 5 seconds, and number of channels
-to monitor (1-8).
+User inputs IP address, sample time in seconds (0.05-300, fractions allowed) with default of 10 seconds,
+and number of channels to monitor (1-8).
+
+Samples are taken on a fixed grid (start + n * period) by a monotonic-clock deadline scheduler, so processing
+time never accumulates as drift.  Each row records the scheduled time, the estimated instrument sample time
+and how many grid slots were skipped by an overrun (sample later than a whole period).  All channels are read
+in one ';' joined query to reach short periods.
 
 User has option to set up scope or allow continous channels to be configured for RMS measurements.
 
 Currently, the maximum voltage is set to 50Vp or about 300W/ch.
 
 Saves data to csv file on desktop, closes file, and imports csv into MS Excel file and plots a chart.
+With BINARY_LOG the samples go to a compact binary log (binary_log.py, fixed-width records appended to an open
+file) instead, and the csv file is made from it when the run ends.
+
+The sampling thread only waits for the grid and reads the scope; writing the samples and console output run as
+separate stages on bounded queues (acquisition_pipeline.py), so a slow disk or console never makes a sample late.
 
 Author: C. Wong
 v2.0
@@ -32,8 +42,9 @@ import datetime
 import os
 import pyvisa
 import threading
-import csv
 import keyboard
+import math
+import itertools
 
 from openpyxl import Workbook
 from openpyxl.drawing.text import Paragraph, CharacterProperties, Font
@@ -43,9 +54,18 @@ from openpyxl.drawing.line import LineProperties
 from openpyxl.chart.shapes import GraphicalProperties
 from openpyxl.drawing.colors import ColorChoice
 
+from scope_session import TimedSession
+from deadline_scheduler import DeadlineScheduler
+from binary_log import SampleLogWriter, to_csv
+from log_reader import read_log
+from acquisition_pipeline import AcquisitionPipeline, Stage
+
 DEFAULT_IP_ADDRESS = '192.168.1.53'  #default IP, 192.168.1.53, 10.101.100.151
 MIN_ACQUISITION_INTERVAL = 10   # seconds default sampling rate
+MIN_SAMPLE_PERIOD = 0.05        # seconds, shortest period offered (instrument/link permitting)
+MAX_SAMPLE_PERIOD = 300         # seconds
 MAX_VRMS = 50
+BINARY_LOG = False              # True: log samples to a .bin file, converted to the .txt csv at the end of the run
 
 # Find user desktop one level down from home (~/* /Desktop) and set up as optional save path
 from glob import glob
@@ -60,20 +80,6 @@ else:
 stop_program_event = threading.Event()
 
 # --- FUNCTION DEFINITION ---
-def timer_thread_func(event_to_set: threading.Event, interval: float, stop_event: threading.Event):
-    """
-    Separate thread that signals an event after the specified interval.
-    """
-    while not stop_event.is_set():
-        # Wait for the interval, but allow to be interrupted by stop_event
-        # If stop_event is set during this wait, it will return True immediately.
-        if stop_event.wait(interval):
-            break # Exit the loop if stop_event was set
-        # If the wait completed (meaning interval passed and stop_event wasn't set),
-        # then set the event for the main thread.
-        if not stop_event.is_set(): 
-            event_to_set.set()
-
 def on_q_press():
     """
     Callback function when 'q' is pressed.
@@ -157,15 +163,15 @@ def sample_period(default_sample_time: str = MIN_ACQUISITION_INTERVAL):
     """
     while True:
         try:
-            sample_period = input(f"Enter time between samples in seconds (1-300) or 'd' for default ({default_sample_time}): ").strip()
+            sample_period = input(f"Enter time between samples in seconds ({MIN_SAMPLE_PERIOD}-{MAX_SAMPLE_PERIOD}) or 'd' for default ({default_sample_time}): ").strip()
             if sample_period.lower() == 'd':
                 return default_sample_time
             else:
-                period = int(sample_period)
-                if 1 <= period <= 300:
+                period = float(sample_period)
+                if MIN_SAMPLE_PERIOD <= period <= MAX_SAMPLE_PERIOD:
                     return period
                 else:
-                    print("Invalid input. Please enter a number between 1 and 300.")
+                    print(f"Invalid input. Please enter a number between {MIN_SAMPLE_PERIOD} and {MAX_SAMPLE_PERIOD}.")
         except ValueError:
             print("Invalid input. Please enter a number.")
 
@@ -201,16 +207,19 @@ def make_datafile(num_channels, timestamp, desktoppath: str = DESKTOP):
             else:
                 user_path = user_path_input
 
-            data_log_file_name = timestamp.strftime("%Y%m%d_%H%M%S.txt")
+            data_log_file_name = timestamp.strftime("%Y%m%d_%H%M%S") + (".bin" if BINARY_LOG else ".txt")
             full_data_path = os.path.join(user_path, data_log_file_name)
 
             # Check if data file already exists
             if not os.path.exists(full_data_path):
                 print(f"Creating new data file: {full_data_path}")
+                if BINARY_LOG:
+                    return user_path, data_log_file_name    # SampleLogWriter writes the header
                 with open(full_data_path, "w") as datafile:
                     header = "Count, Time"
                     for i in range(1, num_channels + 1):
                         header += f", Vrms_CH{i}"
+                    header += ", Sample_Time, Skipped"    # Time is the scheduled grid time
                     datafile.write(header + "\n")
             else:
                 print(f"File exist. We will be appending to existing file: {full_data_path}")
@@ -219,9 +228,11 @@ def make_datafile(num_channels, timestamp, desktoppath: str = DESKTOP):
         except ValueError:
             print("Invalid path. Please enter a valid path.")
 
-def add_sample_to_file(save_directory, data_file_name, counter, time_in_seconds, v_rms_values):
+def add_sample_to_file(save_directory, data_file_name, counter, time_in_seconds, v_rms_values, sample_time_in_seconds, skipped):
     """
     Appends sample data for all channels to the specified file.
+    time_in_seconds is the scheduled (grid) time, sample_time_in_seconds the estimated instrument sample time,
+    skipped the number of grid slots dropped by an overrun before this sample.
     """
     try:
         datafile_and_path = os.path.join(save_directory, data_file_name)
@@ -231,10 +242,31 @@ def add_sample_to_file(save_directory, data_file_name, counter, time_in_seconds,
             # Add each Vrms value
             for v_rms in v_rms_values:
                 line += f", {v_rms:6.3f}"
+            line += f", {sample_time_in_seconds:10.4f}, {skipped}"
             f.write(line + "\n")
     except IOError as e:
         print(f"Error appending data to file '{datafile_and_path}': {e}")
 
+def read_all_channels(instrument, num_channels):
+    """
+    Reads the RMS value of every channel in one batch (one ';' joined query).
+    Returns a list of bounded Vrms values, NaN for a channel that could not be read.
+    """
+    commands = [f":MEASUrement:MEAS{i}:VALue?" for i in range(1, num_channels + 1)]
+    v_rms_readings = []
+    for i, response in enumerate(instrument.query_many(commands, compound=True), 1):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            v_rms_readings.append(apply_vrms_bounds(float(response)))
+        except pyvisa.errors.VisaIOError as e:
+            print(f"Error reading RMS for Channel {i}: {e}. Skipping this channel for this sample.")
+            v_rms_readings.append(float('NAN')) # Append NaN if reading fails
+        except ValueError:
+            print(f"Could not convert RMS reading for Channel {i} to float. Skipping.")
+            v_rms_readings.append(float('NAN'))
+    return v_rms_readings
+
 def apply_vrms_bounds(v_rms):
     """
     Applies upper and lower bounds to the Vrms reading.
@@ -243,7 +275,7 @@ def apply_vrms_bounds(v_rms):
 
 def write_to_excel_with_chart(datafile_name: str, save_directory: str, num_channels: int):
     """
-    Reads data from the specified CSV file, writes it to an Excel worksheet,
+    Reads data from the specified CSV file (log_reader.read_log), writes it to an Excel worksheet,
     and creates a scatter chart.
 
     Args:
@@ -262,44 +294,15 @@ def write_to_excel_with_chart(datafile_name: str, save_directory: str, num_chann
     ws.title = "Power Monitoring Data"
 
     try:
-        with open(full_csv_path, 'r') as f:
-            reader = csv.reader(f)
-            # Write header row
-            header = next(reader)
-            ws.append(header)
-
-            # Write data rows and convert to numbers, then format cells
-            row_count = 0 # To track actual row in Excel, starting from 1 for headers
-            for row in reader:
-                row_count += 1 # Increment for data rows
-                processed_row = []
-                for i, value in enumerate(row):
-                    if i == 0:  # 'Count' column
-                        try:
-                            num_value = int(value)
-                            processed_row.append(num_value)
-                            # Set number format for 'Count' column (optional, usually general is fine)
-                            ws.cell(row=row_count, column=i+1).number_format = 'General'
-                        except ValueError:
-                            processed_row.append(value)
-                    elif i == 1:  # 'Time' column (X-axis data)
-                        try:
-                            num_value = float(value)
-                            processed_row.append(num_value)
-                            # Explicitly set number format for Time column
-                            ws.cell(row=row_count, column=i+1).number_format = '0.' # Three decimal places
-                        except ValueError:
-                            processed_row.append(value)
-                    else:  # Vrms channels (Y-axis data)
-                        try:
-                            num_value = float(value)
-                            processed_row.append(num_value)
-                            # Explicitly set number format for Vrms columns
-                            ws.cell(row=row_count, column=i+1).number_format = '0.'# Three decimal places
-                        except ValueError:
-                            processed_row.append(None) # Append None for invalid Vrms values
-
-                ws.append(processed_row) # Append the processed row after converting values
+        # Typed columns in one pass (log_reader.py) instead of parsing every cell; NaN readings -> empty cells
+        log = read_log(full_csv_path)
+        ws.append(log.names)
+        for row in log.rows():
+            ws.append(row)
+        # 'Count' column general, Time and Vrms columns (and the rest) three decimal places
+        for c_idx in range(2, len(log.names) + 1):
+            for (cell,) in ws.iter_rows(min_row=2, min_col=c_idx, max_col=c_idx):
+                cell.number_format = '0.'
         print("Data successfully written to Excel worksheet and converted to numbers.")
 
 
@@ -354,15 +357,6 @@ def main():
     rm = pyvisa.ResourceManager('@py')
     print("Resources found " , rm.list_resources())
 
-    # Create Event object for sampling time and start timer
-    acquisition_allowed_event = threading.Event()
-    timer_thread = threading.Thread(
-        target=timer_thread_func,
-        args=(acquisition_allowed_event, sample_time, stop_program_event),
-        daemon=True # Daemon threads exit automatically when the main program exits
-    )
-    timer_thread.start()
-
     # Register the 'q' hotkey
     keyboard.add_hotkey('q', on_q_press)
     keyboard.add_hotkey('esc', on_esc_press)
@@ -372,7 +366,7 @@ def main():
     datafile_name = None # Initialize datafile_name to None
     try:
         # Call the new function to connect to the instrument
-        connected_instrument = connect_to_instrument(rm, DEFAULT_IP_ADDRESS)
+        connected_instrument = TimedSession(connect_to_instrument(rm, DEFAULT_IP_ADDRESS))   # timed batch reads
 
         # Get the number of channels from the user
         num_channels_to_monitor = get_num_channels()
@@ -392,58 +386,69 @@ def main():
         full_data_path = os.path.join(user_path, datafile_name)
         print("Created file for data as ", datafile_name)
         
-        count = 1
         print("Press 'q' or 'Crtl-C' to stop the program at any time.")
-        # Main loop
-        while not stop_program_event.is_set():
-            # Wait for the minimum acquisition interval to pass before arming
-            acquisition_allowed_event.wait(timeout=0.1) # This will block until the timer thread sets the event
-            if stop_program_event.is_set(): # Check immediately after waiting
-                break
-            if not acquisition_allowed_event.is_set():
-                # Continue waiting for the interval to pass or q to be pressed.
-                continue
-            acquisition_allowed_event.clear() # Reset the event for the next cycle
+        # Sample grid: time 0 is now, first sample one period later
+        scheduler = DeadlineScheduler(sample_time, stop_program_event, first_index=1)
+        if BINARY_LOG:
+            sample_log = SampleLogWriter(full_data_path, num_channels_to_monitor, sample_time,
+                                         scheduler.to_datetime(scheduler.start))
+        sample_counter = itertools.count(1)
+
+        # Sampling thread: grid wait and instrument read only
+        def acquire():
+            # Wait for the next grid deadline (drift free; overruns skip slots instead of bursting)
+            slot = scheduler.wait_next()
+            if slot is None:
+                return None
+            index, scheduled, _, skipped = slot
 
             # OK to sample
-            current_date_and_time = datetime.datetime.now()
-            dt = current_date_and_time - starting_date_and_time
-            dt_in_seconds = dt.total_seconds()
-
-            v_rms_readings = []
-            for i in range(1, num_channels_to_monitor + 1):
-                try:
-                    v_rms = float(connected_instrument.query(f"MEASUrement:MEAS{i}:VALue?"))
-                    # Apply bounds using the new routine call
-                    v_rms = apply_vrms_bounds(v_rms)
-                    v_rms_readings.append(v_rms)
-                except pyvisa.errors.VisaIOError as e:
-                    print(f"Error reading RMS for Channel {i}: {e}. Skipping this channel for this sample.")
-                    v_rms_readings.append(float('NAN')) # Append NaN if reading fails
-                except ValueError:
-                    print(f"Could not convert RMS reading for Channel {i} to float. Skipping.")
-                    v_rms_readings.append(float('NAN'))
-
-            add_sample_to_file(user_path, datafile_name, count, dt_in_seconds, v_rms_readings)
-            
-            # Print the current sample data
-            print_output = f"Sample {count:4d},   Time: {dt_in_seconds:9.3f} sec"
-            for i, v_rms in enumerate(v_rms_readings):
-                print_output += f", CH{i+1}: {v_rms:6.3f}"
-            print(print_output)
-            
-            # Increment the counter
-            count += 1
-
-            # Check if 'q' was pressed taking samples 
-            if stop_program_event.is_set():
-                # If 'q' was pressed, stop the acquisition on the scope
-                connected_instrument.write("CLEAR")
-                break
+            v_rms_readings = read_all_channels(connected_instrument, num_channels_to_monitor)
+            sample_in_seconds = connected_instrument.sample_instant() - scheduler.start
+            return next(sample_counter), scheduler.offset(index), v_rms_readings, sample_in_seconds, skipped
+
+        # Log stage: every sample, in order
+        def log_sample(sample):
+            count, dt_in_seconds, v_rms_readings, sample_in_seconds, skipped = sample
+            if BINARY_LOG:
+                sample_log.append(count, dt_in_seconds, v_rms_readings, sample_in_seconds, skipped)
+            else:
+                add_sample_to_file(user_path, datafile_name, count, dt_in_seconds, v_rms_readings, sample_in_seconds, skipped)
+
+        # Display stage: may drop samples when the console falls behind
+        def show_sample(sample):
+            count, dt_in_seconds, v_rms_readings, _, skipped = sample
+            if skipped:
+                print(f"Overrun: sample {count} is late, {skipped} sample slot(s) skipped.")
+            # Print the current sample data (at most about 10 lines per second for short periods)
+            if sample_time >= 0.1 or count % math.ceil(0.1 / sample_time) == 0:
+                print_output = f"Sample {count:4d},   Time: {dt_in_seconds:9.3f} sec"
+                for i, v_rms in enumerate(v_rms_readings):
+                    print_output += f", CH{i+1}: {v_rms:6.3f}"
+                print(print_output)
+
+        log_stage = Stage("log", log_sample)
+        display_stage = Stage("display", show_sample, maxsize=64, lossy=True)
+        pipeline = AcquisitionPipeline(acquire, [log_stage, display_stage], stop_program_event)
+        pipeline.connect(log_stage, display_stage)
+        pipeline.start()
+        pipeline.wait()
+
+        # If 'q' was pressed, stop the acquisition on the scope
+        if stop_program_event.is_set():
+            connected_instrument.write("CLEAR")
 
     except Exception as e:
         print(f"An error occurred during program execution: {e}")
     finally:
+        if 'pipeline' in locals():
+            pipeline.close()    # samples still queued are written
+            print(pipeline.report())
+        if 'scheduler' in locals():
+            scheduler.close()
+            print(scheduler.report())
+        if 'sample_log' in locals():
+            sample_log.close()
         # Always close the instrument connection and resource manager
         if 'connected_instrument' in locals() and connected_instrument:
             print("Closing instrument connection.")
@@ -454,6 +459,9 @@ def main():
         
         # After data acquisition stops, write to Excel if a datafile was created
         if datafile_name and num_channels_to_monitor > 0:
+            if BINARY_LOG and os.path.exists(full_data_path):
+                datafile_name = os.path.basename(to_csv(full_data_path))
+                print(f"Binary log converted to {datafile_name}")
             write_to_excel_with_chart(datafile_name, user_path, num_channels_to_monitor)
 
 if __name__ == "__main__":
@@ -14,13 +14,53 @@ thresholds for ON/OFF for both AC Line and Amp Output,
 Minimum channels to monitor is one, i.e., the line voltage; and if load checks are required, at least one amp 
 channel (CH2).  User is given the option for this program to set up the scope on contiguous channels.
 
+--socket-port <port> connects over a raw socket (TCPIP::<ip>::<port>::SOCKET, e.g. 4000 on Tek) instead of VXI-11;
+the amplifier channel reads are then pipelined (all queries written back to back, replies read in order).
+
+Optional --mode trigger (Tektronix) arms the scope's own CH1 timeout/edge trigger on line loss and restoration
+instead of polling CH1 Vrms, so idle bus traffic is near zero and dropouts down to one line cycle are captured.
+
+The last --ring-hours (default 2) of raw readings are kept in a constant-memory ring buffer (ring_buffer.py) for
+event context; --ring-file keeps it in a memory-mapped file next to the data file so it survives a crash.
+Each transition and drop-out gets a context snippet (--context-pre/--context-post seconds of readings, plus the CH1
+waveform on Tek) written in the background and indexed by Event_Count in <data file>_context.csv (poll mode only:
+in --mode trigger the scope takes no readings between triggers, so the ring only has the restored line voltages).
+--waveform-store keeps those waveforms as raw codes in one compressed, randomly accessible <data file>_waveforms.wfz
+(waveform_codec.py) instead of a CSV per event.
+
 Data is saved to CSV file. At the end of test, an Excel file is created from the CSV file.
+<data file>.idx is a per-minute time index of the CSV (log_index.py) for quick time-range lookups in long runs.
+--rotate-mb and/or --rotate hour|day|week split the CSV into segments (log_rotation.py); every closed segment gets
+<segment>_summary.csv (event counts, ON/OFF totals, line min/max, drop-outs) and its Excel file is made in the
+background while monitoring continues, so only the last segment is left to export at the end.
+--dashboard-port <port> serves a live page at http://127.0.0.1:<port> (dashboard.py): latest readings, state, event
+count, loop rate and RTT, with a trace of recent line voltage from the ring.  The loop only publishes a snapshot.
+In poll mode an acquisition thread only reads the scope; state evaluation, logging and display run as separate
+stages on bounded queues (acquisition_pipeline.py), and their queue/back-pressure/drop counters are reported at the
+end and on the dashboard.  The acquisition thread gets the ON/OFF state (for the drop-out load checks) as published
+by the evaluate stage, never from the state machine.  The analysis and cycle captures stop the scope and fetch under
+the shared instrument lock, which blocks acquisition meanwhile; the seconds each holder kept the lock and the
+acquisition thread waited for it are reported with the stage counters.
+--analysis-interval <sec> (Tek, poll mode) captures the amplifier channel waveforms while ON at most that often and
+computes spectrum, THD+N and clipping flags in a process pool (waveform_analysis.py); one row per channel goes to
+<data file>_analysis.csv, keyed by Event_Count, and clipping is reported on the console.
+--power "2:3,4@8" declares amplifier channel pairs as voltage:current or voltage@load ohms (power_meter.py); every ON
+duration row then gets real power, apparent power, power factor and energy per pair, from the RMS readings already
+taken (V/I pairs take their power factor from the --analysis-interval waveform captures).
+--cycle-interval <sec> (Tek, poll mode) captures CH1 while ON at most that often and computes the RMS of every half
+cycle and cycle (cycle_rms.py), which the scope's record-long RMS smooths away; sags, swells and half-cycle drop-outs
+(--sag-limit / --swell-limit of the settled line voltage) go to <data file>_cycles.csv with their cycle timestamps
+and the +/- uncertainty of dating the record (one record length plus the stop round trip).
+Waveform transfers only carry what each analysis needs (waveform_fetch.py): 3 line cycles at 2 bytes per point for
+THD+N/power, the CH1 record at 1 byte for cycle RMS; bytes sent against whole records and the time saved are reported.
 
 Author: C. Wong
 v0.6
 Last Modified: 20260416
 """
 
+import multiprocessing
+
 def main():
 
     # Standard library
@@ -28,9 +68,8 @@ def main():
     import datetime
     import os
     import threading
-    import csv
     import argparse
-    from collections import deque  #only needed for running average on AC Line
+    import math
     from glob import glob
 
     # Third-party libraries
@@ -39,12 +78,58 @@ def main():
     from openpyxl import Workbook
     from openpyxl.styles import Font
 
+    # Local modules
+    from scope_session import TimedSession
+    from log_reader import read_log
+    from log_rotation import RotatingLog, ROTATE_PERIODS
+    from concurrent.futures import ThreadPoolExecutor
+    from onoff_state import OnOffStateMachine, LoadCheckGate, csv_header
+    from ring_buffer import ReadingRing, capacity_for
+    from event_context import ContextDumper, CONTEXT_KINDS, waveform_volts
+    from dashboard import LiveSnapshot, DashboardServer
+    from acquisition_pipeline import AcquisitionPipeline, InstrumentLock, Stage
+    from waveform_analysis import WaveformAnalyzer, DEFAULT_BANDWIDTH
+    from power_meter import PowerMeter, parse_power_pairs
+    from cycle_rms import CycleMonitor, SAG_LIMIT, SWELL_LIMIT
+    from waveform_fetch import WaveformRequest, FetchStats, FULL_RECORD, fetch_waveform
+    from waveform_codec import WaveformWriter
+
     # Print the header at runtime.
     print(__doc__)
 
     # Process IP addr argument
     parser = argparse.ArgumentParser(description="Connect to scope for power monitoring")
     parser.add_argument('--ip', default="10.100.53.15", type=str, help='The IP address to connect to')
+    parser.add_argument('--socket-port', default=0, type=int,
+                        help='Raw socket port (e.g. 4000 on Tek) to connect with TCPIP::<ip>::<port>::SOCKET, 0 = VXI-11 INSTR')
+    parser.add_argument('--mode', default="poll", choices=["poll", "trigger"],
+                        help="ON/OFF detection: 'poll' CH1 Vrms (any scope) or 'trigger' on the scope's own CH1 trigger (Tek)")
+    parser.add_argument('--ring-hours', default=2.0, type=float,
+                        help='Hours of raw readings kept in memory for event context (0 = off)')
+    parser.add_argument('--ring-file', action='store_true',
+                        help='Keep the raw readings ring in a memory-mapped file next to the data file (survives a crash)')
+    parser.add_argument('--context-pre', default=5.0, type=float,
+                        help='Seconds of readings before each transition/drop-out saved as event context (needs the ring)')
+    parser.add_argument('--context-post', default=5.0, type=float,
+                        help='Seconds of readings after each transition/drop-out saved as event context (0 and 0 = off)')
+    parser.add_argument('--rotate-mb', default=0.0, type=float,
+                        help='Start a new CSV segment when the current one reaches this size in MB (0 = off)')
+    parser.add_argument('--rotate', default="none", choices=("none",) + ROTATE_PERIODS,
+                        help='Also start a new CSV segment every calendar hour, day or week')
+    parser.add_argument('--waveform-store', action='store_true',
+                        help='Keep event waveforms compressed in <data file>_waveforms.wfz instead of one CSV each')
+    parser.add_argument('--dashboard-port', default=0, type=int,
+                        help='Serve a live dashboard on this local port, e.g. 8050 (0 = off)')
+    parser.add_argument('--power', default="", type=str,
+                        help='Amplifier power pairs, e.g. "2:3,4@8" = CH2 volts with CH3 amps, CH4 volts into 8 ohms')
+    parser.add_argument('--cycle-interval', default=0.0, type=float,
+                        help='Seconds between CH1 captures for per-cycle RMS sag/swell detection while ON (Tek, poll mode; 0 = off)')
+    parser.add_argument('--sag-limit', default=SAG_LIMIT, type=float,
+                        help='Half-cycle RMS below this fraction of the line voltage is a sag')
+    parser.add_argument('--swell-limit', default=SWELL_LIMIT, type=float,
+                        help='Half-cycle RMS above this fraction of the line voltage is a swell')
+    parser.add_argument('--analysis-interval', default=0.0, type=float,
+                        help='Seconds between amplifier waveform THD+N/clipping analyses while ON (Tek, poll mode; 0 = off)')
     args = parser.parse_args()
     target_ip = args.ip
 
@@ -52,15 +137,18 @@ def main():
     DEFAULT_IP_ADDRESS = target_ip 
     MAX_LINE_VOLTAGE_VRMS = 350.0       # volts rms limit for AC Line (CH1)
     MAX_VRMS = 50.0                     # volts (at 8 ohms that's ~312 W foraudio CHs (CH2+)
-    LINE_VOLTAGE_WINDOW_SIZE = 3        # Window size for the running average
-    SETTLING_TIME = 3.0                 # seconds for better AC line measurements
     LOAD_CHECK_INTERVAL = 2             # seconds between checking amplifier channels
-    LAST_LOAD_CHECK_TIME = 0            # timestamp of the last amplifier load check
+    LINE_FREQUENCY = 60                 # Hz, AC line (also works for 50 Hz with the timeout below)
+    LINE_LOSS_TIMEOUT = 0.025           # seconds CH1 must stay below the OFF peak level to trigger line loss (>1 cycle at 50 Hz)
+    # Waveform transfers sized to each analysis (waveform_fetch.py); event context waveforms stay whole 2 byte records
+    ANALYSIS_REQUEST = WaveformRequest(cycles=3, samples_per_cycle=2.5 * DEFAULT_BANDWIDTH / LINE_FREQUENCY, bits=16,
+                                       line_frequency=LINE_FREQUENCY)   # THD+N/power: 3 line cycles, band below Nyquist
+    CYCLE_REQUEST = WaveformRequest(samples_per_cycle=20, bits=8,
+                                    line_frequency=LINE_FREQUENCY)      # cycle RMS: whole record (coverage), 8 bit
 
     # Global control
     stop_program_event = threading.Event()
     last_quit_attempt = 0               # time of last quit attempt to prevent accidental key presses
-    line_voltage_readings_queue = deque(maxlen=LINE_VOLTAGE_WINDOW_SIZE)  #running average on line voltage readings
 
     # Find user desktop one level down from home [~/* /Desktop] as optional path to account for OneDrive
     DESKTOP_PATH = glob(os.path.expanduser("~\\*\\Desktop"))
@@ -68,10 +156,16 @@ def main():
 
     class Scope:
         """Base class for Oscilloscope communication."""
+        compound_queries = False    # accepts ';' joined queries in one message (pipelined reads)
+
         def __init__(self, instr, brand):
-            self.instr = instr
+            self.instr = TimedSession(instr)   # times every query for RTT and sample timestamps
+            self.load_gate = LoadCheckGate()   # when to read the amplifier channels
             self.brand = brand
             self.timeout = 10000
+            self.fetch_stats = FetchStats()    # waveform bytes sent vs whole records
+            self.post_trigger_time = None      # seconds from trigger to end of record (trigger mode)
+            self.armed_event = None            # 'loss' or 'restore' trigger armed (trigger mode)
 
         def setup(self, num_channels, max_channels):
             pass
@@ -85,8 +179,38 @@ def main():
         def set_timebase(self, ms_per_div):
             pass
 
+        supports_line_trigger = False   # can arm a CH1 line loss/restore trigger (trigger mode)
+
+        def arm_line_trigger(self, event, level_vrms):
+            pass
+
+        def wait_line_trigger(self, stop_event, on_poll=None):
+            return None
+
+        def restore_autorun(self):
+            pass
+
+        def fetch_waveform(self, channel, request=FULL_RECORD):
+            """Raw waveform of (the part request needs of) the current record, or None if not supported."""
+            return None
+
+        def _vrms_command(self, channel):
+            return ""
+
         def _query_vrms(self, channel):
-            return "0.0"
+            command = self._vrms_command(channel)
+            if not command:
+                return "0.0"       # no RMS measurement for this brand
+            return self.instr.query(command)
+
+        def _query_vrms_many(self, channels):
+            """
+            Pipelined RMS query of several channels. Returns one raw response or exception per channel.
+            """
+            if not self._vrms_command(1):
+                return ["0.0"] * len(channels)
+            commands = [self._vrms_command(ch) for ch in channels]
+            return self.instr.query_many(commands, compound=self.compound_queries)
         
         def wait_for_completion(self, timeout=5000):
             """
@@ -113,6 +237,9 @@ def main():
         def stop(self): 
             pass
 
+        def run(self):
+            pass
+
         def close(self):
             """Cleans up the instrument state and closes the VISA connection."""
             try:
@@ -165,39 +292,36 @@ def main():
                     print("Invalid input. Skipping trigger.")
 
         def get_measurements(self, num_channels, current_state, check_interval, force_load=False, low_limit=None, high_limit=None):
-            global LAST_LOAD_CHECK_TIME
             readings_all = []
             try:
                 # 1. Query AC Line first (fast loop)
                 raw = self._query_vrms(1)
-                measurement_time = datetime.datetime.now()
+                # Timestamp at the estimated instrument-side instant, not when the reply arrived
+                measurement_time = self.instr.sample_time()
                 v_line = apply_line_voltage_bounds(parse_visa_numeric(raw))
                 readings_all.append(v_line)
-                line_voltage_readings_queue.append(v_line)
-                v_line_avg = sum(line_voltage_readings_queue)/len(line_voltage_readings_queue)
-
-                # 2. Determine if a transition is "pending" (e.g., Line dropped while we were ON)
-                is_transitioning = False
-                if current_state == "ON" and low_limit is not None and v_line <= low_limit:
-                    is_transitioning = True
-                elif current_state == "OFF" and high_limit is not None and v_line >= high_limit:
-                    is_transitioning = True
-
-                # 3. Get remaining measurements if the line is stable
-                if not is_transitioning and (current_state == "UNKNOWN" or force_load or (time.time() - LAST_LOAD_CHECK_TIME > check_interval)):
-                    LAST_LOAD_CHECK_TIME = time.time()
-                    for i in range(2, num_channels + 1):
-                        r = self._query_vrms(i)
-                        readings_all.append(max(min(parse_visa_numeric(r), MAX_VRMS), 0)) 
+
+                # 2. Get remaining measurements if the line is stable (no transition pending) and a check is due
+                if self.load_gate.due(time.time(), current_state, v_line, check_interval, low_limit, high_limit, force_load):
+                    amp_channels = range(2, num_channels + 1)
+                    for i, r in zip(amp_channels, self._query_vrms_many(amp_channels)):
+                        if isinstance(r, Exception):
+                            # Only this channel failed; None skips the drop-out check this cycle
+                            print(f"Error reading CH{i}: {r}")
+                            readings_all.append(None)
+                        else:
+                            readings_all.append(apply_amp_output_bounds(parse_visa_numeric(r)))
                 else:
                     # Skip readings 
                     readings_all.extend([None] * (num_channels - 1))
 
-                return measurement_time, readings_all, v_line_avg 
+                return measurement_time, readings_all
             except pyvisa.errors.VisaIOError:
-                return None, None, None
+                return None, None
             
     class TekScope(Scope):
+        compound_queries = True
+
         def setup(self, num_channels, max_channels):
             for i in range(1, num_channels + 1):
                 self.instr.write(f"SELect:CH{i} ON")
@@ -225,12 +349,94 @@ def main():
         def set_timebase(self, ms_per_div):
             self.instr.write(f"HORizontal:SCAle {ms_per_div}")
 
-        def _query_vrms(self, channel):
-            return self.instr.query(f"MEASUrement:MEAS{channel}:VALue?")
+        def _vrms_command(self, channel):
+            # Leading ':' resets the header path so commands can be ';' joined
+            return f":MEASUrement:MEAS{channel}:VALue?"
+
+        supports_line_trigger = True
+
+        def arm_line_trigger(self, event, level_vrms):
+            """
+            Arms a single sequence on CH1 that fires on AC line 'loss' or 'restore'.
+            Loss: timeout trigger, CH1 stays below the OFF peak level longer than LINE_LOSS_TIMEOUT.
+            Restore: rising edge through the ON peak level.
+            Commands are sent as one ';' joined message to keep re-arm dead time to one write.
+            (MSO5/6 syntax. DPO4k uses TRIGger:A:TYPe PULSe with TRIGger:A:PULse:CLAss TIMEOut.)
+            """
+            level = level_vrms * math.sqrt(2)   # sine peak for the rms threshold
+            if event == "loss":
+                trigger = [f"TRIGger:A:TYPe TIMEOut",
+                           f"TRIGger:A:TIMEOut:SOUrce CH1",
+                           f"TRIGger:A:TIMEOut:POLarity STAYSLow",
+                           f"TRIGger:A:TIMEOut:TIMe {LINE_LOSS_TIMEOUT}"]
+            else:
+                trigger = [f"TRIGger:A:TYPe EDGE",
+                           f"TRIGger:A:EDGE:SOUrce CH1",
+                           f"TRIGger:A:EDGE:SLOpe RISE"]
+            trigger += [f"TRIGger:A:LEVel:CH1 {level:.3f}",
+                        "TRIGger:A:MODe NORMal",
+                        "ACQuire:STOPAfter SEQuence",
+                        "ACQuire:STATE ON"]
+            self.instr.write(";".join(":" + cmd for cmd in trigger))
+            self.armed_event = event
+            # Time from trigger to end of record, to back-date the completion to the trigger instant
+            if self.post_trigger_time is None:
+                scale = parse_visa_numeric(self.instr.query("HORizontal:SCAle?"))
+                position = parse_visa_numeric(self.instr.query("HORizontal:POSition?"))
+                self.post_trigger_time = 10 * scale * (1 - position / 100)
+            # *OPC? is answered only when the single sequence completes, so no polling is needed
+            self.instr.write("*OPC?")
+
+        def wait_line_trigger(self, stop_event, on_poll=None, poll_timeout=1000):
+            """
+            Blocks until the armed acquisition completes (one small read per poll_timeout ms).
+            on_poll() is called after every read that times out, for periodic work while waiting.
+            Returns the estimated line event datetime, or None if stop_event was set.  A loss trigger fires
+            LINE_LOSS_TIMEOUT after the line went low, so that is taken off too.
+            """
+            original_timeout = self.instr.timeout
+            self.instr.timeout = poll_timeout
+            try:
+                while not stop_event.is_set():
+                    try:
+                        self.instr.read()
+                    except pyvisa.errors.VisaIOError as e:
+                        if e.error_code == pyvisa.constants.StatusCode.error_timeout:
+                            if on_poll is not None:
+                                on_poll()
+                            continue
+                        raise
+                    t_recv = time.perf_counter()
+                    srtt = self.instr.srtt or 0.0
+                    t_event = t_recv - srtt / 2 - self.post_trigger_time
+                    if self.armed_event == "loss":
+                        t_event -= LINE_LOSS_TIMEOUT
+                    return self.instr.to_datetime(t_event)
+                self.instr.clear()   # abandon the pending *OPC?
+                return None
+            finally:
+                self.instr.timeout = original_timeout
+
+        def restore_autorun(self):
+            self.instr.write(":TRIGger:A:TYPe EDGE;:TRIGger:A:MODe AUTO;:ACQuire:STOPAfter RUNSTop;:ACQuire:STATE ON")
+
+        def fetch_waveform(self, channel, request=FULL_RECORD):
+            """
+            Record window and point width (1 or 2 byte signed codes) the request needs, plus the preamble needed to
+            scale it (see event_context.waveform_volts, waveform_fetch.py). Returns None if the transfer fails.
+            """
+            try:
+                return fetch_waveform(self.instr, channel, request, self.fetch_stats)
+            except (pyvisa.errors.VisaIOError, ValueError) as e:
+                print(f"Error reading CH{channel} waveform: {e}")
+                return None
 
         def stop(self):
             self.instr.write("ACQuire:STATE OFF")
 
+        def run(self):
+            self.instr.write("ACQuire:STATE ON")
+
     class RigolScope(Scope):
         def setup(self, num_channels, max_channels):
             for i in range(1, max_channels + 1):
@@ -268,8 +474,8 @@ def main():
         def set_timebase(self, ms_per_div):
             self.instr.write(f":TIMebase:SCALe {ms_per_div}")
             
-        def _query_vrms(self, channel):
-            return self.instr.query(f":MEASure:VRMS? CHAN{channel}")
+        def _vrms_command(self, channel):
+            return f":MEASure:VRMS? CHAN{channel}"
 
         def stop(self):
             self.instr.write(":STOP")
@@ -319,13 +525,15 @@ def main():
         def set_timebase(self, ms_per_div):
             self.instr.write(f"VBS 'app.Acquisition.Horizontal.HorScale = {ms_per_div}'")
 
-        def _query_vrms(self, channel):
-            return self.instr.query(f"VBS? 'return=app.Measure.P{channel}.Out.Result.Value'")
+        def _vrms_command(self, channel):
+            return f"VBS? 'return=app.Measure.P{channel}.Out.Result.Value'"
 
         def stop(self):
             self.instr.write(":STOP")
 
     class KeysightScope(Scope):
+        compound_queries = True
+
         def setup(self, num_channels, max_channels):
             self.instr.write(":MEASure:CLEar")
             for i in range(1, max_channels + 1):
@@ -359,8 +567,8 @@ def main():
         def set_timebase(self, ms_per_div):
             self.instr.write(f":TIMebase:RANGe {ms_per_div * 10}")
             
-        def _query_vrms(self, channel):
-            return self.instr.query(f":MEASure:VRMS? CHANnel{channel}")
+        def _vrms_command(self, channel):
+            return f":MEASure:VRMS? CHANnel{channel}"
 
         def stop(self):
             self.instr.write(":STOP")
@@ -393,7 +601,8 @@ def main():
             print("\n[ESC ATTEMPT] Press 'ESC' again within 2 seconds to confirm exit.")
             last_quit_attempt = current_time
 
-    def connect_to_instrument(resource_manager: pyvisa.ResourceManager, default_ip: str = DEFAULT_IP_ADDRESS):
+    def connect_to_instrument(resource_manager: pyvisa.ResourceManager, default_ip: str = DEFAULT_IP_ADDRESS,
+                              socket_port: int = 0):
         """
         Prompts the user for an IP address and attempts to establish a connection
         to a PyVISA instrument and returns the object plus its identity.
@@ -401,6 +610,7 @@ def main():
         Args:
             resource_manager: The PyVISA ResourceManager instance.
             default_ip: The default IP address to suggest to the user.
+            socket_port: Raw socket port (TCPIP::<ip>::<port>::SOCKET), 0 for VXI-11 (TCPIP::<ip>::INSTR).
 
         Returns:
             The connected PyVISA instrument object and brand label (string).
@@ -420,6 +630,8 @@ def main():
             # Smart string construction
             if "::" in visa_address:
                 resource_string = visa_address
+            elif socket_port:
+                resource_string = f'TCPIP::{visa_address}::{socket_port}::SOCKET'
             else:
                 resource_string = f'TCPIP::{visa_address}::INSTR'
 
@@ -428,6 +640,10 @@ def main():
             try:
                 instr = resource_manager.open_resource(resource_string)
                 instr.timeout = 10000
+                if resource_string.upper().endswith("::SOCKET"):
+                    # Raw sockets have no message framing; replies end at the newline
+                    instr.read_termination = "\n"
+                    instr.write_termination = "\n"
                 instr.write("*CLS")  # clear buffer
                 instr.query("*OPC?") # wait for operation to complete
                 idn = instr.query('*IDN?').strip().upper()
@@ -544,7 +760,7 @@ def main():
             except ValueError:
                 print("Invalid input. Please enter a numerical value or 'd'.")
 
-    def make_datafile(timestamp, dropout_enabled,dropout_interval, path=default_path):
+    def make_datafile(timestamp, dropout_enabled,dropout_interval, path=default_path, power_names=()):
         """
         Generates a csv data file for the data based on start date and time.
         Includes headers for each monitored channel. Asks user for directory
@@ -552,17 +768,7 @@ def main():
 
         Returns tuple for user_path and data_log_file_name
         """
-        header_list = [
-            "Event_Count", 
-            "Start_Time_Absolute", 
-            "End_Time_Absolute", 
-            "Line Voltage", 
-            "State", 
-            "Duration_Seconds"
-        ]
-        if dropout_enabled:
-            header_list.append(f"Drop-out Check ({dropout_interval} sec)")
-        header_string = ",".join(header_list)
+        header_string = csv_header(dropout_enabled, dropout_interval, power_names)
 
         user_path_input = input(f"Enter data path (Default = Desktop)   'd' for default :").strip()
         user_path = path if user_path_input.lower() == 'd' or not user_path_input else user_path_input
@@ -639,27 +845,13 @@ def main():
         print("Caution- network latency and instrument IO delay (generally 20 ms) can take up to 6 sec total.")        
         return check_dropout, interval, delay
 
-    def log_event(path, filename, count, start_time, end_time, line_v, state, duration, label=""):  
-        # duration is in seconds formatted to 3 decimal places. If unable log as string.
+    def log_event(**row):
+        # Row format (duration, timestamps, ON-period summary columns) is shared with replay_onoff.py
         try:
-            full_path = os.path.join(path, filename)
-            try:
-                # Try formatting duration as a float with 3 decimal places
-                duration_str = f"{float(duration):9.3f}"
-            except (ValueError, TypeError):
-                # If formatting fails, log as string
-                duration_str = f"{str(duration):>9}"
-
-            # Rather than ISO 8601 timestamp, replace T with a space for conversion to Excel datetime format later. Excel custom format will be yyyy-mmm-dd hh:mm:ss.000 
-            with open(full_path, "a") as f:
-                line = (f"{count},{start_time.strftime('%Y-%m-%d %H:%M:%S.%f')},"
-                    f"{end_time.strftime('%Y-%m-%d %H:%M:%S.%f')},{line_v:.3f},"
-                    f"{state},{duration_str},{label}")
-                f.write(line + "\n")
-
+            event_log.write(row)
 
         except IOError as e:
-            print(f"Error appending data to file '{full_path}': {e}")
+            print(f"Error appending data to file '{event_log.path}': {e}")
 
     def write_to_excel(filename, path): 
         full_path_csv = os.path.join(path, filename)
@@ -671,48 +863,24 @@ def main():
         header_font = Font(bold=True)
 
         try:
-            with open(full_path_csv, 'r') as f:
-                reader = csv.reader(f)
-                
-                for r_idx, row in enumerate(reader, 1):
-                    # Add the data to the row
-                    ws.append(row)
-                    
-                    # Iterate through the cells in the current row to apply types and formats
-                    for c_idx, val in enumerate(row):
-                        cell = ws.cell(row=r_idx, column=c_idx + 1)
-                        
-                        # Format the header row
-                        if r_idx == 1:
-                            cell.font = header_font
-                            continue   # row complete; only remaining are numbers           
-
-                        # Columns 1 -> Integer
-                        if c_idx == 0:
-                            try:
-                                cell.value = float(val)
-                                cell.number_format = '0'
-                            except (ValueError, TypeError):
-                                pass
-
-                        # Columns 4 and 6 (indices 3, 5) -> Numbers
-                        elif c_idx in [3, 5]:
-                            try:
-                                cell.value = float(val)
-                                cell.number_format = '0'
-                            except (ValueError, TypeError):
-                                pass
-                                
-                        # Columns 2 and 3 (indices 1, 2) -> Dates 
-                        elif c_idx in [1, 2]:
-                            try:
-                                # Parse the specific string format: 2026-04-07 11:33:08.208383
-                                dt_obj = datetime.datetime.strptime(val, '%Y-%m-%d %H:%M:%S.%f')
-                                cell.value = dt_obj
-                                # Custom Excel format: yyyy-mmm-dd hh:mm:ss.000
-                                cell.number_format = 'yyyy-mmm-dd hh:mm:ss.000'
-                            except (ValueError, TypeError):
-                                pass
+            # Typed columns in one pass (log_reader.py) instead of parsing every cell
+            log = read_log(full_path_csv)
+            ws.append(log.names)
+            for cell in ws[1]:
+                cell.font = header_font
+            for row in log.rows():
+                ws.append(row)
+
+            # Event_Count, Line Voltage, Duration and Line_* -> Numbers; Start/End -> Dates
+            for c_idx, name in enumerate(log.names, 1):
+                if log[name].dtype.kind == "M":
+                    number_format = 'yyyy-mmm-dd hh:mm:ss.000'   # Custom Excel format: yyyy-mmm-dd hh:mm:ss.000
+                elif log[name].dtype.kind in "if":
+                    number_format = '0'
+                else:
+                    continue
+                for (cell,) in ws.iter_rows(min_row=2, min_col=c_idx, max_col=c_idx):
+                    cell.number_format = number_format
 
             # Auto-adjust column widths so dates are visible
             for column_cells in ws.columns:
@@ -727,17 +895,39 @@ def main():
             print(f"Excel Error: {e}")
 
 
+    def report_events(events):
+        """
+        Prints state machine messages and logs its event rows.
+        Transitions and drop-outs also get a context snippet (readings around the event, Tek waveform).
+        """
+        for event in events:
+            if event.message:
+                print(event.message)
+            if event.row and event_log is not None:
+                log_event(**event.row)
+                if context is not None and event.kind in CONTEXT_KINDS:
+                    with io_lock.hold("log"):
+                        waveform = scope.fetch_waveform(1)
+                    context.schedule(event.row["count"], event.row["end_time"], event.kind,
+                                     event.row.get("label", ""), waveform)
+
     # ************** MAIN
     rm = None
     scope = None
-    start_time = datetime.datetime.now()
-    last_state_time = datetime.datetime.now()
-    event_counter = 0
-    current_state = "UNKNOWN"
+    machine = None
+    ring = None
+    context = None
+    waveform_store = None
+    event_log = None
+    snapshot = LiveSnapshot()
+    dashboard = None
+    pipeline = None
+    analyzer = None
+    cycle_monitor = None
+    io_lock = InstrumentLock()      # scope I/O from the acquisition thread and the stages (event waveforms, captures)
+    exporter = ThreadPoolExecutor(max_workers=1)   # Excel files of closed segments
     user_path = None
     datafile_name = None
-    first_transition_logged = False
-    steady_state_line_voltage = 0.0
 
     try:
         # Register the 'q' hotkey
@@ -746,7 +936,7 @@ def main():
 
         # Initialize Resource Manager and check connection to instrument
         rm = pyvisa.ResourceManager()
-        scope, brand = connect_to_instrument(rm, default_ip=DEFAULT_IP_ADDRESS)
+        scope, brand = connect_to_instrument(rm, default_ip=DEFAULT_IP_ADDRESS, socket_port=args.socket_port)
         if scope is None:
             print("Failed to connect to the instrument. Exiting.")
             raise
@@ -782,6 +972,14 @@ def main():
         # Get dropout configuration
         do_enabled, do_interval, do_delay = get_dropout_settings()
 
+        # ON/OFF detection by the scope's own CH1 trigger (no polling) if supported
+        trigger_mode = args.mode == "trigger"
+        if trigger_mode and not scope.supports_line_trigger:
+            print(f"Trigger mode not supported on {brand.upper()} scope. Using polling mode.")
+            trigger_mode = False
+        if trigger_mode:
+            print("Trigger mode: scope triggers on line loss/restore. Amp drop-out checks are not available in this mode.")
+
         # Set up scope?
         setup_needed = input("Review/Setup SCOPE? (Y/N, Default=N)    'd' for default :").strip()
         if setup_needed.lower() == 's' or setup_needed.lower() == "y":
@@ -790,11 +988,87 @@ def main():
         else:
             print("Skipping scope setup.")
 
+        # Amplifier power pairs (voltage:current or voltage@ohms) for power/energy per ON period
+        power_meter = None
+        if args.power:
+            try:
+                power_pairs = parse_power_pairs(args.power)
+                if any(not 2 <= channel <= num_channels_to_monitor for pair in power_pairs for channel in pair.channels):
+                    raise ValueError(f"power channels must be amplifier channels CH2-CH{num_channels_to_monitor}")
+                power_meter = PowerMeter(power_pairs)
+                print(f"Power pairs: {', '.join(map(repr, power_pairs))}")
+                if any(pair.current_channel for pair in power_pairs) and args.analysis_interval <= 0:
+                    print("V:I pairs get apparent power only without --analysis-interval waveform captures.")
+            except ValueError as e:
+                print(f"Invalid --power ({e}). Power is not logged.")
+
+        # ON/OFF state machine (debounce, settling, drop-out checks); same component as replay_onoff.py
+        machine = OnOffStateMachine(
+            ac_line_high_limit,
+            ac_line_low_limit,
+            amp_high_limit=amp_high_limit,
+            num_amp_channels=num_channels_to_monitor - 1,
+            dropout_enabled=do_enabled,
+            dropout_delay=do_delay,
+            power_meter=power_meter,
+        )
+        power_names = power_meter.names if power_meter is not None else ()
+
         # Create a data file for logging based on the current timestamp (used for duration of test)
-        start_time = datetime.datetime.now()
-        user_path, datafile_name = make_datafile(start_time, do_enabled, do_interval)
+        machine.start_time = datetime.datetime.now()
+        user_path, datafile_name = make_datafile(machine.start_time, do_enabled, do_interval, power_names=power_names)
         full_data_path = os.path.join(user_path, datafile_name)
         print("Created file ", datafile_name, " in path: ", user_path)
+        event_log = RotatingLog(user_path, datafile_name, csv_header(do_enabled, do_interval, power_names),
+                                max_bytes=args.rotate_mb * 1e6 if args.rotate_mb > 0 else None,
+                                period=None if args.rotate == "none" else args.rotate,
+                                on_close=lambda path: exporter.submit(write_to_excel, os.path.basename(path),
+                                                                      os.path.dirname(path)))
+
+        # Raw readings ring (constant memory) so logged events have context
+        TARGET_PERIOD = 0.070 # VPN 10 ms, Internet 30 ms, VISA Handshake 10 ms, Payload 5 ms, Execution 5ms
+        if args.ring_hours > 0:
+            ring_path = os.path.splitext(full_data_path)[0] + ".ring" if args.ring_file else None
+            ring = ReadingRing(capacity_for(args.ring_hours, TARGET_PERIOD), num_channels_to_monitor, ring_path)
+            print(f"Keeping the last {args.ring_hours:g} h of raw readings" + (f" in {ring_path}" if ring_path else "") + ".")
+            if (args.context_pre > 0 or args.context_post > 0) and trigger_mode:
+                # Armed single sequences take no readings between triggers, so there is nothing around an event
+                print("Event context snippets need poll mode (no readings between triggers). Skipping them.")
+            elif args.context_pre > 0 or args.context_post > 0:
+                if args.waveform_store:
+                    waveform_store = WaveformWriter(os.path.join(user_path,
+                                                                 os.path.splitext(datafile_name)[0] + "_waveforms.wfz"))
+                context = ContextDumper(ring, user_path, os.path.splitext(datafile_name)[0],
+                                        args.context_pre, args.context_post, waveform_store=waveform_store)
+
+        # Amplifier waveform analysis (THD+N, clipping) in a process pool
+        if args.analysis_interval > 0 and num_channels_to_monitor > 1:
+            if trigger_mode or type(scope).fetch_waveform is Scope.fetch_waveform:
+                print("Waveform analysis needs poll mode on a Tek scope. Skipping it.")
+            else:
+                def report_analysis(count, timestamp, channel, result):
+                    if result["Clipped"] or result["Overrange"]:
+                        print(f"[{timestamp.strftime('%H:%M:%S')}] CH{channel} "
+                              f"{'CLIPPING' if result['Clipped'] else 'SCOPE OVERRANGE'}: "
+                              f"THD+N {result['THD_N_Percent']:.2f}%, crest factor {result['Crest_Factor']:.2f}")
+                analyzer = WaveformAnalyzer(os.path.join(user_path, os.path.splitext(datafile_name)[0] + "_analysis.csv"),
+                                            on_result=report_analysis)
+                print(f"Analyzing amplifier waveforms every {args.analysis_interval:g} s in {analyzer.path}")
+
+        # Per-cycle RMS of CH1 captures (sags, swells, half-cycle drop-outs)
+        if args.cycle_interval > 0:
+            if trigger_mode or type(scope).fetch_waveform is Scope.fetch_waveform:
+                print("Cycle RMS needs poll mode on a Tek scope. Skipping it.")
+            else:
+                cycle_monitor = CycleMonitor(os.path.join(user_path, os.path.splitext(datafile_name)[0] + "_cycles.csv"),
+                                             sag_limit=args.sag_limit, swell_limit=args.swell_limit)
+                print(f"Checking CH1 cycle by cycle every {args.cycle_interval:g} s in {cycle_monitor.path}")
+
+        # Live dashboard, served from its own thread
+        if args.dashboard_port:
+            dashboard = DashboardServer(snapshot, port=args.dashboard_port, ring=ring,
+                                        title=f"Power Monitoring - {datafile_name}")
+            print(f"Dashboard: {dashboard.start()}")
 
         # Notify ready to start and instruct how to stop program.
         print(f"Monitoring AC Line voltage > {ac_line_high_limit:.2f} Vrms ON and < {ac_line_low_limit:.2f} Vrms OFF.")
@@ -802,153 +1076,191 @@ def main():
         input("Hit Enter to start monitoring...")
 
         # ************** MAIN LOOP  ***************** 
-        TARGET_PERIOD = 0.070 # VPN 10 ms, Internet 30 ms, VISA Handshake 10 ms, Payload 5 ms, Execution 5ms
-        ON_CONFIRMATION_THRESHOLD = 2  # Consecutive readings required to confirm ON
-        on_confirmation_count = 0
-        OFF_CONFIRMATION_THRESHOLD = 2  # Consecutive readings required to confirm OFF
-        off_confirmation_count = 0
-
-        # IO throughput monitor
-        loop_count = 0
-        total_loop_time = 0
-        REPORT_INTERVAL = 100
-
-        while not stop_program_event.is_set():
-            # IO counter
+
+        # ************** TRIGGER MODE LOOP  *****************
+        # Host only waits for the scope to trigger on line loss (ON) or restoration (OFF).
+        # Idle bus traffic is one small read per second; dropouts down to one line cycle are caught.
+        if trigger_mode:
+            line_v_on = apply_line_voltage_bounds(parse_visa_numeric(scope._query_vrms(1)))
+            machine.line_stats.update(line_v_on)
+            initial_state = "ON" if line_v_on > ac_line_low_limit else "OFF"
+            report_events([machine.set_initial_state(initial_state, scope.instr.sample_time())])
+            machine.on_period_stats.update(line_v_on)
+
+        while trigger_mode and not stop_program_event.is_set():
+            if machine.current_state == "ON":
+                scope.arm_line_trigger("loss", ac_line_low_limit)
+            else:
+                scope.arm_line_trigger("restore", ac_line_high_limit)
+            # Context snippets complete on elapsed time, so keep polling them while the line is steady
+            trigger_time = scope.wait_line_trigger(
+                stop_program_event, on_poll=(lambda: context.poll(time.time())) if context is not None else None)
+            if trigger_time is None:
+                break
+
+            if machine.current_state == "ON":
+                events = machine.transition("OFF", trigger_time)
+                report_events(events)
+            else:
+                # RMS of the triggered record (mostly post-trigger) for the restored line voltage
+                line_v_on = apply_line_voltage_bounds(parse_visa_numeric(scope._query_vrms(1)))
+                machine.line_stats.update(line_v_on)
+                if ring is not None:
+                    ring.append(trigger_time.timestamp(), [line_v_on])
+                events = machine.transition("ON", trigger_time, line_v_on)
+                report_events(events)
+                machine.on_period_stats.update(line_v_on)
+            messages = [event.message for event in events if event.message]
+            snapshot.publish(time=trigger_time, state=machine.current_state, events=machine.event_counter,
+                             **({"last_event": messages[-1]} if messages else {}))
+            if context is not None:
+                context.poll(time.time())
+
+        if trigger_mode:
+            scope.restore_autorun()
+
+        # ************** POLL MODE PIPELINE  *****************
+        # The acquisition thread only reads the scope, timestamps and paces; everything else runs in stages so a slow
+        # console, disk or export never delays the next read:
+        #   evaluate  state machine (debounced transitions, settling, drop-out checks)
+        #   log       event messages, CSV rows, context snippets (lossless: back-pressure if it falls behind)
+        #   display   dashboard snapshot, slow read warnings, RTT reports (drops the oldest when behind)
+        #   analysis  amplifier waveform captures for the process pool (only with --analysis-interval)
+        #   cycles    CH1 captures for the per-cycle RMS engine (only with --cycle-interval)
+        REPORT_INTERVAL = 100           # loops per throughput figure
+        RTT_REPORT_PERIOD = 300         # seconds between RTT (timing uncertainty) reports
+        loop_stats = {"count": 0, "total": 0.0, "hz": 0.0, "last_rtt_report": time.perf_counter(), "last_analysis": 0.0,
+                      "last_cycles": 0.0}
+        # State as last published by the evaluate stage (one reference swap), so the acquisition thread never reads
+        # the state machine while evaluate is stepping it; it lags the newest reading by whatever is queued
+        published = {"state": machine.current_state}
+
+        def acquire():
             loop_start = time.perf_counter()
-            
-            # Get IO measurements (from scope)
-            meas_time, all_readings, avg_line = scope.get_measurements(
-                num_channels_to_monitor, 
-                current_state, 
-                do_interval,
-                low_limit=ac_line_low_limit,
-                high_limit=ac_line_high_limit,
-            )
-            # Check if measurement failed and skip this cycle.
-            if meas_time is None: continue
-
-            # Check IO time and sleep if needed faster than 70 ms (TARGET_PERIOD)
+            with io_lock.hold("acquire"):
+                meas_time, all_readings = scope.get_measurements(
+                    num_channels_to_monitor,
+                    published["state"],
+                    do_interval,
+                    low_limit=ac_line_low_limit,
+                    high_limit=ac_line_high_limit,
+                )
+            # Measurement failed, skip this cycle
+            if meas_time is None:
+                return None
+            if ring is not None:
+                ring.append(meas_time.timestamp(), all_readings)
+
+            # Sleep if the read was faster than 70 ms (TARGET_PERIOD)
             elapsed = time.perf_counter() - loop_start
-            if elapsed > do_interval: 
+            time.sleep(max(0, TARGET_PERIOD - elapsed))
+
+            # IO throughput (including sleep) in Hz over the last REPORT_INTERVAL loops, for diagnostics
+            loop_stats["total"] += time.perf_counter() - loop_start
+            loop_stats["count"] += 1
+            if loop_stats["count"] >= REPORT_INTERVAL:
+                loop_stats["hz"] = loop_stats["count"] / loop_stats["total"]
+                loop_stats["count"], loop_stats["total"] = 0, 0.0
+            return meas_time, all_readings, elapsed
+
+        def evaluate(item):
+            meas_time, all_readings, elapsed = item
+            events = machine.step(meas_time, all_readings[0], all_readings[1:])
+            published["state"] = machine.current_state
+            return meas_time, all_readings, elapsed, events, machine.current_state, machine.event_counter
+
+        def log_stage(item):
+            meas_time, _, _, events, _, _ = item
+            report_events(events)
+            if context is not None:
+                context.poll(meas_time.timestamp())
+
+        def display(item):
+            meas_time, all_readings, elapsed, events, state, event_count = item
+            if elapsed > do_interval:
                 print(f"[{meas_time.strftime('%H:%M:%S')}] Warning- Instrument read took {elapsed:.3f} sec -  longer than the {do_interval} sec interval requested.")
-            sleep_time = max(0, TARGET_PERIOD - elapsed)
-            time.sleep(sleep_time)
-
-            # IO throughput calcuation (including sleep) for diagnostics
-            iteration_duration = time.perf_counter() - loop_start
-            total_loop_time += iteration_duration
-            loop_count += 1
-            if loop_count >= REPORT_INTERVAL:
-                avg_time = total_loop_time / loop_count
-                # Throughput in Hz (iterations per second)
-                throughput = 1.0 / avg_time if avg_time > 0 else 0           
-                # print(f"\n--- Performance Report (Last {REPORT_INTERVAL} loops) ---")
-                # print(f"Avg Loop Time: {avg_time:.4f}s")
-                
-                # Reset counters for the next window
-                loop_count = 0
-                total_loop_time = 0
-
-            # Extract readings and assign state based on limits
-            ac_line_voltage = all_readings[0]
-            new_amp_data = all_readings[1:] 
-            # using 'instantaneous' rms values for Fast ON, Fast OFF
-            ac_line_on, ac_line_off = ac_line_voltage >= ac_line_high_limit, ac_line_voltage <= ac_line_low_limit     
-                                        
-            # State Establishment (define current state)
-            if current_state == "UNKNOWN":
-                if ac_line_on:
-                    current_state = "ON"
-                    print(f"Initial state detected as ON. Waiting for next transition.")
-                    start_time = meas_time
-                    last_state_time = meas_time
-                elif ac_line_off:
-                    current_state = "OFF"
-                    print(f"Initial state detected as OFF. Waiting for next transition.")
-                    start_time = meas_time
-                else:
-                    # Still in an indeterminate state or no clear ON/OFF. Keep current_state as UNKNOWN.
-                    pass # No change, continue will be called below
-                continue # Always continue if still in UNKNOWN or just established initial state
-
-            # Current_state is either 'ON' or 'OFF'. Ok to proceed to check for transitions.
-            # Assume no change unless clear transition from current_state to new_actual_state 
-            new_actual_state = current_state 
-
-            # Transition from OFF to ON with debounce count
-            if current_state == "OFF":
-                if ac_line_on:
-                    on_confirmation_count += 1
-                elif ac_line_off:  # Only reset if we are sure it's still solidly OFF
-                    on_confirmation_count = 0 
-                if on_confirmation_count >= ON_CONFIRMATION_THRESHOLD:
-                    new_actual_state = "ON"
-                    on_confirmation_count = 0
-                    off_confirmation_count = 0
-
-            # Transition from ON to OFF with debounce count
-            elif current_state == "ON":
-                if ac_line_off:
-                    off_confirmation_count += 1
-                elif ac_line_on:  # Only reset if we are sure it's still solidly ON
-                    off_confirmation_count = 0
-
-                if off_confirmation_count >= OFF_CONFIRMATION_THRESHOLD:
-                    new_actual_state = "OFF"
-                    off_confirmation_count = 0
-                    on_confirmation_count = 0
-
-            # Update steady state voltage logic for better AC line measurements after settling
-            if current_state == "ON":
-                elapsed = (meas_time - last_state_time).total_seconds()
-                if elapsed < SETTLING_TIME:
-                    steady_state_line_voltage = max(steady_state_line_voltage, ac_line_voltage)
-                elif ac_line_on and not ac_line_off:
-                    steady_state_line_voltage = avg_line
-
-                # Periodic Dropout Check  (recheck AC power is stable and not close to turning off)
-                if do_enabled and None not in new_amp_data and new_actual_state == "ON" and ac_line_voltage > (ac_line_low_limit + 15):
-                    if elapsed > do_delay:
-                        if not all(v >= amp_high_limit for v in new_amp_data):
-                            event_counter += 1
-                            min_amp_out = min(new_amp_data)
-                            # Drop-out records meas_time twice (both the start and end time) to note 'instance' of event
-                            log_event(user_path, datafile_name, event_counter, meas_time, meas_time, avg_line, "ON", "N/A", f"* Amp Out MIN: {min_amp_out:.1f}Vrms")
-                            print(f"[{meas_time.strftime('%H:%M:%S')}] DROP-OUT DETECTED!  "
-                                f"Line Voltage: {avg_line:6.3f}Vrms, "
-                                f"Amp Out MIN: {min_amp_out:6.3f}Vrms)")
-
-            # Log transition
-            if new_actual_state != current_state:
-                if not first_transition_logged:
-                    current_state = new_actual_state
-                    start_time = meas_time
-                    last_state_time = meas_time
-                    print(f"[{meas_time.strftime('%H:%M:%S')}] First transition detected: System is now {current_state}.")
-                    first_transition_logged = True
-                else: 
-                    # This is a subsequent transition; start logging from this point on
-                    duration = (meas_time - start_time).total_seconds()
-                    event_counter += 1
-                    if current_state == "OFF" and new_actual_state == "ON":
-                        # Transition from OFF to ON  (log the previous OFF state, reset timers, line voltage, off trigger)
-                        log_event(user_path, datafile_name, event_counter, start_time, meas_time, 0.0, "OFF", duration)
-                        print(f"[{meas_time.strftime('%H:%M:%S')}] ON.   Detected line voltage is {ac_line_voltage:8.3f} Vrms.  (Previous OFF duration was {duration:8.3f} sec.)")
-                        current_state = "ON"
-                        start_time = meas_time
-                        last_state_time = meas_time
-                        steady_state_line_voltage = 0.0
-
-                    elif current_state == "ON" and new_actual_state == "OFF":
-                        # Transition from ON to OFF
-                        # Determine the line voltage to log
-                        voltage_to_log = steady_state_line_voltage
-
-                        log_event(user_path, datafile_name, event_counter, start_time, meas_time, voltage_to_log, "ON", duration)
-                        print(f"[{meas_time.strftime('%H:%M:%S')}] OFF.  ON  duration was {duration:8.3f} sec at {voltage_to_log:6.3f} Vrms line.")
-                        current_state = "OFF"
-                        start_time = meas_time
+            fields = dict(time=meas_time, readings=all_readings, state=state, events=event_count,
+                          read_ms=elapsed * 1000, loop_hz=loop_stats["hz"], **pipeline.metrics())
+            messages = [event.message for event in events if event.message]
+            if messages:
+                fields["last_event"] = messages[-1]
+            # Report link timing uncertainty now and then
+            if time.perf_counter() - loop_stats["last_rtt_report"] > RTT_REPORT_PERIOD:
+                fields["rtt"] = scope.instr.rtt_report()
+                print(f"[{meas_time.strftime('%H:%M:%S')}] {fields['rtt']}")
+                loop_stats["last_rtt_report"] = time.perf_counter()
+            snapshot.publish(**fields)
+
+        def capture_amps(item):
+            # Amp channels were read this cycle (load check), line is ON and an analysis is due
+            meas_time, all_readings, _, _, state, event_count = item
+            if (state != "ON" or None in all_readings[1:]
+                    or time.perf_counter() - loop_stats["last_analysis"] < args.analysis_interval):
+                return
+            loop_stats["last_analysis"] = time.perf_counter()
+            # One stopped acquisition for all channels, so voltage and current records line up for power.
+            # Acquisition is blocked meanwhile; counted as lock_analysis_held_s in the pipeline metrics
+            with io_lock.hold("analysis"):
+                scope.stop()
+                try:
+                    waveforms = {channel: scope.fetch_waveform(channel, ANALYSIS_REQUEST)
+                                 for channel in range(2, num_channels_to_monitor + 1)}
+                finally:
+                    scope.run()
+            for channel, waveform in waveforms.items():
+                if waveform is not None:
+                    analyzer.submit(event_count, meas_time, channel, waveform)
+            if power_meter is not None:
+                power_meter.update_waveforms({channel: waveform_volts(waveform)[1]
+                                              for channel, waveform in waveforms.items() if waveform is not None})
+
+        def check_cycles(item):
+            meas_time, _, _, _, state, event_count = item
+            if state != "ON" or time.perf_counter() - loop_stats["last_cycles"] < args.cycle_interval:
+                return
+            loop_stats["last_cycles"] = time.perf_counter()
+            # Stop on the record to fetch.  The scope gives no absolute time for it: it was the last acquisition
+            # to complete before the stop, so it ended between one record before the stop was sent and the stop
+            # being confirmed.  Acquisition is blocked meanwhile; counted as lock_cycles_held_s in the pipeline
+            # metrics
+            with io_lock.hold("cycles"):
+                stop_sent = scope.instr.to_datetime(time.perf_counter())
+                scope.stop()
+                try:
+                    scope.instr.query("*OPC?")
+                    stop_time = scope.instr.sample_time()
+                    waveform = scope.fetch_waveform(1, CYCLE_REQUEST)
+                finally:
+                    scope.run()
+            if waveform is None:
+                return
+            # Date the last point of the record (not of the fetched window) at the middle of that window, +/- half
+            # of it plus the link's own timing error, logged with the events as Time_Uncertainty_s
+            record_end = waveform["xzero"] + (waveform["record_length"] - waveform["start"]) * waveform["xincr"]
+            earliest = stop_sent - datetime.timedelta(seconds=waveform["record_length"] * waveform["xincr"])
+            half_window = max((stop_time - earliest).total_seconds(), 0.0) / 2
+            uncertainty = half_window + (scope.instr.rtt_stats()["uncertainty"] or 0.0)
+            trigger_time = stop_time - datetime.timedelta(seconds=half_window + record_end)
+            nominal = machine.settled_stats.total.mean if machine.settled_stats.count else None
+            for event in cycle_monitor.analyze(waveform, trigger_time, event_count, nominal, uncertainty):
+                print(f"[{event['start_time'].strftime('%H:%M:%S.%f')[:-3]}] Line {event['kind'].upper()}: "
+                      f"{event['cycles']:g} cycle(s), {event['extreme']:.1f} Vrms")
+
+        if not trigger_mode:
+            evaluate_stage = Stage("evaluate", evaluate)
+            log_events_stage = Stage("log", log_stage)
+            display_stage = Stage("display", display, maxsize=16, lossy=True)
+            evaluate_stage.connect(log_events_stage, display_stage)
+            stages = [evaluate_stage, log_events_stage, display_stage]
+            if analyzer is not None:
+                stages.append(Stage("analysis", capture_amps, maxsize=4, lossy=True))
+                evaluate_stage.connect(stages[-1])
+            if cycle_monitor is not None:
+                stages.append(Stage("cycles", check_cycles, maxsize=4, lossy=True))
+                evaluate_stage.connect(stages[-1])
+            pipeline = AcquisitionPipeline(acquire, stages, stop_program_event, lock=io_lock).connect(evaluate_stage)
+            pipeline.start()
+            pipeline.wait()
 
     except KeyboardInterrupt:
         print("\nProgram terminated by user (Ctrl+C).")
@@ -957,10 +1269,23 @@ def main():
         print(f"An error occurred during program execution: {e}")
 
     finally:
+        # Stop acquisition and let the stages finish their queues before the scope is closed
+        if pipeline is not None:
+            pipeline.close()
+            print(pipeline.report())
+        if analyzer is not None:
+            analyzer.close()
+            print(analyzer.report())
+        if cycle_monitor is not None:
+            print(cycle_monitor.report())
+        if scope is not None and scope.fetch_stats.fetches:
+            print(scope.fetch_stats.report())
+
         # Close the instrument connection and resource manager
         if scope:
             # Stop acquisition before closing
             try:
+                print(scope.instr.rtt_report())
                 scope.stop()
                 scope.close()
                 print("Instrument connection closed.")
@@ -974,36 +1299,28 @@ def main():
                 print(f"Error closing Resource Manager: {e}")
 
         # Log last entry to log file and final state if it was not already logged
-        event_counter += 1
-        final_time = datetime.datetime.now()
-        duration = (final_time - start_time).total_seconds()
-        final_voltage_to_log = 0.000 # Default to 0.0
-
-        # Only attempt to use current_line_voltage_snapshot if the queue has data
-        if len(line_voltage_readings_queue) > 0:
-            final_voltage_to_log = sum(line_voltage_readings_queue) / len(line_voltage_readings_queue)
-
-        if current_state == "OFF":
-            # Always log 0.0 for line voltage if the final state is OFF
-            final_voltage_to_log = 0.0  # hard code final voltage
-            if user_path and datafile_name:
-                log_event(user_path, datafile_name, event_counter, start_time, final_time, final_voltage_to_log, current_state, duration)
-            print(f"Program stopped.")
-        else: # If the final state was ON
-            # This handles cases where the program exits very quickly after starting with initial states
-            if event_counter == 0 or (event_counter == 1 and duration < 1.0): # event_counter 0 means no transitions logged. 1 means the initial state captured.
-                final_voltage_to_log = 0.0 # Hardcode as too early in program for accurate readings or event_counter is 0 or 1
-                print("Program early termination.")
-            if user_path and datafile_name:
-                log_event(user_path, datafile_name, event_counter, start_time, final_time, final_voltage_to_log, current_state, duration)
-            print(f"Program stopped. Final {current_state} duration: {duration:.3f} seconds. Line Voltage: {final_voltage_to_log:.3f}Vrms")
-
-        # Create Excel file from log file.
-        if user_path and datafile_name:
+        if machine:
+            report_events([machine.finish(datetime.datetime.now())])
+        if context is not None:
+            context.close()
+        if waveform_store is not None:
+            waveform_store.close()
+            print(waveform_store.report())
+        if dashboard is not None:
+            dashboard.close()
+        if ring is not None:
+            ring.close()
+
+        # Create Excel file from the last log segment (earlier segments were exported when they closed).
+        if event_log is not None:
             print("Creating mirror Excel data file...")
-            write_to_excel(datafile_name, user_path)
+            event_log.close()
+            if len(event_log.segments) > 1:
+                print(f"Log segments: {', '.join(os.path.basename(p) for p in event_log.segments)}")
+        exporter.shutdown(wait=True)
 
         input("\nExecution complete. Press Enter to exit...")
         
 if __name__ == "__main__":
+    multiprocessing.freeze_support()    # waveform analysis pool in the PyInstaller exe
     main()
\ No newline at end of file
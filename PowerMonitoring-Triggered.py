@@ -7,22 +7,42 @@
 #
 # Saves data to csv file to user path or defaults to the desktop.
 #
+# Main loop is an explicit ARMED -> TRIGGERED -> READING -> REARM state machine. Acquisition is
+# configured once, re-armed with a single command, and all channels are read in one batch.
+# Trigger rate, scope dead time (ACQuire:STATE ON sent until the first reply showing it armed), host time (trigger
+# seen until the re-arm is sent) and missed triggers (trigger_accounting.py, from ACQuire:NUMACq? and trigger times)
+# are reported.
+# The last RING_HOURS of triggered readings are kept in a ring buffer; --ring-file keeps it in a memory-mapped
+# <data file>.ring so it survives a crash.
+#
 # Author: C. Wong XXXXXXXX
 
+import argparse
 import time
 import datetime
+import math
 import os
 import pyvisa
 import threading
-import csv
 import keyboard
 
 from openpyxl import Workbook
 
+from log_reader import read_log
+from scope_session import TimedSession
+from ring_buffer import ReadingRing, capacity_for
+from trigger_accounting import (TriggerAccounting, NUMACQ_QUERY, MISSING_PERIOD_WARNING, parse_numacq,
+                                format_missed, read_source_period)
+
 DEFAULT_IP_ADDRESS = '192.168.1.53'  #default IP, 192.168.1.53, 10.101.100.151
 MAX_VRMS = 50
 ON_THRESHOLD = 3.0  #default trigger levels for 'ON'
 OFF_THRESHOLD = 1.0 #default trigger levels for 'OFF'
+TRIGGER_LEVEL = 2.0 #CH1 trigger level while armed
+POLL_INTERVAL = 0.1 #seconds between ACQuire:STATE? polls while armed
+REPORT_EVERY = 10   #triggers between trigger rate / dead time reports
+RING_HOURS = 2.0    #hours of raw readings kept for event context (at POLL_INTERVAL, at most)
+TRIGGER_SOURCE_PERIOD = None    #seconds between source triggers for missed-trigger counts, None = scope's trigger frequency
 
 # Find user desktop one level down from home (~/* /Desktop) and set up as optional save path
 from glob import glob
@@ -185,7 +205,7 @@ def make_datafile(timestamp, desktoppath: str = DESKTOP): # num_channels removed
                 print(f"Creating new data file: {full_data_path}")
                 with open(full_data_path, "w") as datafile:
                     # UPDATED: Header for duration logging
-                    header = "Event_Count, Start_Time_Absolute, End_Time_Absolute, State, Duration_Seconds"
+                    header = "Event_Count, Start_Time_Absolute, End_Time_Absolute, State, Duration_Seconds, Missed"
                     datafile.write(header + "\n")
             else:
                 print(f"File exist. We will be appending to existing file: {full_data_path}")
@@ -194,18 +214,89 @@ def make_datafile(timestamp, desktoppath: str = DESKTOP): # num_channels removed
         except ValueError:
             print("Invalid path. Please enter a valid path.")
 
-def log_duration_to_file(save_directory, data_file_name, event_count, start_time, end_time, state, duration_seconds):
+def log_duration_to_file(save_directory, data_file_name, event_count, start_time, end_time, state, duration_seconds,
+                         missed=None):
     """
-    Appends duration data to the specified file.
+    Appends duration data to the specified file.  missed is the number of triggers missed during the period (blank if
+    it could not be counted).
     """
     try:
         datafile_and_path = os.path.join(save_directory, data_file_name)
         with open(datafile_and_path, "a") as f:
-            line = f"{event_count:4d}, {start_time.strftime('%Y-%m-%d %H:%M:%S.%f')}, {end_time.strftime('%Y-%m-%d %H:%M:%S.%f')}, {state}, {duration_seconds:9.3f}"
+            line = f"{event_count:4d}, {start_time.strftime('%Y-%m-%d %H:%M:%S.%f')}, {end_time.strftime('%Y-%m-%d %H:%M:%S.%f')}, {state}, {duration_seconds:9.3f}, {format_missed(missed)}"
             f.write(line + "\n")
     except IOError as e:
         print(f"Error appending data to file '{datafile_and_path}': {e}")
 
+def configure_acquisition(instrument):
+    """
+    Configures single sequence acquisition once so re-arming is just ACQuire:STATE ON.
+    """
+    instrument.write("ACQuire:STATE OFF")
+    instrument.write("ACQuire:MODe SAMPLE")
+    instrument.write("ACQuire:STOPAfter SEQuence")
+    instrument.write(f"TRIGger:A:LEVel:CH1 {TRIGGER_LEVEL}")
+    instrument.query("*OPC?")
+
+def read_all_channels(instrument, num_channels):
+    """
+    Reads the RMS value of every channel in one batch (one ';' joined query).
+    Returns a list of bounded Vrms values, NaN for a channel that could not be read.
+    """
+    commands = [f":MEASUrement:MEAS{i}:VALue?" for i in range(1, num_channels + 1)]
+    v_rms_readings = []
+    for i, response in enumerate(instrument.query_many(commands, compound=True), 1):
+        try:
+            if isinstance(response, Exception):
+                raise response
+            v_rms_readings.append(apply_vrms_bounds(float(response)))
+        except pyvisa.errors.VisaIOError as e:
+            print(f"Error reading RMS for Channel {i}: {e}. Skipping this channel for this sample.")
+            v_rms_readings.append(float('NAN'))
+        except ValueError:
+            print(f"Could not convert RMS reading for Channel {i} to float. Skipping.")
+            v_rms_readings.append(float('NAN'))
+    return v_rms_readings
+
+class TriggerMetrics:
+    """
+    Trigger rate, scope dead time (re-arm sent until the scope reports armed), host time (trigger detected until the
+    re-arm is sent: measurement reads) and missed triggers.
+    """
+    def __init__(self, nominal_period=None):
+        self.start = time.perf_counter()
+        self.accounting = TriggerAccounting(nominal_period)
+        self.triggers = 0
+        # Running count / total / max, so a long run keeps no per-trigger lists
+        self.dead_count = 0
+        self.dead_total = 0.0
+        self.dead_time_max = 0.0
+        self.host_count = 0
+        self.host_total = 0.0
+        self.host_time_max = 0.0
+
+    def add_dead_time(self, seconds):
+        self.dead_count += 1
+        self.dead_total += seconds
+        self.dead_time_max = max(self.dead_time_max, seconds)
+
+    def add_host_time(self, seconds):
+        self.host_count += 1
+        self.host_total += seconds
+        self.host_time_max = max(self.host_time_max, seconds)
+
+    def rate_per_minute(self):
+        elapsed = time.perf_counter() - self.start
+        return 60.0 * self.triggers / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        dead_avg = self.dead_total / self.dead_count if self.dead_count else 0.0
+        host_avg = self.host_total / self.host_count if self.host_count else 0.0
+        return (f"Triggers: {self.triggers}, rate: {self.rate_per_minute():.2f}/min, "
+                f"scope re-arm dead time avg: {dead_avg * 1000:.1f} ms, max: {self.dead_time_max * 1000:.1f} ms, "
+                f"host time trigger to re-arm avg: {host_avg * 1000:.1f} ms, max: {self.host_time_max * 1000:.1f} ms. "
+                f"{self.accounting.report()}")
+
 def apply_vrms_bounds(number: float) -> float:
     """
     Applies upper and lower bounds to the Vrms reading.
@@ -231,37 +322,20 @@ def write_to_excel(datafile_name: str, save_directory: str): # num_channels remo
     ws.title = "Power Monitoring Durations"
 
     try:
-        with open(full_csv_path, 'r') as f:
-            reader = csv.reader(f)
-            # Write header row
-            header = next(reader)
-            ws.append(header)
-
-            # Write data rows and convert to numbers, then format cells
-            row_count = 1 # To track actual row in Excel, starting from 1 for headers
-            for row in reader:
-                row_count += 1 # Increment for data rows
-                processed_row = []
-                # Event_Count, Start_Time_Absolute, End_Time_Absolute, State, Duration_Seconds
-                for i, value in enumerate(row):
-                    if i == 0:  # Event_Count
-                        try:
-                            num_value = int(value)
-                            processed_row.append(num_value)
-                        except ValueError:
-                            processed_row.append(value)
-                    elif i in [1, 2]: # Start_Time_Absolute, End_Time_Absolute - keep as strings for now or convert to datetime objects if needed for excel, but direct plotting might be tricky
-                        processed_row.append(value)
-                    elif i == 3: # State
-                        processed_row.append(value)
-                    elif i == 4: # Duration_Seconds
-                        try:
-                            num_value = float(value)
-                            processed_row.append(num_value)
-                            ws.cell(row=row_count, column=i+1).number_format = '0.000'
-                        except ValueError:
-                            processed_row.append(None) # Append None for invalid duration values
-                ws.append(processed_row)
+        # Typed columns in one pass (log_reader.py): Event_Count int, Start/End datetime, State str, Duration float
+        log = read_log(full_csv_path)
+        ws.append(log.names)
+        for row in log.rows():
+            ws.append(row)
+        for c_idx, name in enumerate(log.names, 1):
+            if log[name].dtype.kind == "M":
+                number_format = 'yyyy-mmm-dd hh:mm:ss.000'
+            elif name == "Duration_Seconds":
+                number_format = '0.000'
+            else:
+                continue
+            for (cell,) in ws.iter_rows(min_row=2, min_col=c_idx, max_col=c_idx):
+                cell.number_format = number_format
         wb.save(full_excel_path)
         print(f"Excel data saved successfully to: {full_excel_path}")
 
@@ -271,8 +345,15 @@ def write_to_excel(datafile_name: str, save_directory: str): # num_channels remo
         print(f"An error occurred while creating the Excel file: {e}")
 
 # ************** MAIN    
+parser = argparse.ArgumentParser(description="Monitor triggered ON/OFF events on a Tek scope")
+parser.add_argument('--ring-file', action='store_true',
+                    help='Keep the raw readings ring in a memory-mapped file next to the data file (survives a crash)')
+args = parser.parse_args()
+
 rm = None
 connected_instrument = None
+metrics = None
+ring = None
 
 try:
     num_channels_to_monitor = 0
@@ -289,6 +370,8 @@ try:
     # Initialize the Resource Manager
     rm = pyvisa.ResourceManager()
     connected_instrument = connect_to_instrument(rm, DEFAULT_IP_ADDRESS)
+    if connected_instrument is not None:
+        connected_instrument = TimedSession(connected_instrument)   # timed queries, batch reads
     if connected_instrument is None:
         print("Failed to connect to the instrument. Exiting.")
         exit() # Exit if connection failed
@@ -314,43 +397,71 @@ try:
     datafile_name = paths[1]
     full_data_path = os.path.join(user_path, datafile_name)
     print("Created file for data as ", datafile_name)
+    ring_path = os.path.splitext(full_data_path)[0] + ".ring" if args.ring_file else None
+    ring = ReadingRing(capacity_for(RING_HOURS, POLL_INTERVAL), num_channels_to_monitor, ring_path)
 
     # Setting voltage thresholds for ON and OFF states
     print(f"Monitoring for ON (all channels > {ON_THRESHOLD:.2f}Vrms) and OFF (all channels < {OFF_THRESHOLD:.2f}Vrms) states.")
     print("Press 'q' or 'Crtl-C' to stop the program at any time.")
     print("Starting monitoring...")
 
-    # Main loop
+    # Configure acquisition once; from here on re-arm is a single command
+    configure_acquisition(connected_instrument)
+    source_period = TRIGGER_SOURCE_PERIOD or read_source_period(connected_instrument)
+    if source_period is None:
+        print(MISSING_PERIOD_WARNING)
+    elif not TRIGGER_SOURCE_PERIOD:
+        print(f"Trigger source period from the scope: {source_period * 1000:.3f} ms")
+    metrics = TriggerMetrics(source_period)
+    period_missed = None    # triggers missed during the current state period (Missed column), None = unknown
+    trigger_seen_time = None
+    pending_readings = None
+    acq_state = "REARM"
+
+    # Main loop (state machine): ARMED -> TRIGGERED -> READING -> REARM -> ARMED
     while not stop_program_event.is_set():
-        time.sleep(0.1) # Small delay for keyboard input before checking if scope triggered
-        Status = connected_instrument.query('ACQuire:STATE?').strip()
-
-        if Status == '0' :  
-            # Scope triggered; turn off by setting super high level
-            connected_instrument.write("ACQuire:STATE OFF")
-            connected_instrument.write("TRIGger:A:LEVel:CH1 5")  # reset trigger level
-            print("Status = " , Status, ". Scope triggered.")
-            event_counter += 1
-            print("Trigger count- ", event_counter)
-            current_time = datetime.datetime.now()
-
-            # Read measurements
-            v_rms_readings = []
-            for i in range(1, num_channels_to_monitor + 1):
-                try:
-                    v_rms = float(connected_instrument.query(f"MEASUrement:MEAS{i}:VALue?"))
-                    # Apply bounds using the new routine call
-                    v_rms = apply_vrms_bounds(v_rms)
-                    v_rms_readings.append(v_rms)
-                except pyvisa.errors.VisaIOError as e:
-                    print(f"Error reading RMS for Channel {i}: {e}. Skipping this channel for this sample.")
-                    v_rms_readings.append(float('NAN')) # Append NaN if reading fails
-                except ValueError:
-                    print(f"Could not convert RMS reading for Channel {i} to float. Skipping.")
-                    v_rms_readings.append(float('NAN'))
+        if acq_state == "ARMED":
+            Status = connected_instrument.query('ACQuire:STATE?').strip()
+            if Status == '0':
+                acq_state = "TRIGGERED"
+            else:
+                time.sleep(POLL_INTERVAL)  # Small delay for keyboard input before checking again
+
+        elif acq_state == "TRIGGERED":
+            trigger_seen_time = time.perf_counter()
+            current_time = connected_instrument.sample_time()
+            metrics.triggers += 1
+            missed = metrics.accounting.update(parse_numacq(connected_instrument.query(NUMACQ_QUERY)),
+                                               trigger_seen_time)
+            print("Scope triggered. Trigger count- ", metrics.triggers, ", missed since last- ", format_missed(missed) or "n/a")
+            if missed is not None:
+                period_missed = (period_missed or 0) + missed
+            acq_state = "READING"
+
+        elif acq_state == "READING":
+            pending_readings = read_all_channels(connected_instrument, num_channels_to_monitor)
+            ring.append(current_time.timestamp(), pending_readings)
+            acq_state = "REARM"
+
+        elif acq_state == "REARM":
+            # Re-arm first; the readings are evaluated and logged while the scope waits for the next trigger
+            rearm_sent_time = time.perf_counter()
+            if trigger_seen_time is not None:
+                metrics.add_host_time(rearm_sent_time - trigger_seen_time)
+                trigger_seen_time = None
+            connected_instrument.write("ACQuire:STATE ON")
+            # Commands run in order, so the first state reply is after the re-arm: '1' armed, '0' already
+            # triggered again (armed in between).  Either way the scope was ready by then.
+            Status = connected_instrument.query('ACQuire:STATE?').strip()
+            metrics.add_dead_time(time.perf_counter() - rearm_sent_time)
+            acq_state = "TRIGGERED" if Status == '0' else "ARMED"
+            if pending_readings is None:
+                continue
+            v_rms_readings = pending_readings
+            pending_readings = None
 
             # Check if any readings are NaN, if so, we can't determine state reliably
-            if any(v == float('NAN') for v in v_rms_readings):
+            if any(math.isnan(v) for v in v_rms_readings):
                 print("Warning: Skipping state evaluation due to invalid Vrms readings.")
                 continue
 
@@ -372,7 +483,9 @@ try:
                     new_state = "ON"
                     duration = (current_time - last_state_change_time).total_seconds()
                     event_counter += 1
-                    log_duration_to_file(user_path, datafile_name, event_counter, last_state_change_time, current_time, "OFF", duration)
+                    log_duration_to_file(user_path, datafile_name, event_counter, last_state_change_time, current_time, "OFF", duration,
+                                         period_missed)
+                    period_missed = None
                     print(f"State Change: OFF to ON. Previous OFF duration: {duration:.3f} seconds.")
                     current_state = new_state
                     last_state_change_time = current_time
@@ -383,7 +496,9 @@ try:
                     new_state = "OFF"
                     duration = (current_time - last_state_change_time).total_seconds()
                     event_counter += 1
-                    log_duration_to_file(user_path, datafile_name, event_counter, last_state_change_time, current_time, "ON", duration)
+                    log_duration_to_file(user_path, datafile_name, event_counter, last_state_change_time, current_time, "ON", duration,
+                                         period_missed)
+                    period_missed = None
                     print(f"State Change: ON to OFF. Previous ON duration: {duration:.3f} seconds.")
                     current_state = new_state
                     last_state_change_time = current_time
@@ -394,17 +509,8 @@ try:
                 print_output += f"CH{i+1}: {v_rms:6.3f}Vrms "
             print(print_output + f" -> State: {current_state}")
 
-            # ready next trigger
-            connected_instrument.write("ACQuire:STATE ON")
-            time.sleep(1)  # wait before checking again
-
-        elif Status == '1': # Still awaiting trigger
-            print ("not triggered")
-            connected_instrument.write("ACQuire:MODe SAMPLE")
-            connected_instrument.write("ACQuire:STOPAfter SEQuence")
-            connected_instrument.write("TRIGger:A:LEVel:CH1 2.0") # Revise trigger level and verify triggered
-            connected_instrument.write("ACQuire:STATE ON")
-            time.sleep(2)
+            if metrics.triggers % REPORT_EVERY == 0:
+                print(metrics.report())
 
 except KeyboardInterrupt:
     print("\nProgram terminated by user (Ctrl+C).")
@@ -426,6 +532,10 @@ finally:
             print("Resource Manager closed.")
         except Exception as e:
             print(f"Error closing Resource Manager: {e}")
+    if metrics:
+        print(metrics.report())
+    if ring is not None:
+        ring.close()
 
     # Before exiting, log the duration of the final state if it was not already logged
     if current_state != "UNKNOWN":
@@ -23,10 +23,17 @@ import os
 import datetime
 import keyboard
 
+# Local modules
+from image_store import ImageStore
+from trigger_accounting import (TriggerAccounting, NUMACQ_QUERY, MISSING_PERIOD_WARNING, parse_numacq,
+                                format_missed, read_source_period)
+
 
 # Configure visaResourceAddr, e.g., '10.101.100.151', '10.101.100.236', '10.101.100.254', '10.101.100.176' 
 visaResourceAddr = '192.168.1.53'     # CHANGE FOR YOUR PARTICULAR SCOPE!
 savePath = "C:\\Users\\Calvert.Wong\\OneDrive - qsc.com\\Desktop\\DATA"       # CHANGE TO YOUR PREFERRED DESTINATION
+triggerSourcePeriod = None  # seconds between source triggers for the missed-trigger count, None = read the scope's
+                            # trigger frequency counter (Missed blank if it has no reading, e.g. aperiodic)
 
 
 def set_up_scope(device):
@@ -94,6 +101,14 @@ with DeviceManager(verbose=True) as device_manager:
 
     # Set up scope capture for specific event(s)
     set_up_scope(scope)
+
+    # Source period for the missed-trigger count (each single sequence re-arm resets the acquisition counter)
+    sourcePeriod = triggerSourcePeriod or read_source_period(scope)
+    if sourcePeriod is None:
+        print(MISSING_PERIOD_WARNING)
+    elif not triggerSourcePeriod:
+        print(f"Trigger source period from the scope: {sourcePeriod * 1000:.3f} ms")
+    accounting = TriggerAccounting(sourcePeriod)     # triggers missed while saving/sleeping (Missed column)
     
     # Generate a filename based on the current date & time
     dt = datetime.datetime.now()
@@ -104,11 +119,12 @@ with DeviceManager(verbose=True) as device_manager:
 
     # Create save directory if it doesn't exist
     os.makedirs(savePath, exist_ok=True)
+    imageStore = ImageStore(savePath)   # images stored once per content, manifest maps count/time to hash
     print(f"Data and images will be saved to: {savePath}")
     print("-" * 30)
     # Create data file with header
     with open(os.path.join(savePath , fileName), "w") as datafile:
-        datafile.write("Count, Time, Vpk2pk, Vrms\n")
+        datafile.write("Count, Time, Vpk2pk, Vrms, Missed\n")
         datafile.close()
 
         # Trigger Capture Loop
@@ -117,6 +133,7 @@ with DeviceManager(verbose=True) as device_manager:
             # Check if user keyboard press
             if keyboard.is_pressed('q'):
                 print("Loop terminated by user.")
+                print(accounting.report())
                 break
 
             Status = scope.query('ACQuire:STATE?')
@@ -133,12 +150,14 @@ with DeviceManager(verbose=True) as device_manager:
                 # Get measured data and display for user
                 Vp2p = float(scope.query("MEASUREMENT:MEAS1:VALue?"))
                 Vrms = float(scope.query("MEASUREMENT:MEAS2:VALue?"))
+                # Acquisition counter before re-arm; missed = triggers since the last capture we did not see
+                missed = accounting.update(parse_numacq(scope.query(NUMACQ_QUERY)), dt.timestamp())
 
-                print(f"counter: {counter} Vpk2pk: {Vp2p:.3f}, Vrms: {Vrms:.3f}")
+                print(f"counter: {counter} Vpk2pk: {Vp2p:.3f}, Vrms: {Vrms:.3f}, missed: {format_missed(missed) or 'n/a'}")
 
                 # Append measured data to data file
                 with open(os.path.join(savePath , fileName), "a") as datafile:
-                    datafile.write(f"{counter:4.0f}, {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}, {Vp2p:.3f}, {Vrms:.3f}\n")
+                    datafile.write(f"{counter:4.0f}, {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}, {Vp2p:.3f}, {Vrms:.3f}, {format_missed(missed)}\n")
                     datafile.close()
 
                 # Grab screenshot and save to file
@@ -147,11 +166,8 @@ with DeviceManager(verbose=True) as device_manager:
                 scope.write('HARDCOPY:PORT ETHERNET')
                 scope.write('HARDCopy START')
                 raw_data = scope.read_raw()
-                imgfileName = dt.strftime("%Y%m%d_%H.%M.%S.png")
-                imgfilePath = os.path.join(savePath , imgfileName)
-                fid = open(imgfilePath, 'wb')
-                fid.write(raw_data)
-                fid.close()
+                digest, imgfilePath, isNew = imageStore.put(raw_data, counter, dt)
+                print(f"Image {digest[:12]} " + ("saved to " + imgfilePath if isNew else "unchanged (already stored)"))
                 # CAUTION- This routine tested on DPO4 series only.  Not tested on newer scopes.
                 # HARDCOPY may be depricated on newer scopes.
                 # SHOULD WORK BUT DOESN'T.. . is scope.save_screenshot("example.png")
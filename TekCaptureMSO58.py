@@ -1,7 +1,11 @@
 # For MSO58 Series Scope   (MSO5B and higher, not DPO4KB)
 # Connect to scope to set up, trigger and wait, and save measurements and image
 # at triggered events.
-# Currently speed is limited to 1 second with constant MIN_ACQUISITION_INTERVAL
+# The pipelined loop (capture_pipeline.py, PIPELINED = True) re-arms right after the measurement
+# snapshot and logs/saves images in background stages; MAX_ACQUISITION_RATE optionally caps the
+# trigger rate and IMAGE_INTERVAL the screenshot rate.  The original serial loop (PIPELINED = False) is limited to one trigger per
+# MIN_ACQUISITION_INTERVAL.  Compare both with bench_capture.py.
+# Both loops count triggers missed since the previous capture (trigger_accounting.py, Missed column).
 # Also, scope setup is programmatically setup with routine setup_scope() which
 # can be commented out if you rather want to use the scope's front panel.
 
@@ -14,6 +18,12 @@ import threading # Import the threading module
 from tm_devices import DeviceManager
 from tm_devices.drivers import MSO5B
 
+from image_store import ImageStore
+from scope_files import save_screenshot, transfer_report
+from capture_pipeline import CapturePipeline
+from trigger_accounting import (TriggerAccounting, NUMACQ_QUERY, MISSING_PERIOD_WARNING, parse_numacq,
+                                format_missed, read_source_period)
+
 # Global flag to signal the main loop and threads to stop
 stop_program_event = threading.Event()
 
@@ -66,7 +76,8 @@ def setup_scope(scope_device: MSO5B):
     print("Scope setup complete.")
     
 
-def capture_data_and_image(scope_device, save_directory: str, data_file_name: str, counter: int):
+def capture_data_and_image(scope_device, save_directory: str, data_file_name: str, counter: int, image_store: ImageStore,
+                           accounting: TriggerAccounting):
     """
     Captures measurement data and an oscilloscope screen image.
 
@@ -75,6 +86,8 @@ def capture_data_and_image(scope_device, save_directory: str, data_file_name: st
         save_directory: The directory path to save data and images.
         data_file_name: The name of the data file (e.g., "YYYYMMDD.txt").
         counter: The current trigger counter.
+        image_store: Content-addressed store for the screenshots (identical images kept once).
+        accounting: Missed-trigger accounting (acquisition counter read before the next re-arm).
 
     Returns:
         A tuple containing the updated counter and the current datetime object.
@@ -88,34 +101,30 @@ def capture_data_and_image(scope_device, save_directory: str, data_file_name: st
         v_peak_to_peak = 999
     if v_rms > 999:
         v_rms = 999
-    print(f"Count: {counter}, Vpk2pk: {v_peak_to_peak:.3f}, Vrms: {v_rms:.3f}")
+    missed = accounting.update(parse_numacq(scope_device.query(NUMACQ_QUERY)), current_dt.timestamp())
+    print(f"Count: {counter}, Vpk2pk: {v_peak_to_peak:.3f}, Vrms: {v_rms:.3f}, Missed: {format_missed(missed) or 'n/a'}")
 
     # Append measured data to the data file
     try:
         data_full_path = os.path.join(save_directory, data_file_name)
         with open(data_full_path, "a") as f:
-            f.write(f"{counter:4.0f}, {current_dt.hour:02d}:{current_dt.minute:02d}:{current_dt.second:02d}, {v_peak_to_peak:.3f}, {v_rms:.3f}\n")
+            f.write(f"{counter:4.0f}, {current_dt.hour:02d}:{current_dt.minute:02d}:{current_dt.second:02d}, {v_peak_to_peak:.3f}, {v_rms:.3f}, {format_missed(missed)}\n")
     except IOError as e:
         print(f"Error appending data to file '{data_full_path}': {e}")
 
-    # Save image to a temporary path on the instrument's internal drive
-    temp_image_path_on_scope = "C:/Temp.png"
-    scope_device.write(f'SAVE:IMAGe "{temp_image_path_on_scope}"')
-    time.sleep(0.2)
-    scope_device.write('FILESystem:READfile \"C:/Temp.png\"')
-    image_data = scope_device.read_raw()
-
-    # Generate a unique filename for the image on the local disk
-    image_file_name = os.path.join(save_directory, f"{current_dt.strftime('%Y%m%d_%H%M%S')}.png")
-    print(f'Saving image to: {image_file_name}')
+    # Save image to a temporary path on the instrument's internal drive (waits on *OPC?), stream it back, delete it
+    image_data, transfer = save_screenshot(scope_device, scope_path="C:/Temp.png")
+    print(f"Image transfer: {transfer_report(transfer)}")
 
-    # Save image data to local disk
+    # Save image data to local disk by content hash (manifest records count and time)
     try:
-        with open(image_file_name, "wb") as f:
-            f.write(image_data)
-            f.close()
+        digest, image_file_name, is_new = image_store.put(image_data, counter, current_dt)
+        if is_new:
+            print(f'Saving image to: {image_file_name}')
+        else:
+            print(f'Image unchanged, already stored as: {image_file_name}')
     except IOError as e:
-        print(f"Error saving image file '{image_file_name}': {e}")
+        print(f"Error saving image for count {counter}: {e}")
         # Return current counter and datetime if image saving fails
         return counter, current_dt
     return counter + 1, current_dt
@@ -146,10 +155,16 @@ if __name__ == "__main__":
     # Configure visaResourceAddr, e.g., '192.168.1.53', '10.101.100.151', '10.101.100.236', '10.101.100.254', '10.101.100.176'
     VISA_RESOURCE_ADDRESS = '10.101.100.151'   # CHANGE FOR YOUR PARTICULAR SCOPE!
     SAVE_PATH = r"C:\Users\Calvert.Wong\OneDrive - qsc.com\Desktop\ScopeData" # Ensure this direqctory exists or create it
-    MIN_ACQUISITION_INTERVAL = 1.0  #Desired minimum delay time in seconds between acquisitions
+    PIPELINED = True                # overlapped re-arm pipeline; False for the original serial loop
+    MAX_ACQUISITION_RATE = None     # pipelined: cap in triggers per second, None = as fast as the scope re-arms
+    IMAGE_INTERVAL = 1.0            # pipelined: minimum seconds between screenshots, 0 = every trigger, None = no images
+    MIN_ACQUISITION_INTERVAL = 1.0  # serial: desired minimum delay time in seconds between acquisitions
+    TRIGGER_SOURCE_PERIOD = None    # seconds between source triggers for missed-trigger counts, None = read the scope's
+                                    # trigger frequency counter (Missed blank if it has no reading, e.g. aperiodic)
 
     # Create save directory if it doesn't exist
     os.makedirs(SAVE_PATH, exist_ok=True)
+    image_store = ImageStore(SAVE_PATH)
     print(f"Data and images will be saved to: {SAVE_PATH}")
     print("-" * 30)
 
@@ -158,13 +173,14 @@ if __name__ == "__main__":
     # Create an Event object to signal when the minimum interval has passed
     acquisition_allowed_event = threading.Event()
 
-    # Start the timer thread
+    # Start the timer thread (serial loop only)
     timer_thread = threading.Thread(
         target=timer_thread_func,
         args=(acquisition_allowed_event, MIN_ACQUISITION_INTERVAL, stop_program_event),
         daemon=True # Daemon threads exit automatically when the main program exits
     )
-    timer_thread.start()
+    if not PIPELINED:
+        timer_thread.start()
 
     # Register the 'q' hotkey
     keyboard.add_hotkey('q', on_q_press)
@@ -182,6 +198,13 @@ if __name__ == "__main__":
             # Configure scope settings for capture
             setup_scope(scope)
 
+            # Source period for the missed-trigger counts (single sequence re-arms reset the acquisition counter)
+            source_period = TRIGGER_SOURCE_PERIOD or read_source_period(scope)
+            if source_period is None:
+                print(MISSING_PERIOD_WARNING)
+            elif not TRIGGER_SOURCE_PERIOD:
+                print(f"Trigger source period from the scope: {source_period * 1000:.3f} ms")
+
             # Generate a filename for the data based on start date and time
             data_log_file_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S.txt")
             full_data_path = os.path.join(SAVE_PATH, data_log_file_name)
@@ -190,14 +213,27 @@ if __name__ == "__main__":
             if not os.path.exists(full_data_path):
                 print(f"Creating new data file: {full_data_path}")
                 with open(full_data_path, "w") as datafile:
-                    datafile.write("Count, Time, Vpk2pk, Vrms\n")
+                    datafile.write("Count, Time, Vpk2pk, Vrms, Missed\n")
             else:
                 print(f"Appending to existing data file: {full_data_path}")
 
             print("Scope acquisition starting. Press 'q' to quit.")
 
-            # Main loop
-            while  not stop_program_event.is_set():
+            # Pipelined loop: snapshot measurements, re-arm, log and save images downstream
+            if PIPELINED:
+                pipeline = CapturePipeline(scope, SAVE_PATH, data_log_file_name,
+                                           image_store if IMAGE_INTERVAL is not None else None,
+                                           max_rate=MAX_ACQUISITION_RATE, nominal_period=source_period,
+                                           image_interval=IMAGE_INTERVAL or 0.0)
+                try:
+                    pipeline.run(stop_program_event)
+                finally:
+                    pipeline.close()
+                    print(pipeline.report())
+
+            # Serial loop
+            accounting = TriggerAccounting(source_period)
+            while not PIPELINED and not stop_program_event.is_set():
                 # Wait for the minimum acquisition interval to pass before arming
                 print(f"Waiting for MIN_ACQUISITION_INTERVAL ({MIN_ACQUISITION_INTERVAL}s)...")
                 acquisition_allowed_event.wait(timeout=0.1) # This will block until the timer thread sets the event
@@ -228,8 +264,10 @@ if __name__ == "__main__":
 
                 # Triggered event occurred, capture data and image
                 trigger_counter, _ = capture_data_and_image(
-                    scope, SAVE_PATH, data_log_file_name, trigger_counter
+                    scope, SAVE_PATH, data_log_file_name, trigger_counter, image_store, accounting
                 )
+            if not PIPELINED:
+                print(accounting.report())
 
     except pyvisa.errors.VisaIOError as e:
         print(f"VISA I/O Error: {e}")
@@ -0,0 +1,250 @@
+"""
+Acquisition Pipeline
+
+Description- Producer/consumer split of a monitor loop: an acquisition thread and consumer stages on bounded queues.
+
+In a single-threaded monitor loop every slow step (console output, file append, Excel export, a slow disk) delays
+the next instrument read.  Here
+    producer   AcquisitionPipeline's thread only calls acquire(), which talks to the instrument and timestamps the
+               readings, and passes every result on
+    stages     each Stage is one thread with a bounded queue that runs its handler on the items it gets and passes
+               the handler's result on to the stages connected after it (e.g. evaluate -> log, display)
+so the acquisition timing depends on the instrument only.
+
+A full queue either
+    waits      (default) the sender waits for room, i.e. back-pressure: nothing is lost, and an overloaded stage
+               eventually slows the producer instead of growing memory
+    drops      (lossy=True) the oldest queued item is dropped so the sender never waits, e.g. for a display
+and both are counted per stage (waits / wait seconds / drops, plus the deepest the queue got), see metrics().
+
+Stages that also need the instrument (e.g. a waveform capture) share an InstrumentLock with acquire().  While a stage
+holds it the producer is blocked, so the lock counts the seconds each holder kept it and waited for it, and they are
+reported with the stage counters (lock_<holder>_held_s / lock_<holder>_waited_s); the producer's waits are time the
+instrument was not being read.
+
+Example:
+    evaluate = Stage("evaluate", lambda reading: machine.step(*reading))
+    log = Stage("log", write_rows)
+    display = Stage("display", show, maxsize=8, lossy=True)
+    evaluate.connect(log, display)
+    io_lock = InstrumentLock()      # read_scope() does its I/O in 'with io_lock.hold("acquire"):'
+    pipeline = AcquisitionPipeline(read_scope, [evaluate, log, display], stop_event, lock=io_lock).connect(evaluate)
+    pipeline.start()
+    pipeline.wait()         # until stop_event is set (Ctrl+C still reaches the main thread)
+    pipeline.close()        # stages finish their queues, upstream first
+    print(pipeline.report())
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_QUEUE_SIZE = 1024
+_STOP = object()        # end of a stage's input
+
+
+class Stage:
+    """
+    One consumer thread with a bounded input queue.
+
+    Args:
+        name: Stage name (thread name, metrics prefix).
+        handler: Called with every item, in this stage's thread.  A result other than None is passed on to the
+            stages connected with connect().  An exception is printed and counted, and the item skipped.
+        maxsize: Queue bound (items).
+        lossy: True drops the oldest queued item when the queue is full, False makes the sender wait for room.
+    """
+    def __init__(self, name, handler, maxsize=DEFAULT_QUEUE_SIZE, lossy=False):
+        self.name = name
+        self.handler = handler
+        self.lossy = lossy
+        self.outputs = []
+        self.processed = 0
+        self.errors = 0
+        self.dropped = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_depth = 0
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def connect(self, *stages):
+        """Passes this stage's results on to stages.  Returns self."""
+        self.outputs.extend(stages)
+        return self
+
+    def put(self, item):
+        """Queues an item (sender's thread)."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.lossy:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                self._queue.put(item)
+            else:
+                self.waits += 1
+                t_wait = time.perf_counter()
+                self._queue.put(item)
+                self.wait_seconds += time.perf_counter() - t_wait
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        """Finishes the queued items, then stops the thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error in {self.name} stage: {e}")
+                continue
+            self.processed += 1
+            if result is not None:
+                for stage in self.outputs:
+                    stage.put(result)
+
+    def metrics(self):
+        return {f"{self.name}_queued": self._queue.qsize(), f"{self.name}_max_queued": self.max_depth,
+                f"{self.name}_waits": self.waits, f"{self.name}_wait_s": round(self.wait_seconds, 3),
+                f"{self.name}_dropped": self.dropped}
+
+
+class InstrumentLock:
+    """
+    Lock for instrument I/O shared by the producer and stages, counting per holder name the seconds it was held and
+    the seconds spent waiting for it.
+    """
+    def __init__(self):
+        self.held = {}
+        self.waited = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, name):
+        """with lock.hold("analysis"): ... runs the block holding the lock, counted under name."""
+        t_wait = time.perf_counter()
+        self._lock.acquire()
+        t_held = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Counted before the release, so the counters are only updated under the lock
+            self.waited[name] = self.waited.get(name, 0.0) + t_held - t_wait
+            self.held[name] = self.held.get(name, 0.0) + time.perf_counter() - t_held
+            self._lock.release()
+
+    def metrics(self):
+        values = {}
+        for name in list(self.held):
+            values[f"lock_{name}_held_s"] = round(self.held[name], 3)
+            values[f"lock_{name}_waited_s"] = round(self.waited[name], 3)
+        return values
+
+
+class AcquisitionPipeline:
+    """
+    Args:
+        acquire: Called repeatedly in the acquisition thread; returns an item for the connected stages, or None for
+            nothing (e.g. a failed read).  Only acquire() should talk to the instrument.
+        stages: Every consumer stage, upstream first (the order they are started and drained in).
+        stop_event: threading.Event that ends acquisition when set (a new one if None).
+        name: Acquisition thread name.
+        lock: InstrumentLock shared by acquire() and the stages that use the instrument, reported with the stages
+            (None if only acquire() uses it).
+    """
+    def __init__(self, acquire, stages, stop_event=None, name="acquire", lock=None):
+        self.acquire = acquire
+        self.lock = lock
+        self.stages = list(stages)
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.outputs = []
+        self.produced = 0
+        self.error = None
+        self.start_time = None
+        self._thread = threading.Thread(target=self._produce, name=name, daemon=True)
+
+    def connect(self, *stages):
+        """Passes acquired items on to stages.  Returns self."""
+        self.outputs.extend(stages)
+        return self
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        for stage in self.stages:
+            stage.start()
+        self._thread.start()
+
+    def _produce(self):
+        try:
+            while not self.stop_event.is_set():
+                item = self.acquire()
+                if item is None:
+                    continue
+                self.produced += 1
+                for stage in self.outputs:
+                    stage.put(item)
+        except Exception as e:
+            self.error = e          # re-raised by wait()
+            self.stop_event.set()
+
+    def wait(self, poll=0.2):
+        """
+        Waits in the caller's thread until acquisition stops.  Re-raises an exception from acquire().
+        """
+        while self._thread.is_alive():
+            self._thread.join(poll)     # short joins so Ctrl+C still reaches the main thread
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """Stops acquisition, then lets every stage finish its queue, upstream first."""
+        self.stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        for stage in self.stages:
+            stage.close()
+
+    # ************** Metrics
+    def metrics(self):
+        """Flat dict of the producer and stage counters (e.g. for the dashboard snapshot)."""
+        values = {"produced": self.produced}
+        for stage in self.stages:
+            values.update(stage.metrics())
+        if self.lock is not None:
+            values.update(self.lock.metrics())
+        return values
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        rate = self.produced / elapsed if elapsed > 0 else 0.0
+        lines = [f"Acquired: {self.produced} ({rate:.2f}/s)"]
+        for stage in self.stages:
+            lines.append(f"  {stage.name:10s} processed: {stage.processed}, errors: {stage.errors}, "
+                         f"max queued: {stage.max_depth}, waits: {stage.waits} ({stage.wait_seconds:.3f} s), "
+                         f"dropped: {stage.dropped}")
+        if self.lock is not None and self.lock.held:
+            lines.append("  instrument lock  " + "; ".join(
+                f"{name}: held {held:.3f} s, waited {self.lock.waited[name]:.3f} s"
+                for name, held in list(self.lock.held.items())))
+        return "\n".join(lines)
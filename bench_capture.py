@@ -0,0 +1,125 @@
+"""
+Bench Capture
+
+Description- Benchmark of the TekCaptureMSO58 capture loops against a simulated repetitive trigger source (SimScope).
+
+Runs for --seconds each:
+    serial            the original loop: measurements, CSV append, image save + read + write, timer tick, re-arm
+    serial, no floor  the same without the MIN_ACQUISITION_INTERVAL wait
+    pipelined         capture_pipeline.CapturePipeline (re-arm right after the measurement snapshot)
+and prints triggers per second, the average re-arm dead time (acquisition complete seen until re-armed), the
+missed triggers counted by trigger_accounting.py and the true number the source produced.
+
+Example:
+    python bench_capture.py --rate 20 --seconds 10
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import argparse
+import datetime
+import os
+import tempfile
+import threading
+import time
+
+from capture_pipeline import CapturePipeline
+from image_store import ImageStore
+from scope_sim import SimScope
+from trigger_accounting import TriggerAccounting, NUMACQ_QUERY, parse_numacq, format_missed, read_source_period
+
+
+def serial_loop(scope, save_directory, data_file_name, image_store, min_interval, duration, nominal_period=None):
+    """
+    The original TekCaptureMSO58 main loop and capture_data_and_image(), against a SimScope.
+    Returns (triggers, average dead time, TriggerAccounting).
+    """
+    data_path = os.path.join(save_directory, data_file_name)
+    accounting = TriggerAccounting(nominal_period)
+    counter = 0
+    dead_times = []
+    last_tick = time.perf_counter()
+    t_end = time.perf_counter() + duration
+    while time.perf_counter() < t_end:
+        # Timer thread: acquisition allowed once per min_interval
+        wait = last_tick + min_interval - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        last_tick = time.perf_counter()
+
+        scope.write("ACQUIRE:STATE 1")
+        while scope.query("ACQUIRE:STATE?").strip() == "1" and time.perf_counter() < t_end:
+            time.sleep(0.05)
+        if time.perf_counter() >= t_end:
+            break
+        t_complete = time.perf_counter()
+
+        current_dt = datetime.datetime.now()
+        counter += 1
+        v_peak_to_peak = min(float(scope.query("MEASUREMENT:MEAS1:VALUE?")), 999)
+        v_rms = min(float(scope.query("MEASUREMENT:MEAS2:VALUE?")), 999)
+        missed = accounting.update(parse_numacq(scope.query(NUMACQ_QUERY)), t_complete)
+        with open(data_path, "a") as f:
+            f.write(f"{counter:4.0f}, {current_dt.hour:02d}:{current_dt.minute:02d}:{current_dt.second:02d}, "
+                    f"{v_peak_to_peak:.3f}, {v_rms:.3f}, {format_missed(missed)}\n")
+        scope.write('SAVE:IMAGe "C:/Temp.png"')
+        time.sleep(0.2)
+        scope.write('FILESystem:READfile "C:/Temp.png"')
+        image_data = scope.read_raw()
+        image_store.put(image_data, counter, current_dt)
+        dead_times.append(time.perf_counter() - t_complete)
+    scope.write("ACQUIRE:STATE 0")
+    return counter, sum(dead_times) / len(dead_times) if dead_times else 0.0, accounting
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs pipelined trigger capture on a simulated scope")
+    parser.add_argument('--rate', type=float, default=20.0, help='Trigger rate of the simulated source (Hz)')
+    parser.add_argument('--seconds', type=float, default=10.0, help='Run time of each loop')
+    parser.add_argument('--rtt', type=float, default=0.002, help='Simulated round trip (s)')
+    parser.add_argument('--image-kb', type=int, default=150, help='Simulated PNG size (kB)')
+    parser.add_argument('--min-interval', type=float, default=1.0, help='MIN_ACQUISITION_INTERVAL of the serial loop')
+    parser.add_argument('--max-rate', type=float, default=None, help='Rate cap of the pipelined loop (triggers/s)')
+    parser.add_argument('--image-interval', type=float, default=0.0,
+                        help='Minimum seconds between screenshots of the pipelined loop (0 = every trigger)')
+    parser.add_argument('--aperiodic', action='store_true',
+                        help='Do not read the source period from the trigger frequency counter (Missed stays blank)')
+    args = parser.parse_args()
+
+    def make_scope():
+        return SimScope(trigger_rate=args.rate, rtt=args.rtt, image_bytes=args.image_kb * 1000)
+
+    nominal_period = None if args.aperiodic else read_source_period(make_scope(), settle_time=0.0)
+    work_dir = tempfile.mkdtemp(prefix="bench_capture_")
+    results = []
+    for name, min_interval in (("serial", args.min_interval), ("serial, no floor", 0.0)):
+        scope = make_scope()
+        t_start = time.perf_counter()
+        count, dead, accounting = serial_loop(scope, work_dir, f"serial_{min_interval}.txt", ImageStore(work_dir),
+                                              min_interval, args.seconds, nominal_period)
+        results.append((name, count, dead, accounting, scope.source_triggers(t_start, time.perf_counter())))
+
+    scope = make_scope()
+    pipeline = CapturePipeline(scope, work_dir, "pipelined.txt", ImageStore(work_dir), max_rate=args.max_rate,
+                               nominal_period=nominal_period, verbose=False, image_interval=args.image_interval)
+    t_start = time.perf_counter()
+    count = pipeline.run(threading.Event(), duration=args.seconds)
+    source = scope.source_triggers(t_start, time.perf_counter())
+    pipeline.close()
+    results.append(("pipelined", count, pipeline.dead_time_mean, pipeline.accounting, source))
+
+    print(f"Source {args.rate:g} Hz, {args.seconds:g} s per loop, RTT {args.rtt * 1000:g} ms, "
+          f"image {args.image_kb} kB (files in {work_dir})")
+    print("loop                triggers   triggers/s   dead time avg (ms)   missed   coverage   source triggers")
+    for name, count, dead, accounting, source in results:
+        coverage = accounting.coverage()
+        missed, coverage = ("n/a", "n/a") if coverage is None else (accounting.missed, f"{coverage * 100:.1f}%")
+        print(f"{name:18s} {count:9d} {count / args.seconds:12.2f} {dead * 1000:20.1f} {missed:>8} "
+              f"{coverage:>10} {source:17d}")
+    print(pipeline.report())
+
+
+if __name__ == "__main__":
+    main()
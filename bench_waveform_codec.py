@@ -0,0 +1,94 @@
+"""
+Bench Waveform Codec
+
+Description- Benchmark of the waveform store codec (waveform_codec.py) on simulated scope records (scope_sim.py).
+
+For every waveform profile and acquisition (8 bit sample mode and 12 bit high-res in 2 byte transfers, 8 bit in
+1 byte transfers) prints, on one core:
+    ratio            raw code bytes / stored bytes (delta codec, and plain zlib of the codes for reference)
+    encode, decode   MB/s of raw codes, whole records (decode of one chunk for random access is also timed)
+    capture          MB/s of raw codes the capture rate produces (--points at --captures per second)
+and whether encoding keeps up with the capture rate.
+
+Example:
+    python bench_waveform_codec.py --points 1000000 --captures 2
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from scope_sim import sim_waveform, WAVEFORM_PROFILES
+from waveform_codec import WaveformWriter, WaveformReader, COMPRESS_LEVEL, CHUNK_POINTS
+
+ACQUISITIONS = (("8 bit, 2 byte", 8, 2), ("12 bit, 2 byte", 12, 2), ("8 bit, 1 byte", 8, 1))
+
+
+def bench(waveform, path, repeats, chunk_points, level):
+    """(ratio, zlib-only ratio, encode MB/s, decode MB/s, one-chunk decode ms) of one record."""
+    if os.path.exists(path):
+        os.remove(path)
+    writer = WaveformWriter(path, chunk_points=chunk_points, level=level)
+    for _ in range(repeats):
+        writer.append(waveform)
+    writer.close()
+    raw = writer.raw_bytes
+    encode_rate = raw / writer.encode_seconds / 1e6
+    ratio = raw / writer.stored_bytes
+    plain = waveform["codes"].nbytes / len(zlib.compress(waveform["codes"].tobytes(), level))
+
+    reader = WaveformReader(path)
+    t_start = time.perf_counter()
+    for index in range(len(reader)):
+        codes = reader.read(index)["codes"]
+    decode_rate = raw / (time.perf_counter() - t_start) / 1e6
+    if not np.array_equal(codes, waveform["codes"]):
+        raise ValueError("Decoded record differs from the original")
+    middle = len(codes) // 2
+    t_start = time.perf_counter()
+    for _ in range(repeats):
+        reader.read(0, middle, middle + 1000)
+    chunk_ms = (time.perf_counter() - t_start) / repeats * 1000
+    return ratio, plain, encode_rate, decode_rate, chunk_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compressed waveform store on simulated records")
+    parser.add_argument('--points', type=int, default=100_000, help='Record length (points)')
+    parser.add_argument('--captures', type=float, default=10.0, help='Records per second the capture produces')
+    parser.add_argument('--repeats', type=int, default=10, help='Records encoded per case')
+    parser.add_argument('--chunk-points', type=int, default=CHUNK_POINTS, help='Points per chunk')
+    parser.add_argument('--level', type=int, default=COMPRESS_LEVEL, help='zlib compression level')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_codec_"), "bench.wfz")
+    print(f"{args.points} point records, {args.captures:g} captures/s, chunks of {args.chunk_points} points, "
+          f"zlib level {args.level}")
+    print("profile  acquisition       ratio   zlib only   encode MB/s   decode MB/s   1k points (ms)   capture MB/s")
+    slowest = None
+    for profile in WAVEFORM_PROFILES:
+        for name, bits, width in ACQUISITIONS:
+            waveform = sim_waveform(profile, points=args.points, bits=bits, width=width)
+            ratio, plain, encode_rate, decode_rate, chunk_ms = bench(waveform, path, args.repeats,
+                                                                     args.chunk_points, args.level)
+            capture_rate = waveform["codes"].nbytes * args.captures / 1e6
+            print(f"{profile:8s} {name:15s} {ratio:7.1f} {plain:11.1f} {encode_rate:13.0f} {decode_rate:13.0f} "
+                  f"{chunk_ms:16.2f} {capture_rate:14.1f}")
+            if slowest is None or encode_rate / capture_rate < slowest[0]:
+                slowest = (encode_rate / capture_rate, profile, name)
+    headroom, profile, name = slowest
+    print(f"Encoding {'keeps up with' if headroom >= 1 else 'FALLS BEHIND'} the capture rate on one core "
+          f"(slowest: {profile}, {name}, {headroom:.1f}x the capture rate)")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
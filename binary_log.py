@@ -0,0 +1,209 @@
+"""
+Binary Log
+
+Description- Compact append-only binary sample log for Power Monitoring-Synchronous, with CSV / XLSX export on demand.
+
+Every sample is one fixed-width little-endian record, written with a single write() to a file kept open, instead of
+a formatted text line appended by open/format/close:
+    Count          uint32
+    Time           float64  scheduled grid time, seconds from the start
+    Vrms_CH1..n    float32  NaN = channel not read
+    Sample_Offset  float32  estimated instrument sample time - Time, seconds
+    Skipped        uint16   grid slots skipped by an overrun before this sample
+    Flags          uint8    FLAG_OVERRUN, FLAG_READ_ERROR
+The file starts with a self-describing header, so it can be read without knowing the run settings:
+    b"SMPLOG01", uint32 length, JSON {"schema", "version", "record" (NumPy dtype description), "channels",
+    "period", "start", ...} padded with blanks to a multiple of 8 bytes
+A run that dies leaves at most a partial last record, which the reader drops.
+
+to_csv() writes the same text the script writes with BINARY_LOG off (Count, Time, Vrms_CH.., Sample_Time, Skipped),
+so the existing Excel export runs on it unchanged.  log_reader.read_log() also loads binary logs directly.
+
+Examples:
+    python binary_log.py 20261019_080000.bin              (writes 20261019_080000.txt)
+    python binary_log.py 20261019_080000.bin --xlsx
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+LOG_MAGIC = b"SMPLOG01"
+LOG_VERSION = 1
+FLAG_OVERRUN = 1        # sample came after skipped grid slots
+FLAG_READ_ERROR = 2     # at least one channel could not be read
+
+
+def record_dtype(num_channels):
+    """Packed record of one sample for num_channels channels."""
+    return np.dtype([("Count", "<u4"), ("Time", "<f8")]
+                    + [(f"Vrms_CH{i}", "<f4") for i in range(1, num_channels + 1)]
+                    + [("Sample_Offset", "<f4"), ("Skipped", "<u2"), ("Flags", "u1")])
+
+
+def _read_header(f):
+    """Header dict and the record dtype.  Raises ValueError if f is not a sample log."""
+    preamble = f.read(12)
+    if len(preamble) < 12 or preamble[:8] != LOG_MAGIC:
+        raise ValueError("Not a binary sample log")
+    length, = struct.unpack("<I", preamble[8:])
+    header = json.loads(f.read(length).decode("utf-8"))
+    header["data_offset"] = 12 + length
+    return header, np.dtype([tuple(field) for field in header["record"]])
+
+
+class SampleLogWriter:
+    """
+    Args:
+        path: Log file.  An existing log with the same channel count is appended to.
+        num_channels: Vrms channels per sample.
+        period: Sample period in seconds (recorded in the header).
+        start_time: datetime of grid time 0 (recorded in the header).
+    """
+    def __init__(self, path, num_channels, period=None, start_time=None):
+        self.path = path
+        self.dtype = record_dtype(num_channels)
+        self.num_channels = num_channels
+        self._struct = struct.Struct("<Id" + "f" * num_channels + "fHB")   # same layout as self.dtype
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                _, dtype = _read_header(f)
+            if dtype != self.dtype:
+                raise ValueError(f"{path} holds a different record layout")
+            self._file = open(path, "ab")
+        else:
+            header = {"schema": "synchronous", "version": LOG_VERSION, "record": self.dtype.descr,
+                      "channels": num_channels, "period": period,
+                      "start": start_time.strftime('%Y-%m-%d %H:%M:%S.%f') if start_time else None}
+            text = json.dumps(header).encode("utf-8")
+            text += b" " * (-(12 + len(text)) % 8)
+            self._file = open(path, "wb")
+            self._file.write(LOG_MAGIC + struct.pack("<I", len(text)) + text)
+            self._file.flush()
+
+    def append(self, count, time_in_seconds, v_rms_values, sample_time_in_seconds, skipped=0):
+        """Appends one sample.  Flags are derived from skipped and NaN readings."""
+        readings = [float(v) for v in v_rms_values[:self.num_channels]]
+        readings += [float("nan")] * (self.num_channels - len(readings))
+        flags = FLAG_OVERRUN if skipped else 0
+        if any(v != v for v in readings):
+            flags |= FLAG_READ_ERROR
+        self._file.write(self._struct.pack(count, time_in_seconds, *readings,
+                                           sample_time_in_seconds - time_in_seconds, min(skipped, 0xFFFF), flags))
+        self._file.flush()      # one write per sample, as durable as the text log's open/append/close
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_samples(path):
+    """
+    Loads a binary sample log.
+
+    Returns:
+        (header dict, structured array of the complete records)
+    """
+    with open(path, "rb") as f:
+        header, dtype = _read_header(f)
+    size = os.path.getsize(path) - header["data_offset"]
+    records = np.fromfile(path, dtype=dtype, count=size // dtype.itemsize, offset=header["data_offset"])
+    return header, records
+
+
+def sample_columns(records):
+    """
+    Columns with the names and types of the text log: Count, Time, Vrms_CH.., Sample_Time, Skipped.
+    """
+    columns = {"Count": records["Count"].astype(np.int64), "Time": records["Time"].astype(np.float64)}
+    for name in records.dtype.names:
+        if name.startswith("Vrms_CH"):
+            columns[name] = records[name].astype(np.float64)
+    columns["Sample_Time"] = records["Time"] + records["Sample_Offset"].astype(np.float64)
+    columns["Skipped"] = records["Skipped"].astype(np.int64)
+    return columns
+
+
+def to_csv(path, csv_path=None):
+    """
+    Writes the text log (Power Monitoring-Synchronous format) of a binary log.  Returns the CSV path.
+    """
+    _, records = read_samples(path)
+    csv_path = csv_path or os.path.splitext(path)[0] + ".txt"
+    columns = sample_columns(records)
+    channels = [name for name in columns if name.startswith("Vrms_CH")]
+    # float32 keeps about 7 significant digits: a reading can differ from the text log in the 3rd decimal only when
+    # it was within a few microvolts of a rounding tie
+    row_format = "%4d, %9.3f" + ", %6.3f" * len(channels) + ", %10.4f, %d"
+    with open(csv_path, "w") as f:
+        f.write(", ".join(["Count", "Time"] + channels + ["Sample_Time", "Skipped"]) + "\n")
+        table = np.empty((len(records), len(columns)), dtype=object)
+        for i, values in enumerate(columns.values()):
+            table[:, i] = values.tolist()
+        for start in range(0, len(table), 65536):
+            f.write("\n".join(row_format % tuple(row) for row in table[start:start + 65536]))
+            f.write("\n")
+    return csv_path
+
+
+def to_xlsx(path, xlsx_path=None):
+    """
+    Writes an Excel workbook (data sheet and Vrms scatter chart) of a binary log.  Returns the XLSX path.
+    """
+    from openpyxl import Workbook
+    from openpyxl.chart import ScatterChart, Reference, Series
+
+    _, records = read_samples(path)
+    xlsx_path = xlsx_path or os.path.splitext(path)[0] + ".xlsx"
+    columns = sample_columns(records)
+    names = list(columns)
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Power Monitoring Data"
+    ws.append(names)
+    for row in zip(*(np.where(np.isnan(values), None, values).tolist() if values.dtype.kind == "f"
+                     else values.tolist() for values in columns.values())):
+        ws.append(row)
+
+    chart = ScatterChart()
+    chart.title = "Vrms Over Time"
+    chart.style = 10
+    chart.x_axis.title = "Time (seconds)"
+    chart.y_axis.title = "Vrms"
+    x_values = Reference(ws, min_col=2, min_row=2, max_row=ws.max_row)
+    for i, name in enumerate(names):
+        if name.startswith("Vrms_CH"):
+            chart.series.append(Series(Reference(ws, min_col=i + 1, min_row=2, max_row=ws.max_row), x_values,
+                                       title=name))
+    chart.x_axis.delete = False
+    chart.y_axis.delete = False
+    ws.add_chart(chart, "E2")
+    wb.save(xlsx_path)
+    return xlsx_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a binary sample log to the CSV (and XLSX) text log")
+    parser.add_argument('log', help='Binary sample log (.bin)')
+    parser.add_argument('--out', default=None, help='CSV file (default: log name with .txt)')
+    parser.add_argument('--xlsx', action='store_true', help='Also write an Excel workbook with a chart')
+    args = parser.parse_args()
+
+    header, records = read_samples(args.log)
+    print(f"{args.log}: {len(records)} samples, {header['channels']} channel(s), period {header['period']} s, "
+          f"start {header['start']}")
+    print(f"CSV written: {to_csv(args.log, args.out)}")
+    if args.xlsx:
+        print(f"XLSX written: {to_xlsx(args.log)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Capture Pipeline
+
+Description- Overlapped trigger capture loop for Tek MSO5/6 (TekCaptureMSO58.py) with minimum re-arm dead time.
+
+The serial loop does measurements, CSV append, image save, image read, local PNG write, waits for the timer tick and
+only then re-arms, so the scope is blind for all of it.  Here the acquisition thread only
+    1. waits for the single sequence to complete (ACQuire:STATE? = 0)
+    2. snapshots the measurements and the acquisition counter (one ';' joined query) for missed-trigger accounting
+    3. waits for the rate cap, if any, and re-arms (ACQuire:STATE 1)
+and hands the rest to two downstream threads:
+    log stage    appends the CSV row
+    image stage  saves the screen on the scope (SAVE:IMAGe, *OPC?), streamed FILESystem:READfile + delete of it
+                 (scope_files.py), image store
+Dead time per trigger is then about two round trips; re-arming only waits on the measurement snapshot.  Screenshots
+are optional (image_store None) and at most one per image_interval seconds.  The screen is saved after the re-arm,
+while a single sequence shows the last completed acquisition, so an image shows the acquisition of the count it is
+stored with unless the next trigger completes before the scope has rendered it (a fast source).  A due screenshot
+while the image stage is still busy with the previous one gets a 'skipped' manifest row (and is counted), so a fast
+source never builds a backlog of scope-side files.  The image stage has the bus while the screen renders and
+transfers, so a completed acquisition is only seen (and re-armed) after that: at high trigger rates every screenshot
+still costs triggers, which image_interval bounds.
+
+Re-arm dead time is kept as a running count, mean and maximum, so a long run holds no per-trigger list.
+
+Scope I/O from the three threads is serialized with one lock.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import os
+import queue
+import threading
+import time
+
+from scope_files import read_file
+from trigger_accounting import TriggerAccounting, NUMACQ_QUERY, parse_numacq, format_missed
+
+MEASUREMENTS = (":MEASUrement:MEAS1:VALue?", ":MEASUrement:MEAS2:VALue?")   # Vpk2pk, Vrms
+MEASUREMENT_LIMIT = 999
+SCOPE_IMAGE_PATH = "C:/Temp.png"
+
+
+class CapturePipeline:
+    """
+    Args:
+        scope: Scope driver or resource (write/query; VISA reads for the image transfer).
+        save_directory: Directory of the data file.
+        data_file_name: CSV data file (Count, Time, Vpk2pk, Vrms, Missed) to append to.
+        image_store: ImageStore for screenshots, or None for no images.
+        image_interval: Minimum seconds between screenshots (0 = every trigger the image stage is free for).
+        max_rate: Cap on triggers per second (None = re-arm as soon as the snapshot is taken).
+        poll_interval: Seconds between ACQuire:STATE? polls while armed.
+        nominal_period: Trigger source period for missed-trigger accounting, None = aperiodic (Missed blank).
+    """
+    def __init__(self, scope, save_directory, data_file_name, image_store=None, max_rate=None,
+                 poll_interval=0.005, nominal_period=None, verbose=True, image_interval=0.0):
+        self.scope = scope
+        self.data_path = os.path.join(save_directory, data_file_name)
+        self.image_store = image_store
+        self.image_interval = image_interval
+        self.min_spacing = 1.0 / max_rate if max_rate else 0.0
+        self.poll_interval = poll_interval
+        self.verbose = verbose
+        self.io_lock = threading.Lock()
+
+        self.accounting = TriggerAccounting(nominal_period)
+        self.triggers = 0
+        self.images = 0
+        self.images_skipped = 0
+        self.images_limited = 0
+        self.dead_count = 0
+        self.dead_total = 0.0
+        self.dead_max = 0.0
+        self.start = None
+        self._last_arm = 0.0
+        self._last_image = None
+        self._log_queue = queue.Queue()
+        self._image_request = None
+        self._image_busy = False
+        self._image_ready = threading.Condition()
+        self._closing = False
+        self._threads = [threading.Thread(target=self._log_stage, name="capture-log", daemon=True)]
+        if image_store is not None:
+            self._threads.append(threading.Thread(target=self._image_stage, name="capture-image", daemon=True))
+
+    # ************** Acquisition stage (caller's thread)
+    def _query(self, command):
+        with self.io_lock:
+            return self.scope.query(command)
+
+    def _poll_state(self):
+        """ACQuire:STATE? reply and the time it was sent (after getting the bus)."""
+        with self.io_lock:
+            t_sent = time.perf_counter()
+            return t_sent, self.scope.query("ACQuire:STATE?").strip()
+
+    def _arm(self):
+        wait = self._last_arm + self.min_spacing - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        with self.io_lock:
+            self.scope.write("ACQuire:STATE 1")
+        self._last_arm = time.perf_counter()
+
+    def _snapshot(self):
+        """Measurements (NaN if unreadable) and the acquisition counter, read before re-arming."""
+        replies = self._query(";".join(MEASUREMENTS + (":" + NUMACQ_QUERY,))).strip().split(";")
+        numacq = parse_numacq(replies[-1]) if len(replies) > len(MEASUREMENTS) else None
+        values = []
+        for reply in replies[:len(MEASUREMENTS)]:
+            try:
+                values.append(min(float(reply), MEASUREMENT_LIMIT))
+            except ValueError:
+                values.append(float("nan"))
+        values += [float("nan")] * (len(MEASUREMENTS) - len(values))
+        return values, numacq
+
+    def _request_image(self, count, timestamp):
+        """Hands a due screenshot to the image stage, or records it as skipped while the stage is busy."""
+        if self._last_image is not None and time.perf_counter() - self._last_image < self.image_interval:
+            self.images_limited += 1
+            return
+        with self._image_ready:
+            if not self._image_busy:
+                self._image_busy = True
+                self._image_request = (count, timestamp)
+                self._image_ready.notify()
+                self._last_image = time.perf_counter()
+                return
+        self.images_skipped += 1
+        self.image_store.skip(count, timestamp)
+
+    @property
+    def dead_time_mean(self):
+        return self.dead_total / self.dead_count if self.dead_count else 0.0
+
+    def run(self, stop_event, max_triggers=None, duration=None):
+        """
+        Captures until stop_event is set (or max_triggers / duration seconds).  Returns the trigger count.
+        """
+        for thread in self._threads:
+            thread.start()
+        self.start = time.perf_counter()
+        self._arm()
+        t_armed_seen = time.perf_counter()
+        try:
+            while not stop_event.is_set():
+                if max_triggers is not None and self.triggers >= max_triggers:
+                    break
+                if duration is not None and time.perf_counter() - self.start >= duration:
+                    break
+                t_sent, state = self._poll_state()
+                if state != "0":
+                    t_armed_seen = time.perf_counter()
+                    time.sleep(self.poll_interval)
+                    continue
+
+                # Acquisition completed between the last poll that saw it armed and this one
+                t_complete = time.perf_counter()
+                t_trigger = (t_armed_seen + t_sent) / 2 if t_armed_seen else t_sent
+                timestamp = datetime.datetime.now()
+                self.triggers += 1
+                values, numacq = self._snapshot()
+                self._arm()
+                dead_time = time.perf_counter() - t_complete
+                self.dead_count += 1
+                self.dead_total += dead_time
+                self.dead_max = max(self.dead_max, dead_time)
+                missed = self.accounting.update(numacq, t_trigger)
+                t_armed_seen = time.perf_counter()
+
+                self._log_queue.put((self.triggers, timestamp, values, missed))
+                if self.image_store is not None:
+                    self._request_image(self.triggers, timestamp)
+        finally:
+            with self.io_lock:
+                self.scope.write("ACQuire:STATE 0")
+        return self.triggers
+
+    def close(self):
+        """Finishes the queued log rows and the image in progress, then stops the stages."""
+        self._closing = True
+        self._log_queue.put(None)
+        with self._image_ready:
+            self._image_ready.notify()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
+
+    # ************** Downstream stages
+    def _log_stage(self):
+        while True:
+            item = self._log_queue.get()
+            if item is None:
+                return
+            count, timestamp, (v_peak_to_peak, v_rms), missed = item
+            if self.verbose:
+                print(f"Count: {count}, Vpk2pk: {v_peak_to_peak:.3f}, Vrms: {v_rms:.3f}, Missed: {format_missed(missed) or 'n/a'}")
+            try:
+                with open(self.data_path, "a") as f:
+                    f.write(f"{count:4.0f}, {timestamp.hour:02d}:{timestamp.minute:02d}:{timestamp.second:02d}, "
+                            f"{v_peak_to_peak:.3f}, {v_rms:.3f}, {format_missed(missed)}\n")
+            except IOError as e:
+                print(f"Error appending data to file '{self.data_path}': {e}")
+
+    def _image_stage(self):
+        while True:
+            with self._image_ready:
+                while self._image_request is None and not self._closing:
+                    self._image_ready.wait()
+                if self._image_request is None:
+                    return
+                count, timestamp = self._image_request
+                self._image_request = None
+            try:
+                with self.io_lock:
+                    self.scope.write(f'SAVE:IMAGe "{SCOPE_IMAGE_PATH}"')
+                    self.scope.query("*OPC?")
+                    image_data, _ = read_file(self.scope, SCOPE_IMAGE_PATH, delete=True)
+                _, image_file_name, _ = self.image_store.put(image_data, count, timestamp)
+                self.images += 1
+                if self.verbose:
+                    print(f"Saving image to: {image_file_name}")
+            except Exception as e:
+                print(f"Error capturing image for count {count}: {e}")
+            finally:
+                with self._image_ready:
+                    self._image_busy = False
+
+    # ************** Metrics
+    def report(self):
+        elapsed = time.perf_counter() - self.start if self.start else 0.0
+        rate = self.triggers / elapsed if elapsed > 0 else 0.0
+        return (f"Triggers: {self.triggers} ({rate:.2f}/s), images: {self.images} (skipped {self.images_skipped}, "
+                f"rate-limited {self.images_limited}), re-arm dead time avg: {self.dead_time_mean * 1000:.1f} ms, "
+                f"max: {self.dead_max * 1000:.1f} ms\n"
+                f"{self.accounting.report()}")
@@ -0,0 +1,206 @@
+"""
+Cycle RMS
+
+Description- Per line cycle RMS of CH1 waveform captures, for sags, swells and half-cycle drop-outs.
+
+The scope's RMS measurement averages the whole record (about 3 cycles at 5 ms/div), so a one-cycle sag is smoothed
+away before get_measurements() sees it.  Here a record is split at its zero crossings (with hysteresis against noise,
+interpolated between samples) and, vectorized over the record with one cumulative sum of v^2:
+    half-cycle RMS   over every half cycle (crossing to crossing)
+    cycle RMS        over every two adjacent half cycles, i.e. one cycle refreshed every half cycle (IEC 61000-4-30
+                     Urms(1/2) style)
+A flat (lost) line has no crossings, so a gap longer than 1.5 half cycles is cut into half-cycle slices of the
+record's median half period (line_frequency if the record has too few crossings to tell).
+
+Runs of half cycles below sag_limit or above swell_limit of the nominal are sags and swells, below
+interruption_limit half-cycle drop-outs (which are also part of the sag around them).  Half cycles rather than the
+sliding one-cycle windows are used so an event starts and ends at the crossings that bound it; a window half in
+the event would stretch it by half a cycle on each side.
+
+CycleMonitor analyzes Scope.fetch_waveform records and appends every event to <data file>_cycles.csv:
+    Start_Time, End_Time, Time_Uncertainty_s, Kind, Cycles, Duration_ms, Extreme_Vrms, Nominal_Vrms, Event_Count
+with Start/End at the crossings that bound it (record trigger time + sample position), Extreme = lowest RMS for sags
+and drop-outs, highest for swells.  The record position is exact but the record itself is dated by the caller, so
+Time_Uncertainty_s is the +/- error of that dating (blank if the caller gave none); it applies to both times.  Only captured records are seen: coverage (captured / elapsed time) is reported.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import os
+import time
+
+import numpy as np
+
+from event_context import waveform_volts
+
+CYCLE_FIELDS = ("Start_Time", "End_Time", "Time_Uncertainty_s", "Kind", "Cycles", "Duration_ms", "Extreme_Vrms", "Nominal_Vrms",
+                "Event_Count")
+HYSTERESIS = 0.05               # fraction of the record peak a crossing must pass, against noise chatter
+SAG_LIMIT = 0.90                # half-cycle RMS below this fraction of nominal = sag
+SWELL_LIMIT = 1.10              # half-cycle RMS above this fraction of nominal = swell
+INTERRUPTION_LIMIT = 0.10       # half-cycle RMS below this fraction of nominal = half-cycle drop-out
+LINE_FREQUENCY = 60.0           # Hz, half period for records with too few crossings to measure it
+
+
+def zero_crossings(volts, hysteresis=HYSTERESIS):
+    """
+    Fractional sample positions of the zero crossings (either direction) of a record, about its mean.  A crossing
+    only counts once the signal has passed hysteresis * peak on the other side.
+    """
+    volts = np.asarray(volts, dtype=np.float64)
+    volts = volts - volts.mean()
+    level = hysteresis * np.abs(volts).max(initial=0.0)
+    if level == 0:
+        return np.empty(0)
+    state = np.where(volts > level, 1, np.where(volts < -level, -1, 0))
+    beyond = np.flatnonzero(state)
+    flips = np.flatnonzero(state[beyond[1:]] != state[beyond[:-1]])
+    after = beyond[flips + 1]        # first sample past the level on the new side
+    # Last raw sign change before it: between samples k and k + 1
+    raw = np.flatnonzero(np.signbit(volts[1:]) != np.signbit(volts[:-1]))
+    k = raw[np.searchsorted(raw, after, side="left") - 1]
+    return k + volts[k] / (volts[k] - volts[k + 1])
+
+
+class CycleRms:
+    """
+    Half-cycle and cycle RMS of one record.  Times are seconds from the first sample.
+
+    Attributes:
+        half_start, half_end, half_rms: One entry per half cycle.
+        cycle_start, cycle_end, cycle_rms: One entry per cycle window (two adjacent half cycles).
+    """
+    def __init__(self, volts, xincr, hysteresis=HYSTERESIS, line_frequency=LINE_FREQUENCY):
+        volts = np.asarray(volts, dtype=np.float64)
+        volts = volts - volts.mean()
+        crossings = zero_crossings(volts, hysteresis)
+        half_period = 0.5 / line_frequency / xincr                    # samples
+        if len(crossings) >= 3:
+            half_period = float(np.median(np.diff(crossings)))
+        if len(crossings) < 2:
+            crossings = np.array([0.0, len(volts) - 1.0])             # no full half cycle: slice the whole record
+        crossings = _fill_gaps(crossings, half_period)
+        bounds = np.ceil(crossings).astype(np.intp)
+        times = crossings * xincr
+        energy = np.concatenate(([0.0], np.cumsum(volts ** 2)))
+        sums = energy[bounds[1:]] - energy[bounds[:-1]]
+        counts = np.diff(bounds)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.half_rms = np.sqrt(sums / counts)
+            self.cycle_rms = np.sqrt((sums[1:] + sums[:-1]) / (counts[1:] + counts[:-1]))
+        self.half_start, self.half_end = times[:-1], times[1:]
+        self.cycle_start, self.cycle_end = times[:-2], times[2:]
+
+
+def _fill_gaps(crossings, half_period):
+    """Crossings plus slices of half_period samples in every gap longer than 1.5 half periods."""
+    gaps = np.diff(crossings)
+    slices = np.maximum(np.rint(gaps / half_period).astype(np.intp), 1)
+    if (slices == 1).all():
+        return crossings
+    starts = np.repeat(crossings[:-1], slices)
+    steps = np.repeat(gaps / slices, slices)
+    offsets = np.arange(len(starts)) - np.repeat(np.cumsum(slices) - slices, slices)
+    return np.append(starts + offsets * steps, crossings[-1])
+
+
+def find_runs(mask):
+    """(first, last) index pairs of the runs of True in mask."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1))
+
+
+def find_events(cycles, nominal, sag_limit=SAG_LIMIT, swell_limit=SWELL_LIMIT,
+                interruption_limit=INTERRUPTION_LIMIT):
+    """
+    Sags, swells and half-cycle drop-outs of a CycleRms (from its half-cycle RMS).
+
+    Returns:
+        List of dicts kind, start, end (seconds from the first sample), cycles, extreme (Vrms), in time order.
+    """
+    events = []
+    rms = cycles.half_rms
+    checks = (("sag", rms < sag_limit * nominal, np.min),
+              ("swell", rms > swell_limit * nominal, np.max),
+              ("dropout", rms < interruption_limit * nominal, np.min))
+    for kind, mask, extreme in checks:
+        for first, last in find_runs(mask):
+            events.append(dict(kind=kind, start=float(cycles.half_start[first]), end=float(cycles.half_end[last]),
+                               cycles=(last - first + 1) / 2, extreme=float(extreme(rms[first:last + 1]))))
+    return sorted(events, key=lambda event: event["start"])
+
+
+class CycleMonitor:
+    """
+    Args:
+        path: Cycle event log (CSV) to append to, created with its header if missing.
+        nominal: Nominal line Vrms (None = median cycle RMS of each record).
+        sag_limit, swell_limit, interruption_limit: Fractions of nominal.
+    """
+    def __init__(self, path, nominal=None, sag_limit=SAG_LIMIT, swell_limit=SWELL_LIMIT,
+                 interruption_limit=INTERRUPTION_LIMIT):
+        self.path = path
+        self.nominal = nominal
+        self.sag_limit = sag_limit
+        self.swell_limit = swell_limit
+        self.interruption_limit = interruption_limit
+        self.records = 0
+        self.cycles = 0
+        self.covered = 0.0
+        self.counts = {"sag": 0, "swell": 0, "dropout": 0}
+        self.start = time.time()
+        if not os.path.exists(path) or not os.path.getsize(path):
+            with open(path, "w") as f:
+                f.write(",".join(CYCLE_FIELDS) + "\n")
+
+    def analyze(self, waveform, trigger_time, count=0, nominal=None, uncertainty=None):
+        """
+        Finds and logs the events of one CH1 record.
+
+        Args:
+            waveform: Raw waveform dict (Scope.fetch_waveform).
+            trigger_time: Datetime of the record's time zero (its trigger).
+            count: Event_Count of the last event row logged before the capture.
+            nominal: Nominal Vrms for this record (default: the monitor's nominal, else the record's median).
+            uncertainty: +/- seconds of trigger_time, logged as Time_Uncertainty_s (None = unknown, left blank).
+
+        Returns:
+            The events (find_events dicts, plus absolute start_time / end_time datetimes and their uncertainty).
+        """
+        times, volts = waveform_volts(waveform)
+        cycles = CycleRms(volts, waveform["xincr"])
+        nominal = nominal or self.nominal or float(np.median(cycles.cycle_rms if len(cycles.cycle_rms)
+                                                             else cycles.half_rms))
+        self.records += 1
+        self.cycles += len(cycles.half_rms) / 2
+        self.covered += len(volts) * waveform["xincr"]
+        events = find_events(cycles, nominal, self.sag_limit, self.swell_limit, self.interruption_limit)
+        lines = []
+        spread = f"{uncertainty:.6f}" if uncertainty is not None else ""
+        for event in events:
+            self.counts[event["kind"]] += 1
+            # Record seconds are from the first sample; times[0] (xzero) places that sample relative to the trigger
+            event["start_time"] = trigger_time + datetime.timedelta(seconds=times[0] + event["start"])
+            event["end_time"] = trigger_time + datetime.timedelta(seconds=times[0] + event["end"])
+            event["uncertainty"] = uncertainty
+            lines.append(f"{event['start_time'].strftime('%Y-%m-%d %H:%M:%S.%f')},"
+                         f"{event['end_time'].strftime('%Y-%m-%d %H:%M:%S.%f')},{spread},{event['kind']},"
+                         f"{event['cycles']:.1f},{(event['end'] - event['start']) * 1000:.2f},"
+                         f"{event['extreme']:.3f},{nominal:.3f},{count}")
+        if lines:
+            try:
+                with open(self.path, "a") as f:
+                    f.write("\n".join(lines) + "\n")
+            except IOError as e:
+                print(f"Error appending data to file '{self.path}': {e}")
+        return events
+
+    def report(self):
+        elapsed = time.time() - self.start
+        coverage = 100 * self.covered / elapsed if elapsed > 0 else 0.0
+        return (f"Cycle RMS: {self.records} records, {self.cycles:.0f} cycles ({coverage:.2f}% of the time), "
+                f"sags: {self.counts['sag']}, swells: {self.counts['swell']}, "
+                f"half-cycle drop-outs: {self.counts['dropout']}")
@@ -0,0 +1,186 @@
+"""
+Dashboard
+
+Description- Local live web dashboard for the power monitors, fed from a snapshot the monitor publishes.
+
+The acquisition loop only calls LiveSnapshot.publish() with its latest readings, state, counters and loop metrics.
+publish() builds a new dict and swaps one reference (atomic under the GIL), so there is no lock for the loop to
+wait on and a reader always sees one complete snapshot.  Everything else runs in DashboardServer's own thread:
+    GET /               the page (plain HTML + JavaScript, nothing to install)
+    GET /snapshot.json  the current snapshot, plus the recent line readings from the ring buffer if one is given
+The browser polls /snapshot.json at its own refresh rate, so an open dashboard costs the loop nothing but the
+publish() call, and viewing never slows acquisition the way console prints do.
+
+Serves on 127.0.0.1 by default (this PC only); host="0.0.0.0" makes it reachable from the network.
+
+Example:
+    snapshot = LiveSnapshot()
+    server = DashboardServer(snapshot, port=8050, ring=ring)
+    server.start()                      # http://127.0.0.1:8050
+    ...
+    snapshot.publish(state="ON", readings=[120.1, 3.2], loop_hz=14.2)
+    ...
+    server.close()
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8050
+HISTORY_POINTS = 600        # recent ring readings sent for the line voltage trace
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Segoe UI, Arial, sans-serif; margin: 1.5em; background: #f7f7f7; }}
+h1 {{ font-size: 1.3em; }}
+table {{ border-collapse: collapse; background: #fff; min-width: 26em; }}
+td {{ padding: 0.25em 0.8em; border-bottom: 1px solid #ddd; font-family: Consolas, monospace; }}
+td:first-child {{ font-family: Segoe UI, Arial, sans-serif; color: #555; }}
+.ON {{ color: #080; font-weight: bold; }} .OFF {{ color: #b00; font-weight: bold; }}
+#stale {{ color: #b00; }}
+canvas {{ background: #fff; border: 1px solid #ddd; margin-top: 1em; }}
+</style></head>
+<body><h1>{title}</h1>
+<table id="fields"></table>
+<canvas id="trace" width="720" height="180"></canvas>
+<p id="stale"></p>
+<script>
+function fmt(v) {{
+  if (v === null) return "-";
+  if (typeof v === "number") return Number.isInteger(v) ? v : v.toFixed(3);
+  if (Array.isArray(v)) return v.map(fmt).join(", ");
+  return v;
+}}
+function render(s) {{
+  var rows = "";
+  for (var key in s) {{
+    if (key === "history") continue;
+    var cls = key === "state" ? s[key] : "";
+    rows += "<tr><td>" + key + "</td><td class='" + cls + "'>" + fmt(s[key]) + "</td></tr>";
+  }}
+  document.getElementById("fields").innerHTML = rows;
+  var age = Date.now() / 1000 - s.published;
+  document.getElementById("stale").textContent = age > 5 ? "No update from the monitor for " + age.toFixed(0) + " s" : "";
+  var h = s.history || [], c = document.getElementById("trace"), g = c.getContext("2d");
+  g.clearRect(0, 0, c.width, c.height);
+  var v = h.filter(function (x) {{ return x !== null; }});
+  if (v.length < 2) return;
+  var lo = Math.min.apply(null, v), hi = Math.max.apply(null, v), span = (hi - lo) || 1;
+  g.beginPath();
+  h.forEach(function (x, i) {{
+    if (x === null) return;
+    var px = i * c.width / (h.length - 1), py = c.height - 10 - (x - lo) / span * (c.height - 20);
+    i ? g.lineTo(px, py) : g.moveTo(px, py);
+  }});
+  g.strokeStyle = "#036"; g.stroke();
+  g.fillText(hi.toFixed(1) + " V", 4, 12); g.fillText(lo.toFixed(1) + " V", 4, c.height - 4);
+}}
+function poll() {{
+  fetch("/snapshot.json").then(function (r) {{ return r.json(); }}).then(render)
+    .catch(function () {{ document.getElementById("stale").textContent = "Monitor not reachable"; }});
+}}
+poll();
+setInterval(poll, {refresh_ms});
+</script></body></html>
+"""
+
+
+def _plain(value):
+    """Snapshot value to something json can write (NaN/inf -> None, datetime -> text)."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if hasattr(value, "item"):        # NumPy scalar
+        return _plain(value.item())
+    return value
+
+
+class LiveSnapshot:
+    """
+    Latest state of a monitor.  One writer (the acquisition loop) publishes, any number of readers read.
+    """
+    def __init__(self, **fields):
+        self._data = dict(fields, seq=0, published=time.time())
+
+    def publish(self, **fields):
+        """Merges fields into a new snapshot and makes it current (no lock; values should not be mutated later)."""
+        data = dict(self._data)
+        data.update(fields)
+        data["seq"] += 1
+        data["published"] = time.time()
+        self._data = data
+
+    def read(self):
+        """The current snapshot (do not modify)."""
+        return self._data
+
+
+class DashboardServer:
+    """
+    Args:
+        snapshot: LiveSnapshot published by the monitor.
+        port: TCP port.
+        host: Interface to listen on ("127.0.0.1" = this PC only).
+        refresh: Seconds between browser updates.
+        ring: Optional ReadingRing; its latest CH1 readings are drawn as a trace.
+        title: Page title.
+    """
+    def __init__(self, snapshot, port=DEFAULT_PORT, host="127.0.0.1", refresh=1.0, ring=None,
+                 title="Power Monitoring"):
+        self.snapshot = snapshot
+        self.ring = ring
+        self.url = f"http://{host if host != '0.0.0.0' else 'localhost'}:{port}"
+        page = PAGE.format(title=title, refresh_ms=int(refresh * 1000)).encode("utf-8")
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] == "/snapshot.json":
+                    body = json.dumps(server.payload()).encode("utf-8")
+                    content_type = "application/json"
+                elif self.path == "/":
+                    body, content_type = page, "text/html; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Cache-Control", "no-store")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass    # keep the console for the monitor
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="dashboard", daemon=True)
+
+    def payload(self):
+        data = {key: _plain(value) for key, value in self.snapshot.read().items()}
+        if self.ring is not None and len(self.ring):
+            _, values = self.ring.latest(HISTORY_POINTS)
+            data["history"] = _plain(values[:, 0].astype(float).tolist())
+        return data
+
+    def start(self):
+        self._thread.start()
+        return self.url
+
+    def close(self):
+        if self._thread.is_alive():
+            self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,136 @@
+"""
+Deadline Scheduler
+
+Description- Drift-free periodic scheduler on the monotonic clock, for synchronous sampling.
+
+A timer thread that waits 'interval' and then sets an Event drifts by the main loop's processing time every cycle and
+jitters by the Event poll timeout.  DeadlineScheduler computes every deadline from the start instead:
+    deadline(k) = start + k * period        (time.perf_counter(), never jumps with NTP or DST)
+and waits for it directly: Event.wait() (interruptible by the stop event) until just before the deadline, then a spin
+for the rest.  The spin has to cover the OS timer resolution, since a wait can end up to one timer tick late:
+    Windows  the default tick is about 15.6 ms, so the scheduler raises the system timer resolution to 1 ms
+             (winmm timeBeginPeriod, released by close()) and spins the last 2 ms; if that fails it spins the last
+             20 ms instead (one CPU core busy for that part of every period)
+    others   waits are good to well under a millisecond, the last 2 ms are spun
+so sub-second periods (e.g. 50 ms) hold on Windows too.
+
+Processing time never shifts the grid.  A sample that is late by more than a whole period is an overrun: the
+scheduler skips the missed grid slots (counted) and keeps the next sample on the grid instead of bursting to catch up.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import ctypes
+import datetime
+import sys
+import time
+
+SPIN_MARGIN = 0.002             # seconds before the deadline to stop sleeping and spin (1 ms timer or better)
+COARSE_SPIN_MARGIN = 0.020      # the same with Windows' default ~15.6 ms timer tick
+WINDOWS_TIMER_PERIOD = 1        # ms, system timer resolution requested on Windows
+
+
+def _begin_timer_period():
+    """Raises the Windows system timer resolution.  Returns the winmm DLL to release it with, or None."""
+    if sys.platform != "win32":
+        return None
+    try:
+        winmm = ctypes.WinDLL("winmm")
+        if winmm.timeBeginPeriod(WINDOWS_TIMER_PERIOD) == 0:     # TIMERR_NOERROR
+            return winmm
+    except (OSError, AttributeError):
+        pass
+    return None
+
+
+class DeadlineScheduler:
+    """
+    Args:
+        period: Seconds between samples.
+        stop_event: Optional threading.Event that interrupts the wait.
+        start: perf_counter() time of grid slot 0 (default: now).
+        first_index: Grid slot of the first sample, e.g. 1 to take it one period after the start.
+
+    Call close() when done, to release the Windows timer resolution.
+    """
+    def __init__(self, period, stop_event=None, start=None, first_index=0):
+        if period <= 0:
+            raise ValueError("period must be positive")
+        self.period = float(period)
+        self.stop_event = stop_event
+        self.start = time.perf_counter() if start is None else start
+        # Anchor the monotonic grid to wall-clock time once
+        self._wall_ref = datetime.datetime.now() - datetime.timedelta(seconds=time.perf_counter() - self.start)
+        self.index = int(first_index)       # grid slot of the next sample
+        self.samples = 0
+        self.overruns = 0           # samples that started more than one period late
+        self.skipped = 0            # grid slots dropped because of overruns
+        self.late_max = 0.0
+        self._late_total = 0.0
+        self._winmm = _begin_timer_period()
+        self.spin_margin = COARSE_SPIN_MARGIN if sys.platform == "win32" and self._winmm is None else SPIN_MARGIN
+
+    def close(self):
+        """Releases the Windows timer resolution (no-op elsewhere)."""
+        if self._winmm is not None:
+            self._winmm.timeEndPeriod(WINDOWS_TIMER_PERIOD)
+            self._winmm = None
+
+    def deadline(self, index=None):
+        """perf_counter() time of a grid slot (default: the next one)."""
+        return self.start + (self.index if index is None else index) * self.period
+
+    def offset(self, index):
+        """Seconds from the start of the grid to slot index."""
+        return index * self.period
+
+    def to_datetime(self, mono):
+        """Wall-clock datetime of a perf_counter() time."""
+        return self._wall_ref + datetime.timedelta(seconds=mono - self.start)
+
+    def wait_next(self):
+        """
+        Waits for the next grid slot.
+
+        Returns:
+            (index, scheduled, actual, skipped) with scheduled/actual perf_counter() times and the number of grid
+            slots skipped before this one, or None if the stop event was set.
+        """
+        skipped = 0
+        now = time.perf_counter()
+        # Overrun: more than one whole period late, move to the latest slot already due (less than a period ago)
+        if now - self.deadline() > self.period:
+            skipped = int((now - self.deadline()) // self.period)
+            self.index += skipped
+            self.overruns += 1
+            self.skipped += skipped
+        scheduled = self.deadline()
+
+        remaining = scheduled - now - self.spin_margin
+        if remaining > 0:
+            if self.stop_event is not None:
+                if self.stop_event.wait(remaining):
+                    return None
+            else:
+                time.sleep(remaining)
+        while time.perf_counter() < scheduled:
+            pass
+        if self.stop_event is not None and self.stop_event.is_set():
+            return None
+
+        actual = time.perf_counter()
+        late = actual - scheduled
+        self.late_max = max(self.late_max, late)
+        self._late_total += late
+        self.samples += 1
+        index = self.index
+        self.index += 1
+        return index, scheduled, actual, skipped
+
+    def report(self):
+        late_avg = self._late_total / self.samples if self.samples else 0.0
+        return (f"Samples: {self.samples} at {self.period * 1000:g} ms, "
+                f"late avg: {late_avg * 1000:.2f} ms, max: {self.late_max * 1000:.2f} ms, "
+                f"overruns: {self.overruns} ({self.skipped} slots skipped)")
@@ -0,0 +1,152 @@
+"""
+Event Context
+
+Description- Pre/post-event context snippets for logged ON/OFF transitions and drop-outs.
+
+When an event row is logged, ContextDumper.schedule() notes the event time.  Once the post-event window has passed,
+poll() copies the readings from event_time - pre_seconds to event_time + post_seconds out of the raw readings ring
+(ring_buffer.py) and hands them to a background writer thread, so the monitor loop never waits on the disk.
+
+For each event the writer produces
+    <data file>_evt<count>.csv           readings at full loop rate, same layout as a replay_onoff.py recording
+                                         (Time, CH1, CH2, ...; blank = channel not read)
+    <data file>_evt<count>_wfm.csv       scope waveform at the event (Tek only), Time_s, Volts; or, with a
+                                         waveform_store, a record of <data file>_waveforms.wfz (waveform_codec.py,
+                                         raw codes compressed several times below their binary size)
+and appends a row to <data file>_context.csv linking the snippet files to the event row (Event_Count); a stored
+waveform is linked as <store file>#<record>.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import os
+import queue
+import threading
+
+import numpy as np
+
+CONTEXT_KINDS = ("ON", "OFF", "dropout")     # OnOffEvent kinds that get a context snippet
+INDEX_HEADER = "Event_Count,Event_Time,Kind,Label,Context_File,Readings,Waveform_File"
+
+
+def waveform_volts(waveform):
+    """
+    Scales a raw waveform (dict from Scope.fetch_waveform) to (time_s, volts) arrays.
+    """
+    codes = np.asarray(waveform["codes"], dtype=np.float64)
+    volts = (codes - waveform["yoff"]) * waveform["ymult"] + waveform["yzero"]
+    times = waveform["xzero"] + np.arange(codes.size) * waveform["xincr"]
+    return times, volts
+
+
+class ContextDumper:
+    """
+    Writes context snippets around events asynchronously.
+
+    Args:
+        ring: ReadingRing with the raw readings.
+        out_dir: Directory of the data file.
+        base_name: Data file name without extension; snippet and index names start with it.
+        pre_seconds, post_seconds: Window before and after the event time.
+        waveform_store: waveform_codec.WaveformWriter for the event waveforms (None = one CSV per waveform).  Only
+            the writer thread appends to it; the caller closes it after close().
+    """
+    def __init__(self, ring, out_dir, base_name, pre_seconds=5.0, post_seconds=5.0, waveform_store=None):
+        self.ring = ring
+        self.waveform_store = waveform_store
+        self.out_dir = out_dir
+        self.base_name = base_name
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.index_path = os.path.join(out_dir, base_name + "_context.csv")
+        self._pending = []
+        self._jobs = queue.Queue()
+        if not os.path.exists(self.index_path):
+            with open(self.index_path, "w") as f:
+                f.write(INDEX_HEADER + "\n")
+        self._writer = threading.Thread(target=self._write_loop, name="context-writer", daemon=True)
+        self._writer.start()
+
+    def schedule(self, count, event_time, kind, label="", waveform=None):
+        """
+        Notes an event; its snippet is cut once post_seconds have passed (see poll).
+
+        Args:
+            count: Event_Count of the logged row.
+            event_time: Datetime of the event (transition or drop-out instant).
+            kind: OnOffEvent kind.
+            label: Label column of the row, if any.
+            waveform: Optional raw waveform dict (Scope.fetch_waveform) captured at the event.
+        """
+        self._pending.append(dict(count=count, event_time=event_time, kind=kind, label=label, waveform=waveform,
+                                  due=event_time.timestamp() + self.post_seconds))
+
+    def poll(self, now):
+        """
+        Cuts the snippets whose post-event window has passed.  now is seconds since the epoch (reading timestamp).
+        Cost when nothing is due is one comparison per pending event.
+        """
+        if not self._pending:
+            return
+        still_pending = []
+        for item in self._pending:
+            if now >= item["due"]:
+                self._cut(item)
+            else:
+                still_pending.append(item)
+        self._pending = still_pending
+
+    def _cut(self, item):
+        t_event = item["event_time"].timestamp()
+        times, values = self.ring.between(t_event - self.pre_seconds, t_event + self.post_seconds)
+        item["times"], item["values"] = times, values
+        self._jobs.put(item)
+
+    def close(self):
+        """Cuts whatever is still pending (with the readings so far) and waits for the writer to finish."""
+        for item in self._pending:
+            self._cut(item)
+        self._pending = []
+        self._jobs.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            try:
+                self._write(item)
+            except (IOError, ValueError) as e:
+                print(f"Error writing context for event {item['count']}: {e}")
+
+    def _write(self, item):
+        name = f"{self.base_name}_evt{item['count']:04d}"
+        context_file = name + ".csv"
+        times, values = item["times"], item["values"]
+        num_channels = values.shape[1] if values.ndim == 2 else 0
+        lines = ["Time," + ",".join(f"CH{i + 1}" for i in range(num_channels))]
+        for t, row in zip(times, values):
+            stamp = datetime.datetime.fromtimestamp(t).strftime('%Y-%m-%d %H:%M:%S.%f')
+            lines.append(stamp + "," + ",".join("" if np.isnan(v) else f"{v:.3f}" for v in row))
+        with open(os.path.join(self.out_dir, context_file), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        waveform_file = ""
+        if item["waveform"] is not None and self.waveform_store is not None:
+            record = self.waveform_store.append(item["waveform"], count=item["count"], kind=item["kind"],
+                                                time=item["event_time"].strftime('%Y-%m-%d %H:%M:%S.%f'))
+            waveform_file = f"{os.path.basename(self.waveform_store.path)}#{record}"
+        elif item["waveform"] is not None:
+            waveform_file = name + "_wfm.csv"
+            wfm_times, volts = waveform_volts(item["waveform"])
+            np.savetxt(os.path.join(self.out_dir, waveform_file), np.column_stack((wfm_times, volts)),
+                       delimiter=",", header="Time_s,Volts", comments="", fmt=["%.9e", "%.5e"])
+
+        event_time = item["event_time"].strftime('%Y-%m-%d %H:%M:%S.%f')
+        with open(self.index_path, "a") as f:
+            f.write(f"{item['count']},{event_time},{item['kind']},{item['label']},{context_file},"
+                    f"{len(times)},{waveform_file}\n")
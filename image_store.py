@@ -0,0 +1,83 @@
+"""
+Image Store
+
+Description- Content-addressed store for scope screenshots.
+
+Every image is stored once under the SHA-256 of its bytes in a sharded directory layout
+    <root>/images/ab/cd/abcd...ef.png
+and every capture adds a row to <root>/images/manifest.csv
+    Count, Time, SHA256, Bytes, Stored, File
+where Stored is 'new' for the first copy and 'duplicate' when byte-identical bytes were already stored ('skipped',
+with the other fields empty, for a capture whose screen was not saved).  Repeated
+identical screenshots cost one manifest row instead of another file, and two triggers in the same second can no
+longer overwrite each other.  Files are written to a temporary name and renamed into place, so a crash never leaves a
+partial image under a valid hash.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+
+MANIFEST_HEADER = "Count, Time, SHA256, Bytes, Stored, File"
+
+
+class ImageStore:
+    """
+    Args:
+        root: Save directory; images and the manifest go in <root>/images.
+        extension: File extension of the stored images.
+    """
+    def __init__(self, root, extension=".png"):
+        self.root = os.path.join(root, "images")
+        self.extension = extension
+        self.manifest_path = os.path.join(self.root, "manifest.csv")
+        self._manifest_lock = threading.Lock()          # rows come from the acquisition and image threads
+        os.makedirs(self.root, exist_ok=True)
+        if not os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "w") as f:
+                f.write(MANIFEST_HEADER + "\n")
+
+    def relative_path(self, digest):
+        """Path of an image, relative to the store root, from its hex digest."""
+        return os.path.join(digest[:2], digest[2:4], digest + self.extension)
+
+    def path_for(self, digest):
+        return os.path.join(self.root, self.relative_path(digest))
+
+    def put(self, data, count, timestamp=None):
+        """
+        Stores image bytes (once per content) and records the capture in the manifest.
+
+        Args:
+            data: Image bytes (bytes, bytearray or memoryview).
+            count: Trigger count of the capture.
+            timestamp: Datetime of the capture (default now).
+
+        Returns:
+            (digest, full path, True if the bytes were new)
+        """
+        timestamp = timestamp or datetime.datetime.now()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+        is_new = not os.path.exists(path)
+        if is_new:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        with self._manifest_lock, open(self.manifest_path, "a") as f:
+            f.write(f"{count:4d}, {timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')}, {digest}, {len(data)}, "
+                    f"{'new' if is_new else 'duplicate'}, {self.relative_path(digest)}\n")
+        return digest, path, is_new
+
+    def skip(self, count, timestamp=None):
+        """Records a capture without an image in the manifest."""
+        timestamp = timestamp or datetime.datetime.now()
+        with self._manifest_lock, open(self.manifest_path, "a") as f:
+            f.write(f"{count:4d}, {timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')}, , , skipped, \n")
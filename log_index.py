@@ -0,0 +1,182 @@
+"""
+Log Index
+
+Description- Sparse time index sidecar for the ON/OFF (and Triggered) event logs, for time-range lookups.
+
+A station runs for weeks, and finding the events around one time meant reading the whole CSV.  Next to the log
+<log>.idx holds one line per time bucket (default one minute) that has rows:
+    Bucket_Start,Byte_Offset,Row
+    2026-10-19T14:00:00,1048576,8123
+i.e. where the first row whose Start_Time_Absolute falls in that bucket starts in the file, and its data row number
+(0 = first row after the header).  The logger calls LogIndex.add() just before it appends a row; only the first row
+of a new bucket touches the sidecar, so the cost is one file size check and a short append per minute.
+
+query(start, end) finds the bytes between the bucket holding start and the first bucket after end, reads only that
+slice and parses it with log_reader.py, so a range lookup in a gigabyte log costs milliseconds.  Rows are assumed to
+be in time order, as the loggers append them when they happen.
+
+An index that is missing or does not match its log (e.g. the log was edited) is rebuilt from the log.
+
+Example:
+    index = LogIndex("20261019_080000.csv")
+    events = index.query("2026-10-21 14:00", "2026-10-21 15:00")
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import os
+
+import numpy as np
+
+from log_reader import parse_log, read_log
+
+INDEX_SUFFIX = ".idx"
+INDEX_HEADER = "Bucket_Start,Byte_Offset,Row"
+TIME_COLUMN = "Start_Time_Absolute"
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _seconds(timestamp):
+    """Naive local datetime, numpy datetime64 or 'YYYY-mm-dd HH:MM[:SS[.ffffff]]' to seconds since 1970 (no DST)."""
+    if isinstance(timestamp, str):
+        timestamp = np.datetime64(timestamp.strip().replace(" ", "T"))
+    if isinstance(timestamp, np.datetime64):
+        return float((timestamp - np.datetime64("1970-01-01T00:00:00")) / np.timedelta64(1, "us")) / 1e6
+    return (timestamp - _EPOCH).total_seconds()
+
+
+class LogIndex:
+    """
+    Args:
+        log_path: Event log (CSV with a Start_Time_Absolute column).
+        bucket_seconds: Time bucket of the index entries.
+    """
+    def __init__(self, log_path, bucket_seconds=60):
+        self.log_path = log_path
+        self.path = log_path + INDEX_SUFFIX
+        self.bucket_seconds = int(bucket_seconds)
+        self.buckets = []       # bucket start, seconds since 1970
+        self.offsets = []
+        self.first_rows = []
+        self.rows = 0
+        if not self._load():
+            self.rebuild()
+
+    # ************** Sidecar file
+    def _load(self):
+        """Reads the sidecar and counts the rows after its last entry.  False if it is missing or stale."""
+        if not os.path.exists(self.path) or not os.path.exists(self.log_path):
+            return False
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        if not lines or lines[0] != INDEX_HEADER:
+            return False
+        entries = [line.split(",") for line in lines[1:] if line]
+        log_size = os.path.getsize(self.log_path)
+        if entries:
+            buckets = np.array([entry[0] for entry in entries], dtype="datetime64[s]")
+            self.buckets = ((buckets - np.datetime64("1970-01-01T00:00:00", "s")).astype(np.int64)).tolist()
+            self.offsets = [int(entry[1]) for entry in entries]
+            self.first_rows = [int(entry[2]) for entry in entries]
+            if self.offsets[-1] >= log_size:
+                return False
+            with open(self.log_path, "rb") as f:
+                f.seek(self.offsets[-1] - 1)
+                tail = f.read()
+            if tail[:1] != b"\n":
+                return False        # entry does not point at the start of a row
+            self.rows = self.first_rows[-1] + sum(1 for line in tail[1:].split(b"\n") if line.strip())
+        else:
+            with open(self.log_path, "rb") as f:
+                f.readline()
+                if f.read(1).strip():
+                    return False        # rows without index entries
+        return True
+
+    def _write_entry(self, bucket, offset, row, f):
+        stamp = _EPOCH + datetime.timedelta(seconds=bucket)
+        f.write(f"{stamp.strftime('%Y-%m-%dT%H:%M:%S')},{offset},{row}\n")
+
+    def rebuild(self):
+        """Rebuilds the sidecar from the whole log (one read of the log)."""
+        self.buckets, self.offsets, self.first_rows = [], [], []
+        self.rows = 0
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path):
+            table = read_log(self.log_path)
+            with open(self.log_path, "rb") as f:
+                data = np.frombuffer(f.read(), dtype=np.uint8)
+            line_starts = np.flatnonzero(data == ord("\n")) + 1
+            line_starts = line_starts[line_starts < len(data)]
+            line_starts = line_starts[~np.isin(data[line_starts], (ord("\n"), ord("\r")))]   # blank lines
+            self.rows = len(table)
+            if len(line_starts) != len(table):
+                raise ValueError(f"Cannot index {self.log_path}: rows and lines do not match")
+            times = table[TIME_COLUMN]
+            valid = ~np.isnat(times)
+            seconds = np.zeros(len(times), dtype=np.int64)
+            seconds[valid] = (times[valid] - np.datetime64("1970-01-01T00:00:00", "us")) // np.timedelta64(1, "s")
+            buckets = seconds - seconds % self.bucket_seconds
+            # First row of every new (later) bucket
+            running = np.maximum.accumulate(np.where(valid, buckets, np.iinfo(np.int64).min))
+            new = valid & np.concatenate(([True], running[1:] > running[:-1]))
+            self.buckets = buckets[new].tolist()
+            self.offsets = line_starts[new].tolist()
+            self.first_rows = np.flatnonzero(new).tolist()
+        with open(self.path, "w") as f:
+            f.write(INDEX_HEADER + "\n")
+            for bucket, offset, row in zip(self.buckets, self.offsets, self.first_rows):
+                self._write_entry(bucket, offset, row, f)
+
+    # ************** Logger side
+    def add(self, timestamp):
+        """
+        Notes the row about to be appended to the log (its Start_Time_Absolute).  Call just before writing it.
+        """
+        seconds = int(_seconds(timestamp) // 1)
+        bucket = seconds - seconds % self.bucket_seconds
+        if not self.buckets or bucket > self.buckets[-1]:
+            offset = os.path.getsize(self.log_path)
+            self.buckets.append(bucket)
+            self.offsets.append(offset)
+            self.first_rows.append(self.rows)
+            with open(self.path, "a") as f:
+                self._write_entry(bucket, offset, self.rows, f)
+        self.rows += 1
+
+    # ************** Queries
+    def locate(self, start, end):
+        """
+        Byte range and data row range of the log that holds every row from start up to end.
+
+        Returns:
+            (first byte, end byte, first row, end row); empty ranges have first == end.
+        """
+        if not self.buckets:
+            return 0, 0, 0, 0
+        first = max(0, int(np.searchsorted(self.buckets, _seconds(start), side="right")) - 1)
+        last = int(np.searchsorted(self.buckets, _seconds(end), side="right"))
+        end_byte = self.offsets[last] if last < len(self.offsets) else os.path.getsize(self.log_path)
+        end_row = self.first_rows[last] if last < len(self.first_rows) else self.rows
+        return self.offsets[first], end_byte, self.first_rows[first], end_row
+
+    def query(self, start, end):
+        """
+        Rows with start <= Start_Time_Absolute < end, as a log_reader.LogTable, reading only their part of the log.
+        """
+        first_byte, end_byte, _, _ = self.locate(start, end)
+        with open(self.log_path, "rb") as f:
+            header = f.readline()
+            f.seek(first_byte)
+            body = f.read(max(0, end_byte - first_byte))
+        table = parse_log(header, body)
+        times = table[TIME_COLUMN]
+        start_us, end_us = (np.datetime64(int(round(_seconds(t) * 1e6)), "us") for t in (start, end))
+        return table.select((times >= start_us) & (times < end_us))
+
+
+def read_range(log_path, start, end, bucket_seconds=60):
+    """Rows of log_path with start <= Start_Time_Absolute < end (index built or updated if needed)."""
+    return LogIndex(log_path, bucket_seconds).query(start, end)
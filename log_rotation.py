@@ -0,0 +1,269 @@
+"""
+Log Rotation
+
+Description- Size / calendar rotation of the ON/OFF event log with a summary file per closed segment.
+
+RotatingLog writes the event rows (onoff_state.format_event_row) to a segment file and starts a new segment, with
+its own header, before the row that would take it past max_bytes or into a new hour/day/week.  The first segment
+keeps the run's file name, later ones are named by their start time the same way (YYYYmmdd_HHMMSS.csv).  Each
+segment gets its time index (log_index.py).
+
+While rows are written a SegmentSummary is kept up to date, and when a segment closes it is written next to it as
+<segment>_summary.csv (one row):
+    Segment, First_Start, Last_End, Events, ON_Events, OFF_Events, ON_Seconds, OFF_Seconds, Line_Min, Line_Max,
+    Dropouts
+so reports over a whole run read the small summary files only, and each closed segment can be exported on its own
+(on_close callback) while monitoring goes on.
+
+Example (report over all segments in a directory, summaries of crashed runs are rebuilt from their logs):
+    python log_rotation.py C:/Users/me/Desktop
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import argparse
+import datetime
+import math
+import os
+from glob import glob
+
+import numpy as np
+
+from log_index import LogIndex
+from log_reader import read_log
+from onoff_state import format_event_row
+
+ROTATE_PERIODS = ("hour", "day", "week")
+SUMMARY_SUFFIX = "_summary.csv"
+SUMMARY_FIELDS = ("Segment", "First_Start", "Last_End", "Events", "ON_Events", "OFF_Events", "ON_Seconds",
+                  "OFF_Seconds", "Line_Min", "Line_Max", "Dropouts")
+
+
+def period_key(timestamp, period):
+    """Calendar hour, day or ISO week of a datetime (None for no calendar rotation)."""
+    if period == "hour":
+        return timestamp.strftime("%Y%m%d%H")
+    if period == "day":
+        return timestamp.date()
+    if period == "week":
+        return timestamp.isocalendar()[:2]
+    return None
+
+
+def summary_path(segment_path):
+    return os.path.splitext(segment_path)[0] + SUMMARY_SUFFIX
+
+
+class SegmentSummary:
+    """
+    Running totals of the event rows of one segment.  Drop-out rows are the ones with a label.
+    """
+    def __init__(self, segment=""):
+        self.segment = segment
+        self.first_start = None
+        self.last_end = None
+        self.events = 0
+        self.on_events = 0
+        self.off_events = 0
+        self.on_seconds = 0.0
+        self.off_seconds = 0.0
+        self.line_min = math.inf
+        self.line_max = -math.inf
+        self.dropouts = 0
+
+    def update(self, row):
+        """Adds one row (log_event / format_event_row keyword arguments)."""
+        if self.first_start is None:
+            self.first_start = row["start_time"]
+        self.last_end = row["end_time"]
+        if row.get("label"):
+            self.dropouts += 1
+            return
+        self.events += 1
+        try:
+            duration = float(row["duration"])
+        except (TypeError, ValueError):
+            duration = 0.0
+        if row["state"] == "ON":
+            self.on_events += 1
+            self.on_seconds += duration
+            summary = row.get("summary")
+            if summary and summary["count"]:
+                self._line(summary["min"], summary["max"])
+            elif row["line_v"]:
+                self._line(row["line_v"], row["line_v"])
+        else:
+            self.off_events += 1
+            self.off_seconds += duration
+
+    def _line(self, low, high):
+        self.line_min = min(self.line_min, low)
+        self.line_max = max(self.line_max, high)
+
+    @classmethod
+    def from_log(cls, path):
+        """Summary computed from a whole segment file (e.g. the last segment of a run that crashed)."""
+        log = read_log(path)
+        summary = cls(os.path.basename(path))
+        if not len(log):
+            return summary
+        # Label is the last column ("Drop-out Check (N sec)" or "Label"), after Line_P99 and any power columns
+        label = log.names[-1]
+        labelled = label == "Label" or label.startswith("Drop-out Check")
+        dropout = log[label] != "" if labelled else np.zeros(len(log), dtype=bool)
+        state = log["State"]
+        duration = np.nan_to_num(log["Duration_Seconds"])
+        on = (state == "ON") & ~dropout
+        off = (state != "ON") & ~dropout
+        summary.first_start = log["Start_Time_Absolute"][0].astype(datetime.datetime)
+        summary.last_end = log["End_Time_Absolute"][-1].astype(datetime.datetime)
+        summary.events = int(np.count_nonzero(~dropout))
+        summary.on_events = int(np.count_nonzero(on))
+        summary.off_events = int(np.count_nonzero(off))
+        summary.on_seconds = float(duration[on].sum())
+        summary.off_seconds = float(duration[off].sum())
+        low = np.where(np.isnan(log["Line_Min"]), log["Line Voltage"], log["Line_Min"])[on]
+        high = np.where(np.isnan(log["Line_Max"]), log["Line Voltage"], log["Line_Max"])[on]
+        low, high = low[low > 0], high[high > 0]
+        if len(low):
+            summary.line_min, summary.line_max = float(low.min()), float(high.max())
+        summary.dropouts = int(np.count_nonzero(dropout))
+        return summary
+
+    def fields(self):
+        def stamp(value):
+            return value.strftime('%Y-%m-%d %H:%M:%S.%f') if value else ""
+
+        def volts(value):
+            return f"{value:.3f}" if math.isfinite(value) else ""
+
+        return [self.segment, stamp(self.first_start), stamp(self.last_end), str(self.events), str(self.on_events),
+                str(self.off_events), f"{self.on_seconds:.3f}", f"{self.off_seconds:.3f}", volts(self.line_min),
+                volts(self.line_max), str(self.dropouts)]
+
+    def write(self, path):
+        with open(path, "w") as f:
+            f.write(",".join(SUMMARY_FIELDS) + "\n")
+            f.write(",".join(self.fields()) + "\n")
+
+
+def read_summary(path):
+    """Summary file to a dict of typed values."""
+    with open(path) as f:
+        lines = f.read().splitlines()
+    values = dict(zip(SUMMARY_FIELDS, lines[1].split(","))) if len(lines) > 1 else {}
+    for name in ("Events", "ON_Events", "OFF_Events", "Dropouts"):
+        values[name] = int(values.get(name) or 0)
+    for name in ("ON_Seconds", "OFF_Seconds", "Line_Min", "Line_Max"):
+        values[name] = float(values[name]) if values.get(name) else math.nan
+    return values
+
+
+class RotatingLog:
+    """
+    Args:
+        directory: Directory of the segments.
+        first_name: File name of the first segment (created with its header by the caller, or here if missing).
+        header: CSV header line (onoff_state.csv_header) for new segments.
+        max_bytes: Start a new segment before a row that would exceed this size (None = no size limit).
+        period: "hour", "day" or "week" to also start a new segment at calendar boundaries (None = off).
+        on_close: Called with the path of every segment that is closed (after its summary is written).
+    """
+    def __init__(self, directory, first_name, header, max_bytes=None, period=None, on_close=None):
+        if period not in (None,) + ROTATE_PERIODS:
+            raise ValueError(f"period must be one of {ROTATE_PERIODS}")
+        self.directory = directory
+        self.header = header
+        self.max_bytes = max_bytes
+        self.period = period
+        self.on_close = on_close
+        self.segments = []
+        self._open(os.path.join(directory, first_name))
+
+    def _open(self, path):
+        if not os.path.exists(path) or not os.path.getsize(path):
+            with open(path, "w") as f:
+                f.write(self.header + "\n")
+        self.path = path
+        self.segments.append(path)
+        self.size = os.path.getsize(path)
+        self.summary = SegmentSummary(os.path.basename(path))
+        self.index = LogIndex(path)
+        self._period = None
+
+    def _next_path(self, timestamp):
+        name = timestamp.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.directory, name + ".csv")
+        suffix = 1
+        while os.path.exists(path):
+            suffix += 1
+            path = os.path.join(self.directory, f"{name}_{suffix}.csv")
+        return path
+
+    def _close_segment(self):
+        self.summary.write(summary_path(self.path))
+        if self.on_close is not None:
+            self.on_close(self.path)
+
+    def write(self, row):
+        """Appends one event row (format_event_row keyword arguments), rotating first if due."""
+        line = format_event_row(**row) + "\n"
+        when = row["end_time"]
+        key = period_key(when, self.period)
+        if self.summary.first_start is not None:
+            too_big = self.max_bytes and self.size + len(line) > self.max_bytes
+            if too_big or (key is not None and key != self._period):
+                self._close_segment()
+                self._open(self._next_path(when))
+        self._period = key
+        self.index.add(row["start_time"])
+        with open(self.path, "a") as f:
+            f.write(line)
+        self.size = os.path.getsize(self.path)
+        self.summary.update(row)
+
+    def close(self):
+        """Closes the last segment (summary file, on_close)."""
+        if self.path is not None:
+            self._close_segment()
+            self.path = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report over ON/OFF log segments from their summary files")
+    parser.add_argument('directory', help='Directory of the log segments')
+    args = parser.parse_args()
+
+    rows = []
+    for path in sorted(glob(os.path.join(args.directory, "*.csv"))):
+        if path.endswith(SUMMARY_SUFFIX) or path.endswith("_context.csv") or "_evt" in os.path.basename(path):
+            continue
+        if os.path.exists(summary_path(path)):
+            rows.append(read_summary(summary_path(path)))
+            continue
+        try:
+            summary = SegmentSummary.from_log(path)     # segment without a summary (run did not end cleanly)
+        except ValueError:
+            continue                                    # not an ON/OFF log
+        summary.write(summary_path(path))
+        rows.append(read_summary(summary_path(path)))
+
+    print("Segment                  Events   ON    OFF   ON hours  OFF hours  Line min  Line max  Drop-outs")
+    for r in rows:
+        print(f"{r['Segment']:24s} {r['Events']:6d} {r['ON_Events']:5d} {r['OFF_Events']:5d} "
+              f"{r['ON_Seconds'] / 3600:9.2f} {r['OFF_Seconds'] / 3600:10.2f} {r['Line_Min']:9.3f} "
+              f"{r['Line_Max']:9.3f} {r['Dropouts']:10d}")
+    if rows:
+        # Segments without ON periods have no line voltage (NaN), which min()/max() would pass through by position
+        line_min = [r['Line_Min'] for r in rows if math.isfinite(r['Line_Min'])]
+        line_max = [r['Line_Max'] for r in rows if math.isfinite(r['Line_Max'])]
+        print(f"{'Total':24s} {sum(r['Events'] for r in rows):6d} {sum(r['ON_Events'] for r in rows):5d} "
+              f"{sum(r['OFF_Events'] for r in rows):5d} {sum(r['ON_Seconds'] for r in rows) / 3600:9.2f} "
+              f"{sum(r['OFF_Seconds'] for r in rows) / 3600:10.2f} {min(line_min, default=math.nan):9.3f} "
+              f"{max(line_max, default=math.nan):9.3f} {sum(r['Dropouts'] for r in rows):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+ON/OFF State
+
+Description- AC Line ON/OFF state machine used by PowerMonitoring-LogOnOffTimes, as a pure, steppable component.
+
+The state machine holds no instrument, file or clock.  Each step() takes one reading (timestamp, AC Line Vrms,
+amp output Vrms list) and returns the events it produced: console messages and the event rows that are logged
+to the CSV file.  The same code runs live and in replay (replay_onoff.py), so a threshold or debounce change can be
+validated against recordings or simulator profiles at thousands of times real time.
+
+Covers: initial state, ON/OFF debounce (consecutive confirmations), settling time for the steady state line voltage,
+ON-period line/amp statistics, periodic amp output drop-out check, and the final entry at the end of a run.
+
+The "Line Voltage" of an ON row is the steady state line voltage as before: the running (LINE_VOLTAGE_WINDOW_SIZE)
+average at the last settled ON reading, or the peak if the period ended while settling.  Line_Mean/Min/Max/P99 cover
+the ON period's readings; from the first reading below the OFF level, readings are held back while the OFF
+confirmation runs and only added if it is cancelled, so the readings of the confirmed OFF never reach Line_Min.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+from power_meter import POWER_COLUMNS, format_power
+from stream_stats import ChannelStats
+
+LINE_VOLTAGE_WINDOW_SIZE = 3        # window size for the running average on AC Line
+SETTLING_TIME = 3.0                 # seconds for better AC line measurements
+ON_CONFIRMATION_THRESHOLD = 2       # consecutive readings required to confirm ON
+OFF_CONFIRMATION_THRESHOLD = 2      # consecutive readings required to confirm OFF
+DROPOUT_LINE_MARGIN = 15            # volts above the OFF level before amp drop-outs are checked
+
+
+def csv_header(dropout_enabled, dropout_interval, power_names=()):
+    """
+    Header line (no newline) for the ON/OFF event CSV file.  power_names adds the PowerMeter columns of each pair.
+    """
+    header_list = [
+        "Event_Count",
+        "Start_Time_Absolute",
+        "End_Time_Absolute",
+        "Line Voltage",
+        "State",
+        "Duration_Seconds",
+        "Line_Mean",
+        "Line_Min",
+        "Line_Max",
+        "Line_P99"
+    ]
+    for name in power_names:
+        header_list.extend(f"{name}_{column}" for column in POWER_COLUMNS)
+    if dropout_enabled:
+        header_list.append(f"Drop-out Check ({dropout_interval} sec)")
+    return ",".join(header_list)
+
+
+def format_event_row(count, start_time, end_time, line_v, state, duration, label="", summary=None, power=None):
+    """
+    One CSV event line (no newline).  duration is in seconds formatted to 3 decimal places. If unable, log as string.
+    summary is an optional ChannelStats summary dict (ON periods) for the line voltage columns.
+    power is the list of PowerMeter pair summaries (None items blank) when power columns are logged.
+    """
+    try:
+        # Try formatting duration as a float with 3 decimal places
+        duration_str = f"{float(duration):9.3f}"
+    except (ValueError, TypeError):
+        # If formatting fails, log as string
+        duration_str = f"{str(duration):>9}"
+
+    if summary and summary["count"]:
+        summary_str = f"{summary['mean']:.3f},{summary['min']:.3f},{summary['max']:.3f},{summary['p']:.3f}"
+    else:
+        summary_str = ",,,"
+    if power is not None:
+        summary_str += "," + format_power(power)
+
+    # Rather than ISO 8601 timestamp, replace T with a space for conversion to Excel datetime format later.
+    # Excel custom format will be yyyy-mmm-dd hh:mm:ss.000
+    return (f"{count},{start_time.strftime('%Y-%m-%d %H:%M:%S.%f')},"
+            f"{end_time.strftime('%Y-%m-%d %H:%M:%S.%f')},{line_v:.3f},"
+            f"{state},{duration_str},{summary_str},{label}")
+
+
+class OnOffEvent:
+    """
+    Output of the state machine.  kind is one of 'initial', 'first', 'ON', 'OFF', 'dropout' or 'final'.
+    row holds the log_event/format_event_row keyword arguments, or None if nothing is logged.
+    """
+    def __init__(self, kind, message, row=None):
+        self.kind = kind
+        self.message = message
+        self.row = row
+
+
+class LoadCheckGate:
+    """
+    Decides when the amplifier channels are read: not while a line transition is pending, and otherwise
+    on the first reading, when forced, or once check_interval seconds have passed.
+    """
+    def __init__(self):
+        self.last_check = 0.0
+
+    def due(self, now, current_state, v_line, check_interval, low_limit=None, high_limit=None, force=False):
+        # Determine if a transition is "pending" (e.g., Line dropped while we were ON)
+        if current_state == "ON" and low_limit is not None and v_line <= low_limit:
+            return False
+        if current_state == "OFF" and high_limit is not None and v_line >= high_limit:
+            return False
+        if current_state == "UNKNOWN" or force or (now - self.last_check > check_interval):
+            self.last_check = now
+            return True
+        return False
+
+
+class OnOffStateMachine:
+    """
+    AC Line ON/OFF detection with hysteresis (high/low limits) and debounce, plus amp output drop-out checks.
+    """
+    def __init__(self, ac_line_high_limit, ac_line_low_limit, amp_high_limit=5.0, num_amp_channels=0,
+                 dropout_enabled=False, dropout_delay=10, settling_time=SETTLING_TIME,
+                 on_confirmations=ON_CONFIRMATION_THRESHOLD, off_confirmations=OFF_CONFIRMATION_THRESHOLD,
+                 power_meter=None):
+        self.ac_line_high_limit = ac_line_high_limit
+        self.ac_line_low_limit = ac_line_low_limit
+        self.amp_high_limit = amp_high_limit
+        self.num_amp_channels = num_amp_channels
+        self.dropout_enabled = dropout_enabled
+        self.dropout_delay = dropout_delay
+        self.settling_time = settling_time
+        self.on_confirmations = on_confirmations
+        self.off_confirmations = off_confirmations
+        self.power_meter = power_meter      # optional PowerMeter: power columns in every row, values in ON rows
+
+        self.current_state = "UNKNOWN"
+        self.start_time = None
+        self.last_state_time = None
+        self.event_counter = 0
+        self.first_transition_logged = False
+        self.on_confirmation_count = 0
+        self.off_confirmation_count = 0
+        self.line_stats = ChannelStats(window=LINE_VOLTAGE_WINDOW_SIZE)  # running average on line voltage
+        self._reset_period_stats()
+
+    def _reset_period_stats(self):
+        self.on_period_stats = ChannelStats()     # line voltage over the whole ON period (summary logged at ON->OFF)
+        self.settled_stats = ChannelStats()       # line voltage after settling_time (e.g. nominal for cycle RMS)
+        self.steady_line_voltage = 0.0            # logged Line Voltage: settled running average, peak while settling
+        self._off_pending = []                    # line readings during an OFF confirmation
+        self.amp_stats = [ChannelStats() for _ in range(self.num_amp_channels)]
+        if self.power_meter is not None:
+            self.power_meter.reset(self.last_state_time)
+
+    def _row(self, power_until=None, **row):
+        """Event row dict, with the power columns (ON period values up to power_until, else blank) if metered."""
+        if self.power_meter is not None:
+            row["power"] = (self.power_meter.summary(power_until) if power_until is not None
+                            else [None] * len(self.power_meter.pairs))
+        return row
+
+    def set_initial_state(self, state, when):
+        """
+        Sets the initial ON or OFF state (before the first transition), e.g. from one reading in trigger mode.
+        """
+        self.current_state = state
+        self.start_time = when
+        if state == "ON" or self.last_state_time is None:
+            self.last_state_time = when
+        return OnOffEvent("initial", f"Initial state detected as {state}. Waiting for next transition.")
+
+    def step(self, meas_time, ac_line_voltage, amp_readings=()):
+        """
+        Evaluates one reading.  amp_readings holds one Vrms per amp channel, None where not read this cycle.
+        Returns a list of OnOffEvent.
+        """
+        self.line_stats.update(ac_line_voltage)
+        avg_line = self.line_stats.window_mean
+        # using 'instantaneous' rms values for Fast ON, Fast OFF
+        ac_line_on = ac_line_voltage >= self.ac_line_high_limit
+        ac_line_off = ac_line_voltage <= self.ac_line_low_limit
+        current_state = self.current_state
+
+        # State Establishment (define current state)
+        if current_state == "UNKNOWN":
+            if ac_line_on:
+                return [self.set_initial_state("ON", meas_time)]
+            if ac_line_off:
+                return [self.set_initial_state("OFF", meas_time)]
+            # Still in an indeterminate state or no clear ON/OFF. Keep current_state as UNKNOWN.
+            return []
+
+        events = []
+        # Assume no change unless clear transition from current_state to new_actual_state
+        new_actual_state = current_state
+
+        # Transition from OFF to ON with debounce count
+        if current_state == "OFF":
+            if ac_line_on:
+                self.on_confirmation_count += 1
+            elif ac_line_off:  # Only reset if we are sure it's still solidly OFF
+                self.on_confirmation_count = 0
+            if self.on_confirmation_count >= self.on_confirmations:
+                new_actual_state = "ON"
+                self.on_confirmation_count = 0
+                self.off_confirmation_count = 0
+
+        # Transition from ON to OFF with debounce count
+        elif current_state == "ON":
+            if ac_line_off:
+                self.off_confirmation_count += 1
+            elif ac_line_on:  # Only reset if we are sure it's still solidly ON
+                self.off_confirmation_count = 0
+            if self.off_confirmation_count >= self.off_confirmations:
+                new_actual_state = "OFF"
+                self.off_confirmation_count = 0
+                self.on_confirmation_count = 0
+
+        # Update steady state voltage logic for better AC line measurements after settling
+        if current_state == "ON":
+            elapsed = (meas_time - self.last_state_time).total_seconds()
+            if self.off_confirmation_count or new_actual_state != "ON":
+                self._off_pending.append(ac_line_voltage)       # dropped if the OFF is confirmed
+            else:
+                for v in self._off_pending:
+                    self.on_period_stats.update(v)
+                self._off_pending = []
+                self.on_period_stats.update(ac_line_voltage)
+            if elapsed < self.settling_time:
+                self.steady_line_voltage = max(self.steady_line_voltage, ac_line_voltage)
+            elif ac_line_on and not ac_line_off:
+                self.steady_line_voltage = avg_line
+                self.settled_stats.update(ac_line_voltage)
+            for stats, v in zip(self.amp_stats, amp_readings):
+                stats.update(v)
+            if self.power_meter is not None and any(v is not None for v in amp_readings):
+                self.power_meter.update(meas_time, [ac_line_voltage, *amp_readings])
+
+            # Periodic Dropout Check  (recheck AC power is stable and not close to turning off)
+            if (self.dropout_enabled and None not in amp_readings and new_actual_state == "ON"
+                    and ac_line_voltage > (self.ac_line_low_limit + DROPOUT_LINE_MARGIN)):
+                if elapsed > self.dropout_delay:
+                    if not all(v >= self.amp_high_limit for v in amp_readings):
+                        self.event_counter += 1
+                        min_amp_out = min(amp_readings)
+                        # Drop-out records meas_time twice (both the start and end time) to note 'instance' of event
+                        events.append(OnOffEvent(
+                            "dropout",
+                            f"[{meas_time.strftime('%H:%M:%S')}] DROP-OUT DETECTED!  "
+                            f"Line Voltage: {avg_line:6.3f}Vrms, "
+                            f"Amp Out MIN: {min_amp_out:6.3f}Vrms)",
+                            self._row(count=self.event_counter, start_time=meas_time, end_time=meas_time,
+                                      line_v=avg_line, state="ON", duration="N/A",
+                                      label=f"* Amp Out MIN: {min_amp_out:.1f}Vrms")))
+
+        if new_actual_state != current_state:
+            events.extend(self.transition(new_actual_state, meas_time, ac_line_voltage))
+        return events
+
+    def transition(self, new_state, when, ac_line_voltage=0.0):
+        """
+        Confirmed transition to new_state at 'when'.  The first transition only starts timing;
+        later ones log the duration of the state just ended.  Returns a list of OnOffEvent.
+        """
+        if not self.first_transition_logged:
+            self.current_state = new_state
+            self.start_time = when
+            self.last_state_time = when
+            self._reset_period_stats()
+            self.first_transition_logged = True
+            return [OnOffEvent("first", f"[{when.strftime('%H:%M:%S')}] First transition detected: System is now {new_state}.")]
+
+        # This is a subsequent transition; start logging from this point on
+        duration = (when - self.start_time).total_seconds()
+        self.event_counter += 1
+        if self.current_state == "OFF" and new_state == "ON":
+            # Transition from OFF to ON  (log the previous OFF state, reset timers, line voltage, off trigger)
+            event = OnOffEvent(
+                "ON",
+                f"[{when.strftime('%H:%M:%S')}] ON.   Detected line voltage is {ac_line_voltage:8.3f} Vrms.  "
+                f"(Previous OFF duration was {duration:8.3f} sec.)",
+                self._row(count=self.event_counter, start_time=self.start_time, end_time=when, line_v=0.0,
+                          state="OFF", duration=duration))
+            self.current_state = "ON"
+            self.start_time = when
+            self.last_state_time = when
+            self._reset_period_stats()
+            return [event]
+
+        # Transition from ON to OFF
+        # Determine the line voltage to log (running average when last settled, else peak while settling)
+        voltage_to_log = self.steady_line_voltage
+        on_summary = self.on_period_stats.summary()
+        message = (f"[{when.strftime('%H:%M:%S')}] OFF.  ON  duration was {duration:8.3f} sec at {voltage_to_log:6.3f} Vrms line.\n"
+                   f"           Line Vrms mean: {on_summary['mean']:6.3f}, min: {on_summary['min']:6.3f}, "
+                   f"max: {on_summary['max']:6.3f}, p99: {on_summary['p']:6.3f}")
+        for i, stats in enumerate(self.amp_stats):
+            if stats.count:
+                amp_summary = stats.summary()
+                message += (f"\n           CH{i + 2} Vrms mean: {amp_summary['mean']:6.3f}, min: {amp_summary['min']:6.3f}, "
+                            f"max: {amp_summary['max']:6.3f}, p99: {amp_summary['p']:6.3f}")
+        event = OnOffEvent(
+            "OFF", message,
+            self._row(when, count=self.event_counter, start_time=self.start_time, end_time=when,
+                      line_v=voltage_to_log, state="ON", duration=duration, summary=on_summary))
+        self.current_state = "OFF"
+        self.start_time = when
+        return [event]
+
+    def finish(self, final_time):
+        """
+        Final log entry for the state in progress when the run ends.  Returns an OnOffEvent.
+        """
+        self.event_counter += 1
+        start_time = self.start_time if self.start_time is not None else final_time
+        duration = (final_time - start_time).total_seconds()
+        final_voltage_to_log = 0.000 # Default to 0.0
+
+        # Only attempt to use the running line voltage average if there is data
+        if self.line_stats.count > 0:
+            final_voltage_to_log = self.line_stats.window_mean
+
+        if self.current_state == "OFF":
+            # Always log 0.0 for line voltage if the final state is OFF
+            return OnOffEvent(
+                "final", "Program stopped.",
+                self._row(count=self.event_counter, start_time=start_time, end_time=final_time, line_v=0.0,
+                          state=self.current_state, duration=duration))
+
+        # If the final state was ON
+        # This handles cases where the program exits very quickly after starting with initial states
+        message = ""
+        if self.event_counter == 0 or (self.event_counter == 1 and duration < 1.0): # 1 means the initial state captured.
+            final_voltage_to_log = 0.0 # Hardcode as too early in program for accurate readings
+            message = "Program early termination.\n"
+        message += (f"Program stopped. Final {self.current_state} duration: {duration:.3f} seconds. "
+                    f"Line Voltage: {final_voltage_to_log:.3f}Vrms")
+        return OnOffEvent(
+            "final", message,
+            self._row(final_time if self.current_state == "ON" else None, count=self.event_counter,
+                      start_time=start_time, end_time=final_time, line_v=final_voltage_to_log,
+                      state=self.current_state, duration=duration, summary=self.on_period_stats.summary()))
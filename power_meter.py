@@ -0,0 +1,204 @@
+"""
+Power Meter
+
+Description- Real power, apparent power, power factor and energy of amplifier outputs, per ON period.
+
+Channel pairs are declared as voltage/current or as voltage into a known load, e.g. --power "2:3,4@8":
+    2:3     CH2 is the output voltage, CH3 the output current (current probe, scope set to amps)
+    4@8     CH4 is the output voltage into an 8 ohm (resistive) load
+No extra scope queries are made; power comes from the data the monitor already reads:
+    RMS readings (every amp load check)   V@R pairs: P = S = Vrms^2 / R, PF 1
+                                          V/I pairs: S = Vrms * Irms, P = S * PF of the latest capture
+    waveform captures (--analysis-interval) V/I pairs: P = mean(v * i), S = Vrms * Irms, PF = P / S, all pairs in
+                                          one vectorized pass (waveform_power)
+Energy integrates P over time (each reading held until the next), and the ON period row gets per pair
+    <CHv>_Real_W, <CHv>_Apparent_VA, <CHv>_PF, <CHv>_Energy_Wh
+(time-weighted means over the period; blank where unknown, e.g. a V/I pair before its first capture).
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import math
+import re
+
+import numpy as np
+
+POWER_COLUMNS = ("Real_W", "Apparent_VA", "PF", "Energy_Wh")
+_PAIR = re.compile(r"^\s*(\d+)\s*(?::\s*(\d+)|@\s*([0-9.]+))\s*$")
+
+
+class PowerPair:
+    """
+    Args:
+        voltage_channel: Scope channel of the voltage.
+        current_channel: Scope channel of the current, or None.
+        load_ohms: Load impedance when there is no current channel.
+    """
+    def __init__(self, voltage_channel, current_channel=None, load_ohms=None):
+        if (current_channel is None) == (load_ohms is None):
+            raise ValueError("A power pair needs a current channel or a load impedance")
+        if load_ohms is not None and load_ohms <= 0:
+            raise ValueError("Load impedance must be positive")
+        self.voltage_channel = voltage_channel
+        self.current_channel = current_channel
+        self.load_ohms = load_ohms
+
+    @property
+    def name(self):
+        return f"CH{self.voltage_channel}"
+
+    @property
+    def channels(self):
+        return (self.voltage_channel,) if self.current_channel is None else (self.voltage_channel, self.current_channel)
+
+    def __repr__(self):
+        other = f":{self.current_channel}" if self.current_channel is not None else f"@{self.load_ohms:g}"
+        return f"{self.voltage_channel}{other}"
+
+
+def parse_power_pairs(spec):
+    """'2:3,4@8' -> [PowerPair(2, current_channel=3), PowerPair(4, load_ohms=8.0)].  Raises ValueError."""
+    pairs = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        match = _PAIR.match(item)
+        if not match:
+            raise ValueError(f"Power pair '{item.strip()}' is not 'V:I' or 'V@ohms'")
+        voltage, current, ohms = match.groups()
+        pairs.append(PowerPair(int(voltage), int(current) if current else None, float(ohms) if ohms else None))
+    used = [channel for pair in pairs for channel in pair.channels]
+    if len(used) != len(set(used)):
+        raise ValueError("A channel is used in more than one power pair")
+    return pairs
+
+
+def waveform_power(volts, amps):
+    """
+    Real power, apparent power and power factor of simultaneous voltage and current records, one row per pair.
+
+    Args:
+        volts, amps: (pairs, samples) arrays (or 1-D for one pair), same sample times.
+
+    Returns:
+        (real W, apparent VA, power factor) arrays, one value per pair.
+    """
+    volts = np.atleast_2d(np.asarray(volts, dtype=np.float64))
+    amps = np.atleast_2d(np.asarray(amps, dtype=np.float64))
+    n = volts.shape[1]
+    real = np.einsum("ij,ij->i", volts, amps) / n
+    apparent = np.sqrt(np.einsum("ij,ij->i", volts, volts) / n * np.einsum("ij,ij->i", amps, amps) / n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        factor = np.where(apparent > 0, real / apparent, np.nan)
+    return real, apparent, factor
+
+
+class PowerMeter:
+    """
+    Power and energy of the declared pairs over one ON period.  Readings are indexed by channel - 1 (CH1 first).
+    """
+    def __init__(self, pairs):
+        self.pairs = list(pairs)
+        self.names = [pair.name for pair in self.pairs]
+        self._voltage = np.array([pair.voltage_channel - 1 for pair in self.pairs], dtype=np.intp)
+        self._current = np.array([(pair.current_channel or pair.voltage_channel) - 1 for pair in self.pairs],
+                                 dtype=np.intp)
+        self._has_current = np.array([pair.current_channel is not None for pair in self.pairs])
+        ohms = np.array([pair.load_ohms or 1.0 for pair in self.pairs], dtype=np.float64)
+        self._siemens = np.where(self._has_current, np.nan, 1.0 / ohms)
+        self.power_factor = np.where(self._has_current, np.nan, 1.0)   # from the latest capture (V/I pairs)
+        self.reset(None)
+
+    @property
+    def channels(self):
+        """Every channel used by a pair."""
+        return sorted({channel for pair in self.pairs for channel in pair.channels})
+
+    def reset(self, when):
+        """Starts a new period at when."""
+        self.start = when
+        self._last_time = None
+        self._real = np.full(len(self.pairs), np.nan)
+        self._apparent = np.full(len(self.pairs), np.nan)
+        self._energy = np.zeros(len(self.pairs))           # joules
+        self._apparent_energy = np.zeros(len(self.pairs))
+        self._covered = np.zeros(len(self.pairs))          # seconds with a known value
+
+    def _hold(self, until):
+        """Integrates the latest power up to until (zero-order hold)."""
+        if self._last_time is None:
+            return
+        dt = (until - self._last_time).total_seconds()
+        if dt <= 0:
+            return
+        known = ~np.isnan(self._real)
+        self._energy[known] += self._real[known] * dt
+        self._apparent_energy[known] += self._apparent[known] * dt
+        self._covered[known] += dt
+
+    def update(self, when, readings):
+        """
+        Adds one set of RMS readings (Vrms, or Arms for current channels).  None = channel not read this cycle.
+        """
+        values = np.array([np.nan if v is None else v for v in readings], dtype=np.float64)
+        needed = max(self._voltage.max(initial=-1), self._current.max(initial=-1)) + 1
+        values = np.append(values, np.full(max(0, needed - len(values)), np.nan))
+        vrms = values[self._voltage]
+        irms = np.where(self._has_current, values[self._current], vrms * self._siemens)
+        apparent = vrms * irms
+        self._hold(when)
+        self._real = apparent * self.power_factor
+        self._apparent = apparent
+        self._last_time = when
+
+    def update_waveforms(self, records):
+        """
+        Power factor of the V/I pairs from one capture.  records maps channel -> volts (or amps) array; all records
+        must be from the same acquisition.  Returns (real, apparent, factor) of the pairs that had both records.
+        """
+        index = [i for i, pair in enumerate(self.pairs)
+                 if pair.current_channel is not None and pair.voltage_channel in records and pair.current_channel in records]
+        if not index:
+            return None
+        length = min(len(records[channel]) for i in index for channel in self.pairs[i].channels)
+        volts = np.stack([np.asarray(records[self.pairs[i].voltage_channel][:length]) for i in index])
+        amps = np.stack([np.asarray(records[self.pairs[i].current_channel][:length]) for i in index])
+        real, apparent, factor = waveform_power(volts, amps)
+        power_factor = self.power_factor.copy()
+        power_factor[index] = factor
+        self.power_factor = power_factor        # swapped whole; read by the evaluate thread
+        return real, apparent, factor
+
+    def summary(self, when):
+        """
+        Per pair dict real_w, apparent_va, pf, energy_wh over the period up to when (NaN where unknown).
+        """
+        self._hold(when)
+        if self._last_time is not None:
+            self._last_time = when
+        results = []
+        for i in range(len(self.pairs)):
+            if self._covered[i] > 0:
+                real = self._energy[i] / self._covered[i]
+                apparent = self._apparent_energy[i] / self._covered[i]
+                factor = real / apparent if apparent > 0 else math.nan
+                energy = self._energy[i] / 3600.0
+            else:
+                real = apparent = factor = energy = math.nan
+            results.append(dict(real_w=real, apparent_va=apparent, pf=factor, energy_wh=energy))
+        return results
+
+
+def format_power(power):
+    """CSV fields of a list of per-pair summaries (None = blank pair), without leading comma."""
+    fields = []
+    for pair in power:
+        if pair is None:
+            fields.extend([""] * len(POWER_COLUMNS))
+            continue
+        for key, digits in (("real_w", 3), ("apparent_va", 3), ("pf", 4), ("energy_wh", 4)):
+            value = pair[key]
+            fields.append(f"{value:.{digits}f}" if math.isfinite(value) else "")
+    return ",".join(fields)
@@ -0,0 +1,160 @@
+"""
+Ring Buffer
+
+Description- Constant-memory ring buffer of the most recent raw readings (timestamp, CH1 line, CH2+ amp outputs).
+
+The power monitors print every reading and then forget it, so a logged transition has no context.  ReadingRing keeps
+the last N readings in two preallocated NumPy arrays:
+    times   float64 seconds since the epoch (float32 would lose the sub-second part)
+    values  float32 Vrms, one column per channel, NaN = channel not read
+Appending overwrites the oldest slot in place, so memory stays the same for the whole run and an append is a couple
+of array stores (a few microseconds, nothing next to the 70 ms loop).
+
+One writer thread (the acquisition loop) and any number of reader threads (log stage, event context, dashboard) may
+share a ring: append() and the reads hold a lock, so a reader never sees a half-updated head/count or a slot being
+written.  between() binary-searches the (at most two) time-ordered runs of slots and copies only the requested span.
+
+With a path the arrays are a memory-mapped file instead.  The write position is kept in the file header, so after a
+crash the last readings can be read back with ReadingRing.open(path), and a restarted monitor continues the same ring.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import os
+import threading
+
+import numpy as np
+
+RING_MAGIC = b"RDRING01"
+HEADER_BYTES = 64       # magic, capacity, channels, head, count (int64), padded
+
+
+def capacity_for(hours, period=0.070):
+    """Number of slots for the given hours of readings at the loop period (seconds)."""
+    return max(1, int(round(hours * 3600.0 / period)))
+
+
+class ReadingRing:
+    """
+    Fixed-size ring of (timestamp, [channel Vrms, ...]) readings.
+
+    Args:
+        capacity: Number of readings kept.
+        num_channels: Channels per reading (CH1 line + amp outputs).
+        path: Optional file to memory-map.  An existing ring file with the same shape is reopened and continued.
+    """
+    def __init__(self, capacity, num_channels, path=None):
+        self.capacity = int(capacity)
+        self.num_channels = int(num_channels)
+        self.path = path
+        self._mmap = None
+        self._lock = threading.Lock()
+        if path is None:
+            self._header = np.zeros(4, dtype=np.int64)
+            self.times = np.zeros(self.capacity, dtype=np.float64)
+            self.values = np.full((self.capacity, self.num_channels), np.nan, dtype=np.float32)
+        else:
+            self._map_file(path)
+        self._head = int(self._header[2])
+        self._count = int(self._header[3])
+
+    def _map_file(self, path):
+        size = HEADER_BYTES + self.capacity * 8 + self.capacity * self.num_channels * 4
+        reuse = os.path.exists(path) and os.path.getsize(path) == size
+        if reuse:
+            with open(path, "rb") as f:
+                header = f.read(HEADER_BYTES)
+            capacity, num_channels = np.frombuffer(header, dtype=np.int64, count=2, offset=8)
+            reuse = header[:8] == RING_MAGIC and capacity == self.capacity and num_channels == self.num_channels
+        mode = "r+" if reuse else "w+"
+        self._mmap = np.memmap(path, dtype=np.uint8, mode=mode, shape=(size,))
+        if not reuse:
+            self._mmap[:8] = np.frombuffer(RING_MAGIC, dtype=np.uint8)
+        self._header = self._mmap[8:40].view(np.int64)
+        body = self._mmap[HEADER_BYTES:]
+        self.times = body[:self.capacity * 8].view(np.float64)
+        self.values = body[self.capacity * 8:].view(np.float32).reshape(self.capacity, self.num_channels)
+        if not reuse:
+            self._header[:] = (self.capacity, self.num_channels, 0, 0)
+            self.values[:] = np.nan
+
+    @classmethod
+    def open(cls, path):
+        """Reopens a ring file (e.g. after a crash) with the shape stored in its header."""
+        with open(path, "rb") as f:
+            header = f.read(HEADER_BYTES)
+        if header[:8] != RING_MAGIC:
+            raise ValueError(f"{path} is not a reading ring file")
+        capacity, num_channels = np.frombuffer(header, dtype=np.int64, count=2, offset=8)
+        return cls(int(capacity), int(num_channels), path)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, readings):
+        """
+        Stores one reading, overwriting the oldest when full.
+
+        Args:
+            timestamp: Seconds since the epoch (datetime.timestamp()).
+            readings: Channel Vrms values in channel order; None (not read) is stored as NaN, missing channels too.
+        """
+        if len(readings) == self.num_channels:
+            row = readings
+        else:
+            row = np.full(self.num_channels, np.nan, dtype=np.float32)
+            row[:len(readings)] = readings[:self.num_channels]
+        with self._lock:
+            i = self._head
+            self.times[i] = timestamp
+            self.values[i] = row
+            self._head = i + 1 if i + 1 < self.capacity else 0
+            if self._count < self.capacity:
+                self._count += 1
+            self._header[2] = self._head
+            self._header[3] = self._count
+
+    def latest(self, n=None):
+        """
+        The last n readings (all by default), oldest first, as copies (times, values).
+        """
+        with self._lock:
+            n = self._count if n is None else min(int(n), self._count)
+            idx = (np.arange(self._head - n, self._head)) % self.capacity
+            return self.times[idx], self.values[idx]
+
+    def _runs(self):
+        """(start, stop) slot ranges of the readings in time order (two when the ring has wrapped).  Under the lock."""
+        first = (self._head - self._count) % self.capacity
+        if first + self._count <= self.capacity:
+            return [(first, first + self._count)]
+        return [(first, self.capacity), (0, self._head)]
+
+    def between(self, t_start, t_end):
+        """
+        Readings with t_start <= timestamp <= t_end, oldest first, as copies (times, values).
+        """
+        times, values = [], []
+        with self._lock:
+            for start, stop in self._runs():
+                run = self.times[start:stop]
+                lo = start + np.searchsorted(run, t_start, side="left")
+                hi = start + np.searchsorted(run, t_end, side="right")
+                if hi > lo:
+                    times.append(self.times[lo:hi].copy())
+                    values.append(self.values[lo:hi].copy())
+        if not times:
+            return np.empty(0), np.empty((0, self.num_channels), dtype=np.float32)
+        return np.concatenate(times), np.concatenate(values)
+
+    def flush(self):
+        """Writes a memory-mapped ring to disk (the OS does this anyway; useful before a planned stop)."""
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap = None
@@ -0,0 +1,132 @@
+"""
+Scope Files
+
+Description- Streamed transfer of files from the scope's drive (FILESystem:READfile), e.g. screenshots.
+
+read_raw() collects the whole reply in small default-size chunks and joins them before anything is written.  Here the
+reply is read straight from the VISA library in large chunks:
+    - an IEEE 488.2 definite-length block (#<n><length><data>) is read into one preallocated buffer (or straight into
+      the destination file), exactly <length> bytes
+    - a bare file (what Tek MSO5/6 send) is streamed chunk by chunk until the END of the message
+Completion of SAVE:IMAGe is waited for with *OPC? instead of a fixed sleep, and the scope-side temp file is deleted
+with the completion query in one message.  Every transfer returns its size, time and MB/s.
+
+Works with a pyvisa resource, a TimedSession, or a tm_devices driver (its visa_resource is used).
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import time
+
+import pyvisa
+
+CHUNK_SIZE = 1024 * 1024        # bytes per VISA read (default pyvisa chunk is 20 kB)
+SCOPE_TEMP_IMAGE = "C:/Temp.png"
+
+
+def _resource(instr):
+    """The pyvisa resource behind a tm_devices driver, or instr itself."""
+    return getattr(instr, "visa_resource", instr)
+
+
+def _read_chunk(resource, size):
+    """One VISA read of up to size bytes.  Returns (bytes, True if this was the END of the message)."""
+    data, status = resource.visalib.read(resource.session, size)
+    return data, status != pyvisa.constants.StatusCode.success_max_count_read
+
+
+def _block_header(first):
+    """Parses '#<n><length>' at the start of the first chunk.  Returns (header length, data length) or None."""
+    if len(first) < 2 or first[:1] != b"#" or not first[1:2].isdigit():
+        return None
+    digits = int(first[1:2])
+    if digits == 0 or len(first) < 2 + digits:
+        return None     # indefinite-length block: treat as a stream
+    return 2 + digits, int(first[2:2 + digits])
+
+
+def transfer_report(stats):
+    """One line summary of a transfer."""
+    return (f"{stats['bytes'] / 1e6:.3f} MB in {stats['seconds'] * 1000:.0f} ms "
+            f"({stats['mb_per_s']:.2f} MB/s)")
+
+
+def read_file(instr, scope_path, dest_path=None, delete=False, chunk_size=CHUNK_SIZE):
+    """
+    Reads a file from the scope's drive.
+
+    Args:
+        instr: pyvisa resource, TimedSession or tm_devices driver.
+        scope_path: File on the scope, e.g. "C:/Temp.png".
+        dest_path: Local file to stream into; None returns the bytes instead.
+        delete: Delete the scope file afterwards (one 'FILESystem:DELEte;*OPC?' message).
+        chunk_size: Bytes per VISA read.
+
+    Returns:
+        (data or None, stats) where stats has bytes, seconds and mb_per_s.
+    """
+    resource = _resource(instr)
+    out = open(dest_path, "wb") if dest_path else None
+    t_start = time.perf_counter()
+    try:
+        resource.write(f'FILESystem:READfile "{scope_path}"')
+        first, end = _read_chunk(resource, chunk_size)
+        block = _block_header(first)
+
+        if block is not None:
+            header_length, length = block
+            buffer = bytearray(length) if out is None else None
+            view = memoryview(buffer) if buffer is not None else None
+            chunk = first[header_length:header_length + length]
+            received = 0
+            while True:
+                if view is not None:
+                    view[received:received + len(chunk)] = chunk
+                else:
+                    out.write(chunk)
+                received += len(chunk)
+                if received >= length or end:
+                    break
+                chunk, end = _read_chunk(resource, min(chunk_size, length - received))
+                chunk = chunk[:length - received]
+            while not end:
+                _, end = _read_chunk(resource, chunk_size)     # trailing terminator
+            data = buffer
+        else:
+            # Bare file: stream until the END of the message
+            pieces = [] if out is None else None
+            received = 0
+            chunk = first
+            while True:
+                if pieces is not None:
+                    pieces.append(chunk)
+                else:
+                    out.write(chunk)
+                received += len(chunk)
+                if end:
+                    break
+                chunk, end = _read_chunk(resource, chunk_size)
+            data = b"".join(pieces) if pieces is not None else None
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - t_start
+
+    if delete:
+        resource.query(f'FILESystem:DELEte "{scope_path}";*OPC?')
+    stats = {"bytes": received, "seconds": elapsed, "mb_per_s": received / 1e6 / elapsed if elapsed > 0 else 0.0}
+    return data, stats
+
+
+def save_screenshot(instr, dest_path=None, scope_path=SCOPE_TEMP_IMAGE, chunk_size=CHUNK_SIZE):
+    """
+    SAVE:IMAGe on the scope, wait for completion (*OPC?), stream it to the PC and delete the scope copy.
+
+    Returns:
+        (PNG bytes or None if written to dest_path, stats of the file transfer)
+    """
+    resource = _resource(instr)
+    resource.query(f'SAVE:IMAGe "{scope_path}";*OPC?')
+    return read_file(resource, scope_path, dest_path, delete=True, chunk_size=chunk_size)
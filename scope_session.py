@@ -0,0 +1,268 @@
+"""
+Scope Session
+
+Description- Thin session layer around a pyvisa instrument that times every query.
+
+Each query records the monotonic send and receive instants. A running round-trip time (RTT)
+estimate (smoothed RTT and RTT variance, as used for TCP retransmit timers) is kept so that a
+reading can be timestamped at the estimated instrument-side sample instant instead of the
+moment the reply finally reaches the PC.  RTT statistics are exposed so the user can see how
+much timing uncertainty the network link (VPN, LAN, VXI-11 handshake) adds.
+
+query_many() pipelines a batch of queries so N readings cost about one round trip instead of N:
+    - raw socket resources (TCPIP::<ip>::<port>::SOCKET, e.g. PowerMonitoring-LogOnOffTimes.py --socket-port 4000,
+      with newline read/write termination) write all N queries back to back and then read the N responses in order
+    - instruments that accept compound SCPI messages send one ';' joined message and split
+      the single ';' separated reply
+    - anything else falls back to one query at a time
+Each entry of the result is either the response string or the exception for that query only.
+A batch takes longer than one round trip (N writes, N replies), so its time is kept as separate batch statistics
+and left out of the RTT estimate; it still sets the send/receive window used for the sample instant.
+
+Timestamps come from perf_counter() offset by a wall-clock anchor, so readings within a run never jump with NTP.
+perf_counter() drifts against the (NTP disciplined) wall clock by tens of ppm, i.e. tens of ms per hour, so the anchor
+is retaken every REANCHOR_PERIOD seconds and on every rtt_report(); any NTP step then shows up once, at a re-anchor.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import time
+
+RTT_ALPHA = 0.125   # gain for smoothed RTT (1/8)
+RTT_BETA = 0.25     # gain for RTT variance (1/4)
+REANCHOR_PERIOD = 300.0     # seconds between wall-clock re-anchors of the perf_counter() timestamps
+
+
+class TimedSession:
+    """
+    Wraps a pyvisa instrument.  Anything not defined here (write, read_raw, close, timeout...)
+    is passed straight through to the instrument.
+    """
+    def __init__(self, instr):
+        self.instr = instr
+        # Anchor the monotonic clock to wall-clock time; retaken every REANCHOR_PERIOD against drift
+        self.reanchor()
+        self.last_send = None
+        self.last_recv = None
+        self.srtt = None
+        self.rttvar = 0.0
+        self.rtt_min = None
+        self.rtt_max = None
+        self.rtt_last = None
+        self.count = 0
+        self.batch_count = 0
+        self.batch_last = None
+        self.batch_avg = None
+
+    def __getattr__(self, name):
+        return getattr(self.instr, name)
+
+    def __setattr__(self, name, value):
+        # Keep instrument attributes (e.g. timeout) on the instrument itself
+        if name == "timeout" and "instr" in self.__dict__:
+            setattr(self.instr, name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    def query(self, command):
+        """
+        Sends a query and records the send/receive monotonic times and RTT.
+        """
+        t_send = time.perf_counter()
+        response = self.instr.query(command)
+        t_recv = time.perf_counter()
+        self.record_rtt(t_send, t_recv)
+        return response
+
+    def is_stream_transport(self):
+        """
+        True if the resource is a raw socket, where queued writes and reads may be pipelined.
+        VXI-11 (INSTR) and USBTMC pair every read with its own request.
+        """
+        return "SOCKET" in str(getattr(self.instr, "resource_name", "")).upper()
+
+    def query_many(self, commands, compound=False):
+        """
+        Pipelined query of several commands, e.g. the RMS value of each amplifier channel.
+
+        Args:
+            commands: List of query strings, answered in the same order.
+            compound: True if the instrument accepts ';' joined queries in one message.
+
+        Returns:
+            A list with one entry per command: the response string, or the exception raised
+            for that command.
+        """
+        commands = list(commands)
+        if len(commands) < 2:
+            return self._query_each(commands)
+        if self.is_stream_transport():
+            return self._query_stream(commands)
+        if compound:
+            return self._query_compound(commands)
+        return self._query_each(commands)
+
+    def _query_each(self, commands):
+        """One round trip per command; errors attributed to the failing command only."""
+        responses = []
+        for command in commands:
+            try:
+                responses.append(self.query(command))
+            except Exception as e:
+                responses.append(e)
+        return responses
+
+    def _query_stream(self, commands):
+        """Writes all commands back to back, then reads the responses in order."""
+        t_send = time.perf_counter()
+        try:
+            for command in commands:
+                self.instr.write(command)
+        except Exception:
+            # Nothing queued reliably, clear and fall back to one query at a time
+            self._resync()
+            return self._query_each(commands)
+        responses = []
+        for i, command in enumerate(commands):
+            try:
+                responses.append(self.instr.read())
+            except Exception as e:
+                # Lost sync with the output queue: this command failed, re-ask the rest singly
+                responses.append(e)
+                self._resync()
+                responses.extend(self._query_each(commands[i + 1:]))
+                return responses
+        self.record_batch(t_send, time.perf_counter())
+        return responses
+
+    def _query_compound(self, commands):
+        """Sends one ';' joined message and splits the ';' separated reply."""
+        try:
+            t_send = time.perf_counter()
+            reply = self.instr.query(";".join(commands))
+            self.record_batch(t_send, time.perf_counter())
+        except Exception:
+            self._resync()
+            return self._query_each(commands)
+        fields = reply.strip().split(";")
+        if len(fields) != len(commands):
+            # A command was rejected, so the fields can't be matched up.  Ask one at a time.
+            return self._query_each(commands)
+        return fields
+
+    def _resync(self):
+        """Clears pending output after a failed pipelined transfer."""
+        try:
+            self.instr.clear()
+        except Exception:
+            pass
+
+    def record_rtt(self, t_send, t_recv):
+        """
+        Updates the running RTT estimate from one send/receive pair (perf_counter seconds).
+        """
+        rtt = t_recv - t_send
+        self.last_send = t_send
+        self.last_recv = t_recv
+        self.rtt_last = rtt
+        self.count += 1
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+            self.rtt_min = rtt
+            self.rtt_max = rtt
+        else:
+            self.rttvar = (1 - RTT_BETA) * self.rttvar + RTT_BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - RTT_ALPHA) * self.srtt + RTT_ALPHA * rtt
+            self.rtt_min = min(self.rtt_min, rtt)
+            self.rtt_max = max(self.rtt_max, rtt)
+
+    def record_batch(self, t_send, t_recv):
+        """
+        Records the send/receive window of a pipelined batch without feeding it to the RTT estimate.
+        """
+        elapsed = t_recv - t_send
+        self.last_send = t_send
+        self.last_recv = t_recv
+        self.batch_last = elapsed
+        self.batch_count += 1
+        if self.batch_avg is None:
+            self.batch_avg = elapsed
+        else:
+            self.batch_avg = (1 - RTT_ALPHA) * self.batch_avg + RTT_ALPHA * elapsed
+
+    def reanchor(self):
+        """
+        Retakes the wall-clock anchor of the perf_counter() timestamps.
+        """
+        self._wall_ref = datetime.datetime.now()
+        self._mono_ref = time.perf_counter()
+
+    def to_datetime(self, mono_time):
+        """
+        Converts a perf_counter() instant into a wall-clock datetime, re-anchoring first if the anchor is older than
+        REANCHOR_PERIOD.
+        """
+        if time.perf_counter() - self._mono_ref > REANCHOR_PERIOD:
+            self.reanchor()
+        return self._wall_ref + datetime.timedelta(seconds=mono_time - self._mono_ref)
+
+    def sample_instant(self):
+        """
+        Estimated perf_counter() instant at which the instrument answered the last query.
+
+        Assumes a symmetric link, i.e. the reply left the instrument half a smoothed RTT before
+        it arrived.  The estimate is kept inside the actual send/receive window of the query
+        (for a batch, that of the whole batch, so this is the instant of its last reply).
+        """
+        if self.last_recv is None:
+            return time.perf_counter()
+        if self.srtt is None:
+            return (self.last_send + self.last_recv) / 2        # batches only, no single RTT yet
+        estimate = self.last_recv - self.srtt / 2
+        return min(max(estimate, self.last_send), self.last_recv)
+
+    def sample_time(self):
+        """
+        Wall-clock datetime of the estimated instrument-side sample instant of the last query.
+        """
+        return self.to_datetime(self.sample_instant())
+
+    def rtt_stats(self):
+        """
+        Returns RTT statistics in seconds.  'uncertainty' is the +/- timing error a reading
+        timestamp carries from the link (half the smoothed RTT plus two deviations).
+        """
+        if self.srtt is None:
+            return {"count": 0, "last": None, "srtt": None, "rttvar": None,
+                    "min": None, "max": None, "uncertainty": None}
+        return {
+            "count": self.count,
+            "last": self.rtt_last,
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "min": self.rtt_min,
+            "max": self.rtt_max,
+            "uncertainty": self.srtt / 2 + 2 * self.rttvar,
+        }
+
+    def rtt_report(self):
+        """
+        One line summary of the RTT statistics for console output.  Also re-anchors the timestamps.
+        """
+        self.reanchor()
+        stats = self.rtt_stats()
+        if not stats["count"] and not self.batch_count:
+            return "RTT: no queries yet"
+        line = "RTT: batches only"
+        if stats["count"]:
+            line = (f"RTT (ms) last: {stats['last'] * 1000:6.1f}, avg: {stats['srtt'] * 1000:6.1f}, "
+                    f"var: {stats['rttvar'] * 1000:5.1f}, min: {stats['min'] * 1000:6.1f}, "
+                    f"max: {stats['max'] * 1000:6.1f}, timestamp +/-{stats['uncertainty'] * 1000:5.1f}")
+        if self.batch_count:
+            line += (f", batches: {self.batch_count} (ms) last: {self.batch_last * 1000:6.1f}, "
+                     f"avg: {self.batch_avg * 1000:6.1f}")
+        return line
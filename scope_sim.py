@@ -0,0 +1,275 @@
+"""
+Scope Sim
+
+Description- Simulator profiles for the power monitors, i.e., AC Line (CH1) and Amp Output (CH2+) Vrms readings
+as the live loop would read them, without a scope.
+
+Profiles:
+    cycling      - line ON 10 min / OFF 2 min, amp outputs follow the line
+    dropouts     - cycling plus short AC line dropouts (about 0.1 to 0.3 s) every couple of minutes
+    brownout     - line stays ON but sags through the ON/OFF hysteresis band now and then
+    amp_dropout  - line always ON, amp outputs drop out for 12 s every 5 min
+
+Readings are deterministic for a given seed so replays can be compared run to run.
+
+SimScope is a simulated Tek scope with a repetitive trigger source for the capture loop benchmarks.
+
+sim_waveform() makes Tek-style raw waveform records (codes plus preamble, as Scope.fetch_waveform returns) for the
+waveform benchmarks:
+    line         AC line with 3rd/5th harmonics and noise
+    sag          line with a two-cycle sag to 60% in the middle of the record
+    amp          1 kHz amplifier output tone with noise
+    noise        full-scale noise (worst case for compression)
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import datetime
+import math
+import random
+import time
+
+import numpy as np
+
+LINE_VRMS = 120.0       # nominal AC Line
+AMP_VRMS = 8.0          # nominal amp output (at 8 ohms about 8 W)
+AMP_RAMP_TIME = 2.0     # seconds after line ON before amp outputs are up
+
+
+def _cycling_line(t, on_time=600.0, off_time=120.0):
+    """True if the line is ON at t seconds for an ON/OFF cycle."""
+    return (t % (on_time + off_time)) < on_time
+
+
+def _profile_cycling(t, rng):
+    on = _cycling_line(t)
+    line = LINE_VRMS + rng.gauss(0, 0.5) if on else abs(rng.gauss(0, 0.3))
+    amp = AMP_VRMS if on and (t % 720.0) > AMP_RAMP_TIME else 0.05
+    return line, amp
+
+
+def _profile_dropouts(t, rng):
+    line, amp = _profile_cycling(t, rng)
+    # One short dropout every 97 s, length 0.1 to 0.3 s depending on which dropout it is
+    phase = t % 97.0
+    if line > 1.0 and phase < 0.1 + 0.1 * (int(t // 97.0) % 3):
+        line = abs(rng.gauss(5.0, 2.0))
+    return line, amp
+
+
+def _profile_brownout(t, rng):
+    # Sag to ~78 V (between default ON 85 / OFF 75) for 20 s every 15 min, dips below OFF every 3rd sag
+    phase = t % 900.0
+    line = LINE_VRMS + rng.gauss(0, 0.5)
+    if phase < 20.0:
+        depth = 47.0 if int(t // 900.0) % 3 == 2 else 42.0
+        line -= depth * math.sin(math.pi * phase / 20.0)
+    amp = AMP_VRMS if line > 85.0 else 0.5
+    return line, amp
+
+
+def _profile_amp_dropout(t, rng):
+    line = LINE_VRMS + rng.gauss(0, 0.5)
+    amp = 0.5 if (t % 300.0) > 288.0 else AMP_VRMS + rng.gauss(0, 0.05)
+    return line, amp
+
+
+PROFILES = {
+    "cycling": _profile_cycling,
+    "dropouts": _profile_dropouts,
+    "brownout": _profile_brownout,
+    "amp_dropout": _profile_amp_dropout,
+}
+
+
+def profile_readings(name, duration, period=0.070, num_amp_channels=1, start=None, seed=0):
+    """
+    Generates simulated readings.
+
+    Args:
+        name: Profile name, one of PROFILES.
+        duration: Length of the simulated run in seconds.
+        period: Seconds between readings (live loop TARGET_PERIOD).
+        num_amp_channels: Number of amp output channels (CH2+).
+        start: Datetime of the first reading (default now).
+        seed: Random seed for the measurement noise.
+
+    Yields:
+        (timestamp, line_vrms, [amp_vrms, ...]) tuples.
+    """
+    profile = PROFILES[name]
+    rng = random.Random(seed)
+    start = start or datetime.datetime.now()
+    for n in range(int(duration / period)):
+        t = n * period
+        line, amp = profile(t, rng)
+        amps = [max(amp + rng.gauss(0, 0.02), 0.0) for _ in range(num_amp_channels)]
+        yield start + datetime.timedelta(seconds=t), max(line, 0.0), amps
+
+
+class SimScope:
+    """
+    Simulated Tek scope with a repetitive trigger source, for capture loop benchmarks (bench_capture.py).
+
+    Supports the subset the capture scripts use: write()/query() with ';' joined commands, ACQuire:STATE arm and
+    query, MEASUrement values, SAVE:IMAGe, *OPC?, FILESystem:READfile/DELEte, and reads of the file through
+    read_raw() or the VISA library (visalib.read, as scope_files does).  One bus lock serializes I/O like a real link.
+
+    Args:
+        trigger_rate: Triggers per second of the source.
+        record_time: Seconds from trigger to acquisition complete.
+        rtt: Round trip of one message (seconds).
+        image_save_time: Seconds the scope takes for SAVE:IMAGe.
+        image_bytes: PNG size.
+        transfer_rate: Link throughput for file reads (bytes/s).
+    """
+    def __init__(self, trigger_rate=20.0, record_time=0.004, rtt=0.002, image_save_time=0.15,
+                 image_bytes=150_000, transfer_rate=10e6, seed=0):
+        import threading
+        self.trigger_rate = trigger_rate
+        self.record_time = record_time
+        self.rtt = rtt
+        self.image_save_time = image_save_time
+        self.image_bytes = image_bytes
+        self.transfer_rate = transfer_rate
+        self.rng = random.Random(seed)
+        self.session = 0
+        self.visalib = self
+        self.acquisitions = 0
+        self._bus = threading.Lock()
+        self._t0 = time.perf_counter()
+        self._complete_at = None
+        self._numacq = 0
+        self._files = {}
+        self._file_ready = 0.0
+        self._pending = b""
+
+    def source_triggers(self, t_start, t_end):
+        """Triggers the source produced between two perf_counter() instants."""
+        period = 1.0 / self.trigger_rate
+        return int(math.floor((t_end - self._t0) / period) - math.floor((t_start - self._t0) / period))
+
+    def _next_trigger(self, now):
+        period = 1.0 / self.trigger_rate
+        return self._t0 + (math.floor((now - self._t0) / period) + 1) * period
+
+    def _acq_state(self, now):
+        if self._complete_at is None:
+            return "0"
+        if now < self._complete_at:
+            return "1"
+        self.acquisitions += 1
+        self._numacq += 1
+        self._complete_at = None
+        return "0"
+
+    def _command(self, cmd):
+        now = time.perf_counter()
+        head, _, arg = cmd.strip().lstrip(":").partition(" ")
+        head = head.upper()
+        if head == "ACQUIRE:STATE?":
+            return self._acq_state(now)
+        if head == "ACQUIRE:STATE":
+            if arg.strip().upper() in ("1", "ON", "RUN"):
+                self._complete_at = self._next_trigger(now) + self.record_time
+                self._numacq = 0    # counts acquisitions since the last start, like the scope
+            else:
+                self._complete_at = None
+            return None
+        if head == "ACQUIRE:NUMACQ?":
+            return str(self._numacq)
+        if head == "TRIGGER:FREQUENCY?":
+            return f"{self.trigger_rate:.6E}"
+        if head.startswith("MEASUREMENT:") and head.endswith("VALUE?"):
+            return f"{self.rng.gauss(1.0, 0.01):.6E}"
+        if head == "*OPC?":
+            time.sleep(max(0.0, self._file_ready - now))
+            return "1"
+        if head == "SAVE:IMAGE":
+            self._file_ready = now + self.image_save_time
+            self._files[arg.strip().strip('"')] = bytes(self.rng.getrandbits(8) for _ in range(64)) * (self.image_bytes // 64)
+            return None
+        if head == "FILESYSTEM:READFILE":
+            time.sleep(max(0.0, self._file_ready - now))
+            self._pending = self._files.get(arg.strip().strip('"'), b"")
+            return None
+        if head == "FILESYSTEM:DELETE":
+            self._files.pop(arg.strip().strip('"'), None)
+            return None
+        return None
+
+    def write(self, message):
+        with self._bus:
+            time.sleep(self.rtt / 2)
+            for cmd in message.split(";"):
+                self._command(cmd)
+
+    def query(self, message):
+        with self._bus:
+            time.sleep(self.rtt)
+            replies = [self._command(cmd) for cmd in message.split(";")]
+            return ";".join(r for r in replies if r is not None)
+
+    def read_raw(self):
+        with self._bus:
+            data, self._pending = self._pending, b""
+            time.sleep(self.rtt / 2 + len(data) / self.transfer_rate)
+            return data
+
+    def read(self, session, size):
+        """visalib.read(session, size) -> (bytes, StatusCode)"""
+        from pyvisa.constants import StatusCode
+        with self._bus:
+            data, self._pending = self._pending[:size], self._pending[size:]
+            time.sleep(self.rtt / 2 + len(data) / self.transfer_rate)
+            status = StatusCode.success_max_count_read if self._pending else StatusCode.success
+            return data, status
+
+
+WAVEFORM_PROFILES = ("line", "sag", "amp", "noise")
+
+
+def sim_waveform(profile="line", points=100_000, record_time=0.05, bits=8, width=2, seed=0):
+    """
+    Simulated raw waveform record.
+
+    Args:
+        profile: One of WAVEFORM_PROFILES.
+        points: Record length.
+        record_time: Seconds the record spans (trigger in the middle).
+        bits: Digitizer resolution (8 = sample mode, more = high-res acquisition).
+        width: DATa:WIDth of the transfer, 1 or 2 bytes per point.
+        seed: Random seed for the noise.
+
+    Returns:
+        Raw waveform dict (codes, xincr, xzero, ymult, yoff, yzero, width), as Scope.fetch_waveform returns.
+    """
+    rng = np.random.default_rng(seed)
+    xincr = record_time / points
+    t = -record_time / 2 + np.arange(points) * xincr
+    line_peak = LINE_VRMS * math.sqrt(2)
+    if profile in ("line", "sag"):
+        w = 2 * np.pi * 60.0 * t
+        volts = line_peak * (np.sin(w) + 0.03 * np.sin(3 * w) + 0.01 * np.sin(5 * w))
+        if profile == "sag":
+            volts[np.abs(t) < 1 / 60.0] *= 0.6
+        full_scale = 1.25 * line_peak
+    elif profile == "amp":
+        volts = AMP_VRMS * math.sqrt(2) * np.sin(2 * np.pi * 1000.0 * t)
+        full_scale = 1.25 * AMP_VRMS * math.sqrt(2)
+    elif profile == "noise":
+        volts = rng.uniform(-1.0, 1.0, points) * line_peak
+        full_scale = 1.25 * line_peak
+    else:
+        raise ValueError(f"Unknown waveform profile '{profile}'")
+    volts = volts + rng.normal(0.0, full_scale * 2.0 ** -bits, points)     # about one digitizer LSB of noise
+    # Digitize at bits, then left-justify in the transfer width like the scope
+    levels = 2 ** (bits - 1)
+    adc = np.clip(np.round(volts / full_scale * levels), -levels, levels - 1)
+    shift = 8 * width - bits
+    codes = adc * 2.0 ** shift if shift >= 0 else np.floor(adc / 2.0 ** -shift)
+    codes = codes.astype(np.int8 if width == 1 else np.int16)
+    ymult = full_scale / levels / 2.0 ** shift
+    return dict(codes=codes, xincr=xincr, xzero=float(t[0]), ymult=ymult, yoff=0.0, yzero=0.0, width=width)
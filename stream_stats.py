@@ -0,0 +1,216 @@
+"""
+Stream Stats
+
+Description- Streaming (single pass, O(1) per sample) statistics for monitored channels.
+
+Components:
+    Ewma            - exponentially weighted moving average
+    Welford         - running count, mean, variance, min and max over the whole stream
+    RollingWindow   - mean, min and max over the last N samples (monotonic deques for min/max)
+    P2Quantile      - P-squared quantile estimate (Jain & Chlamtac) using five markers
+    ChannelStats    - all of the above for one channel (e.g. AC Line or an amplifier output)
+
+No readings are stored beyond the rolling window, so memory stays constant for any run length.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import math
+from collections import deque
+
+
+class Ewma:
+    """Exponentially weighted moving average.  alpha = weight of the newest sample."""
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class Welford:
+    """Running count, mean, variance (Welford's algorithm), min and max."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self):
+        """Sample variance (0 until two samples are seen)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class RollingWindow:
+    """
+    Mean, min and max over the last 'size' samples.  Min/max use monotonic deques so each
+    sample is pushed and popped at most once (amortized O(1)).
+    """
+    def __init__(self, size):
+        self.size = size
+        self._values = deque()
+        self._sum = 0.0
+        self._min = deque()   # (index, value), values increasing
+        self._max = deque()   # (index, value), values decreasing
+        self._index = 0
+
+    def update(self, x):
+        self._values.append(x)
+        self._sum += x
+        if len(self._values) > self.size:
+            self._sum -= self._values.popleft()
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((self._index, x))
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((self._index, x))
+        oldest = self._index - self.size
+        if self._min[0][0] <= oldest:
+            self._min.popleft()
+        if self._max[0][0] <= oldest:
+            self._max.popleft()
+        self._index += 1
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def mean(self):
+        return self._sum / len(self._values) if self._values else 0.0
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else 0.0
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else 0.0
+
+
+class P2Quantile:
+    """
+    P-squared streaming quantile estimator (Jain & Chlamtac, 1985) for quantile p (0-1).
+    Keeps five markers; exact until five samples have been seen.
+    """
+    def __init__(self, p=0.99):
+        self.p = p
+        self._q = []                                  # marker heights
+        self._n = [0, 1, 2, 3, 4]                     # marker positions
+        self._np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]    # desired positions
+        self._dn = [0, p / 2, p, (1 + p) / 2, 1]      # desired position increments
+
+    def update(self, x):
+        q = self._q
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # Find the cell k holding x and adjust the extreme markers
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            self._n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        # Adjust the middle markers if they are off their desired positions
+        for i in range(1, 4):
+            d = self._np[i] - self._n[i]
+            if (d >= 1 and self._n[i + 1] - self._n[i] > 1) or (d <= -1 and self._n[i - 1] - self._n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (self._n[i + d] - self._n[i])
+                q[i] = candidate
+                self._n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    @property
+    def value(self):
+        q = self._q
+        if not q:
+            return 0.0
+        if len(q) < 5:
+            return q[min(len(q) - 1, int(round(self.p * (len(q) - 1))))]
+        return q[2]
+
+
+class ChannelStats:
+    """
+    Streaming statistics for one channel: EWMA, whole-stream mean/variance/min/max,
+    rolling window mean/min/max and a p-quantile sketch.
+    """
+    def __init__(self, window=3, alpha=0.1, quantile=0.99):
+        self.ewma = Ewma(alpha)
+        self.total = Welford()
+        self.window = RollingWindow(window)
+        self.quantile = P2Quantile(quantile)
+
+    def update(self, x):
+        if x is None or x != x:   # skip missing and NaN readings
+            return
+        self.ewma.update(x)
+        self.total.update(x)
+        self.window.update(x)
+        self.quantile.update(x)
+
+    @property
+    def count(self):
+        return self.total.count
+
+    @property
+    def window_mean(self):
+        return self.window.mean
+
+    def summary(self):
+        """Returns a dict of count, mean, stdev, min, max, pNN and ewma."""
+        if not self.count:
+            return {"count": 0, "mean": 0.0, "stdev": 0.0, "min": 0.0, "max": 0.0,
+                    "p": 0.0, "ewma": 0.0}
+        return {
+            "count": self.count,
+            "mean": self.total.mean,
+            "stdev": self.total.stdev,
+            "min": self.total.min,
+            "max": self.total.max,
+            "p": self.quantile.value,
+            "ewma": self.ewma.value,
+        }
@@ -0,0 +1,262 @@
+"""
+Sweep Thresholds
+
+Description- Vectorized parameter sweep of the LogOnOffTimes ON/OFF detector over a recorded (or simulated) trace.
+
+Evaluates the hysteresis-plus-debounce detector (onoff_state.py) for a whole grid of
+    ac_line_high_limit x ac_line_low_limit x ON_CONFIRMATION_THRESHOLD x OFF_CONFIRMATION_THRESHOLD x do_delay
+and reports for each combination the transition count, total ON time, spurious transition rate (state periods shorter
+than --min-period, per hour) and amp output drop-out count.
+
+How it is vectorized: readings between the limits neither add to nor reset the debounce counts, so after dropping them
+the trace is a sequence of +1 (>= high) / -1 (<= low) runs.  A run confirms its state once it is at least
+ON/OFF_CONFIRMATION_THRESHOLD long, and the state changes at each confirming run whose sign differs from the previous
+one.  Each (high, low) pair costs one NumPy pass over the trace to find where the class changes; the confirmation
+thresholds and delays are evaluated on the (much shorter) run arrays and broadcast.
+
+Drop-outs follow the live rule: the amp channels are only read on LoadCheckGate's schedule (the first clear reading,
+then the first reading more than --interval seconds after the last check), and every such check inside an ON period,
+later than the delay, with the line above the OFF limit plus DROPOUT_LINE_MARGIN and an amp below --amp-on is one
+drop-out.  The live gate defers a check that falls on a reading at or below the OFF limit while ON (or at or above the
+ON limit while OFF) to the next reading; here that check is simply not counted (the reading fails the margin test
+anyway), so after such a reading the check times can be a few readings off the live ones.
+
+Examples:
+    python sweep_thresholds.py --input readings.csv --high 80:96:2 --low 60:80:2 --on-confirm 1,2,3,4 --off-confirm 1,2,3
+    python sweep_thresholds.py --profile dropouts --hours 72 --out sweep.csv
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from onoff_state import DROPOUT_LINE_MARGIN
+from scope_sim import PROFILES, profile_readings
+
+
+def load_trace(path):
+    """
+    Loads a recording CSV (Time, CH1, CH2, ...) into arrays.
+
+    Returns:
+        t: float64 seconds from the first reading, line: float64 Vrms, amp: float64 (readings x channels), NaN = not read.
+    """
+    raw = np.loadtxt(path, dtype=str, delimiter=',', skiprows=1, ndmin=2)
+    stamps = np.char.replace(np.char.strip(raw[:, 0]), ' ', 'T').astype('datetime64[us]')
+    t = (stamps - stamps[0]).astype(np.float64) / 1e6
+    line = raw[:, 1].astype(np.float64)
+    amp_text = np.char.strip(raw[:, 2:])
+    amp = np.full(amp_text.shape, np.nan)
+    present = amp_text != ''
+    amp[present] = amp_text[present].astype(np.float64)
+    return t, line, amp
+
+
+def profile_trace(name, duration, num_amp_channels=1, seed=0):
+    """
+    Simulator profile (scope_sim.py) as arrays, same layout as load_trace().
+    """
+    rows = list(profile_readings(name, duration, num_amp_channels=num_amp_channels, seed=seed))
+    start = rows[0][0]
+    t = np.array([(r[0] - start).total_seconds() for r in rows])
+    line = np.array([r[1] for r in rows])
+    amp = np.array([r[2] for r in rows], dtype=np.float64).reshape(len(rows), num_amp_channels)
+    return t, line, amp
+
+
+def _runs(line, high, low):
+    """
+    Run-length encoding of the hysteresis classes with in-band readings dropped.
+
+    Works on the (few) points where the class changes rather than on every reading: the trace is cut into
+    constant-class segments, in-band segments are dropped and neighbouring segments of the same sign are one run.
+
+    Returns:
+        segments: (start, count_before, count_through) of each kept segment, counts of kept readings
+        run_seg, run_len, signs: first segment, number of kept readings and sign (+1/-1) of each run
+    """
+    cls = (line >= high).view(np.int8) - (line <= low).view(np.int8)
+    change = np.flatnonzero(cls[1:] != cls[:-1]) + 1
+    seg_start = np.concatenate(([0], change))
+    seg_len = np.diff(np.concatenate((seg_start, [cls.size])))
+    seg_val = cls[seg_start]
+    keep = seg_val != 0
+    seg_start, seg_len, seg_val = seg_start[keep], seg_len[keep], seg_val[keep]
+    if seg_start.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return (empty, empty, empty), empty, empty, empty
+    cum_end = np.cumsum(seg_len)
+    cum_start = cum_end - seg_len
+    run_seg = np.flatnonzero(np.concatenate(([True], seg_val[1:] != seg_val[:-1])))
+    run_len = np.diff(np.concatenate((cum_start[run_seg], [cum_end[-1]])))
+    return (seg_start, cum_start, cum_end), run_seg, run_len, seg_val[run_seg].astype(np.int64)
+
+
+def _check_schedule(t, first, interval):
+    """
+    Trace positions of the amp channel checks (LoadCheckGate): the reading that sets the initial state, then the first
+    reading more than interval seconds after the previous check.
+    """
+    checks = [first]
+    last = t[first]
+    while True:
+        i = int(np.searchsorted(t, last + interval, side="right"))
+        if i >= t.size:
+            return np.array(checks, dtype=np.int64)
+        checks.append(i)
+        last = t[i]
+
+
+def _transitions(t, segments, run_seg, run_len, signs, on_confirm, off_confirm):
+    """
+    Transition times and new states for one (on_confirm, off_confirm) pair.
+
+    Returns:
+        times: float64 trace times of the initial state and each transition (initial first)
+        states: +1 ON / -1 OFF after each entry of times
+    """
+    seg_start, cum_start, cum_end = segments
+    need = np.where(signs > 0, on_confirm, off_confirm)
+    confirming = run_len >= need
+    confirming[0] = True    # the first clear reading sets the initial state without debounce
+    conf_signs = signs[confirming]
+    keep = np.concatenate(([True], conf_signs[1:] != conf_signs[:-1]))
+    runs = np.flatnonzero(confirming)[keep]
+    # The state changes on the confirming reading (the need-th kept reading of the run)
+    count = need[runs]
+    count[0] = 1
+    target = cum_start[run_seg[runs]] + count
+    seg = np.searchsorted(cum_end, target, side="left")
+    times = t[seg_start[seg] + (target - cum_start[seg]) - 1]
+    return times, conf_signs[keep]
+
+
+def sweep(t, line, amp, highs, lows, on_confirms, off_confirms, delays, amp_high_limit=5.0, min_period=1.0,
+          interval=10.0):
+    """
+    Evaluates every parameter combination.
+
+    Args:
+        t, line, amp: Trace arrays (see load_trace).
+        highs, lows, on_confirms, off_confirms, delays: Parameter values to combine.
+        amp_high_limit: Amp Output ON Vrms for the drop-out check.
+        min_period: ON/OFF periods shorter than this (seconds) count as spurious transitions.
+        interval: Seconds between amp channel checks (dropout_interval of the live run).
+
+    Returns:
+        Structured NumPy array, one row per valid combination (low < high).
+    """
+    dtype = [("high", "f8"), ("low", "f8"), ("on_confirm", "i4"), ("off_confirm", "i4"), ("delay", "f8"),
+             ("transitions", "i8"), ("on_time", "f8"), ("on_fraction", "f8"), ("spurious", "i8"),
+             ("spurious_per_hour", "f8"), ("dropouts", "i8")]
+    delays = np.asarray(delays, dtype=np.float64)
+    hours = max(t[-1] - t[0], 1e-9) / 3600.0
+    t_end = t[-1]
+
+    # Readings whose amp check would fail (all channels read, one below the limit)
+    amp_low = np.zeros(t.size, dtype=bool)
+    if amp.size:
+        with np.errstate(invalid="ignore"):
+            amp_low = ~np.any(np.isnan(amp), axis=1) & np.any(amp < amp_high_limit, axis=1)
+
+    schedule_cache = {}
+    results = []
+    for high, low in itertools.product(highs, lows):
+        if low >= high:
+            continue
+        segments, run_seg, run_len, signs = _runs(line, high, low)
+        if signs.size == 0:
+            continue
+        first = int(segments[0][0])         # the reading that sets the initial state
+        if first not in schedule_cache:
+            schedule_cache[first] = _check_schedule(t, first, interval)
+        checks = schedule_cache[first]
+        failing_t = t[checks[amp_low[checks] & (line[checks] > low + DROPOUT_LINE_MARGIN)]]
+
+        for on_confirm, off_confirm in itertools.product(on_confirms, off_confirms):
+            times, states = _transitions(t, segments, run_seg, run_len, signs, on_confirm, off_confirm)
+            ends = np.concatenate((times[1:], [t_end]))
+            periods = ends - times
+            on = states > 0
+            on_time = periods[on].sum()
+            transitions = times.size - 1
+            # Spurious: a confirmed state that lasted less than min_period (last period is open, not counted)
+            spurious = int(np.count_nonzero(periods[1:-1] < min_period)) if transitions > 1 else 0
+
+            # Drop-outs: failing checks while ON (after the reading is processed), later than 'delay' after it started
+            dropouts = np.zeros(delays.size, dtype=np.int64)
+            if failing_t.size and on.any():
+                k = np.searchsorted(times, failing_t, side="right") - 1
+                inside = (k >= 0) & on[np.maximum(k, 0)]
+                elapsed = failing_t[inside] - times[k[inside]]
+                dropouts = (elapsed[:, None] > delays[None, :]).sum(axis=0)
+
+            for delay, n_dropouts in zip(delays, dropouts):
+                results.append((high, low, on_confirm, off_confirm, delay, transitions, on_time,
+                                on_time / max(t_end - t[0], 1e-9), spurious, spurious / hours, n_dropouts))
+    return np.array(results, dtype=dtype)
+
+
+def parse_values(text, cast=float):
+    """
+    '80:96:2' (start:stop:step, stop excluded) or '1,2,3' into a list.
+    """
+    if ":" in text:
+        start, stop, step = (float(v) for v in text.split(":"))
+        return [cast(v) for v in np.arange(start, stop, step)]
+    return [cast(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized ON/OFF threshold and debounce parameter sweep")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', type=str, help='Recorded readings CSV (Time, CH1, CH2, ...)')
+    source.add_argument('--profile', choices=sorted(PROFILES), help='Simulator profile')
+    parser.add_argument('--hours', type=float, default=72.0, help='Simulated hours for --profile')
+    parser.add_argument('--high', default="80:96:1", help="AC Line ON Vrms values, 'start:stop:step' or 'a,b,c'")
+    parser.add_argument('--low', default="60:80:1", help="AC Line OFF Vrms values")
+    parser.add_argument('--on-confirm', default="1,2,3,4", help="ON_CONFIRMATION_THRESHOLD values")
+    parser.add_argument('--off-confirm', default="1,2,3,4", help="OFF_CONFIRMATION_THRESHOLD values")
+    parser.add_argument('--delay', default="5,10,20,30", help="do_delay values (seconds)")
+    parser.add_argument('--interval', type=float, default=10.0, help='Seconds between amp channel checks')
+    parser.add_argument('--amp-on', type=float, default=5.0, help='Amp Output ON Vrms')
+    parser.add_argument('--min-period', type=float, default=1.0, help='Seconds; shorter ON/OFF periods are spurious')
+    parser.add_argument('--out', type=str, default="sweep.csv", help='Results CSV file')
+    parser.add_argument('--top', type=int, default=10, help='Combinations to print (fewest spurious first)')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    if args.input:
+        t, line, amp = load_trace(args.input)
+    else:
+        t, line, amp = profile_trace(args.profile, args.hours * 3600)
+    t_load = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = sweep(t, line, amp,
+                    parse_values(args.high), parse_values(args.low),
+                    parse_values(args.on_confirm, int), parse_values(args.off_confirm, int),
+                    parse_values(args.delay), args.amp_on, args.min_period, args.interval)
+    t_sweep = time.perf_counter() - t0
+
+    header = ",".join(results.dtype.names)
+    np.savetxt(args.out, results, delimiter=",", header=header, comments="",
+               fmt=["%.3f", "%.3f", "%d", "%d", "%.3f", "%d", "%.3f", "%.5f", "%d", "%.4f", "%d"])
+    print(f"Trace: {t.size} readings ({(t[-1] - t[0]) / 3600:.1f} h), loaded in {t_load:.2f} s")
+    print(f"Swept {results.size} combinations in {t_sweep:.2f} s. Results saved to {args.out}")
+
+    order = np.lexsort((-results["on_time"], results["dropouts"], results["spurious"]))
+    print("high    low  on_cf off_cf delay  transitions  on_time(h)  spurious/h  dropouts")
+    for r in results[order][:args.top]:
+        print(f"{r['high']:6.1f} {r['low']:6.1f} {r['on_confirm']:5d} {r['off_confirm']:6d} {r['delay']:5.0f} "
+              f"{r['transitions']:12d} {r['on_time'] / 3600:11.3f} {r['spurious_per_hour']:11.3f} {r['dropouts']:9d}")
+
+
+if __name__ == "__main__":
+    main()
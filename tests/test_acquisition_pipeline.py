@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from acquisition_pipeline import AcquisitionPipeline, InstrumentLock, Stage
+
+
+def counter(limit, stop_event, lock=None):
+    """acquire() that produces 1..limit, then sets the stop event."""
+    state = {"n": 0}
+
+    def acquire():
+        if lock is not None:
+            with lock.hold("acquire"):
+                time.sleep(0.001)
+        if state["n"] >= limit:
+            stop_event.set()
+            return None
+        state["n"] += 1
+        return state["n"]
+    return acquire
+
+
+def test_items_flow_through_connected_stages():
+    seen = []
+    stop = threading.Event()
+    double = Stage("double", lambda n: 2 * n)
+    sink = Stage("sink", seen.append)
+    double.connect(sink)
+    pipeline = AcquisitionPipeline(counter(100, stop), [double, sink], stop).connect(double)
+    pipeline.start()
+    pipeline.wait()
+    pipeline.close()
+    assert seen == [2 * n for n in range(1, 101)]
+    assert pipeline.produced == 100 and double.processed == 100 and sink.processed == 100
+
+
+def test_full_queue_makes_the_sender_wait():
+    release = threading.Event()
+    slow = Stage("slow", lambda n: release.wait(), maxsize=2)
+    slow.start()
+    slow.put(1)                                 # taken by the handler, which blocks
+    time.sleep(0.05)
+    slow.put(2)
+    slow.put(3)
+    threading.Timer(0.1, release.set).start()
+    t_put = time.perf_counter()
+    slow.put(4)                                 # queue full: waits until the handler takes item 2
+    assert time.perf_counter() - t_put >= 0.05
+    slow.close()
+    metrics = slow.metrics()
+    assert metrics["slow_waits"] == 1 and metrics["slow_wait_s"] >= 0.05
+    assert metrics["slow_dropped"] == 0 and slow.processed == 4 and metrics["slow_max_queued"] == 2
+
+
+def test_lossy_stage_drops_the_oldest():
+    release = threading.Event()
+    seen = []
+    display = Stage("display", lambda n: (release.wait(), seen.append(n)), maxsize=2, lossy=True)
+    display.start()
+    display.put(0)
+    time.sleep(0.05)                            # 0 is being handled
+    for n in range(1, 6):
+        display.put(n)                          # never waits
+    release.set()
+    display.close()
+    assert seen == [0, 4, 5]
+    assert display.dropped == 3 and display.waits == 0
+
+
+def test_handler_errors_are_counted_and_skipped(capsys):
+    seen = []
+    stage = Stage("check", lambda n: 1 / n)
+    sink = Stage("sink", seen.append)
+    stage.connect(sink)
+    for s in (stage, sink):
+        s.start()
+    for n in (1, 0, 2):
+        stage.put(n)
+    stage.close()
+    sink.close()
+    assert seen == [1.0, 0.5] and stage.errors == 1
+    assert "Error in check stage" in capsys.readouterr().out
+
+
+def test_acquire_exception_is_raised_by_wait():
+    def acquire():
+        raise IOError("scope gone")
+    pipeline = AcquisitionPipeline(acquire, [])
+    pipeline.start()
+    with pytest.raises(IOError):
+        pipeline.wait()
+    assert pipeline.stop_event.is_set()
+
+
+def test_instrument_lock_counts_holds_and_waits():
+    lock = InstrumentLock()
+    stop = threading.Event()
+
+    def capture(n):
+        with lock.hold("analysis"):
+            time.sleep(0.02)
+
+    analysis = Stage("analysis", capture, maxsize=1, lossy=True)
+    pipeline = AcquisitionPipeline(counter(30, stop, lock), [analysis], stop, lock=lock).connect(analysis)
+    pipeline.start()
+    pipeline.wait()
+    pipeline.close()
+    metrics = pipeline.metrics()
+    assert metrics["lock_analysis_held_s"] >= 0.02 * analysis.processed
+    # The producer waited for the captures' holds
+    assert metrics["lock_acquire_waited_s"] > 0.0
+    assert metrics["lock_acquire_held_s"] >= 0.001 * 30
+    assert "instrument lock" in pipeline.report() and "analysis: held" in pipeline.report()
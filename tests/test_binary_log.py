@@ -0,0 +1,78 @@
+import datetime
+import math
+
+import numpy as np
+import pytest
+
+from binary_log import SampleLogWriter, read_samples, sample_columns, to_csv, FLAG_OVERRUN, FLAG_READ_ERROR
+from log_reader import read_log
+
+START = datetime.datetime(2026, 10, 19, 8, 0, 0)
+
+
+def write_log(path, samples=100, channels=2):
+    writer = SampleLogWriter(str(path), channels, 0.05, START)
+    for count in range(1, samples + 1):
+        readings = [120.0 + 0.125 * count, 5.0 - 0.001 * count][:channels]
+        if count == 10:
+            readings[1] = math.nan
+        writer.append(count, count * 0.05, readings, count * 0.05 + 0.0012, skipped=2 if count == 20 else 0)
+    writer.close()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "run.bin"
+    write_log(path)
+    header, records = read_samples(str(path))
+    assert header["channels"] == 2 and header["period"] == 0.05
+    assert header["start"].startswith("2026-10-19 08:00:00")
+    assert len(records) == 100
+    assert list(records["Count"]) == list(range(1, 101))
+    np.testing.assert_allclose(records["Vrms_CH1"], 120.0 + 0.125 * np.arange(1, 101))
+    assert records["Flags"][9] == FLAG_READ_ERROR and records["Flags"][19] == FLAG_OVERRUN
+    columns = sample_columns(records)
+    np.testing.assert_allclose(columns["Sample_Time"] - columns["Time"], 0.0012, atol=1e-6)
+
+
+def test_partial_record_is_dropped_and_appending_continues(tmp_path):
+    path = tmp_path / "run.bin"
+    write_log(path, samples=5)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")             # a run that died mid-record
+    _, records = read_samples(str(path))
+    assert len(records) == 5
+
+
+def test_append_needs_the_same_layout(tmp_path):
+    path = tmp_path / "run.bin"
+    write_log(path, samples=5)
+    writer = SampleLogWriter(str(path), 2)
+    writer.append(6, 0.3, [1.0, 2.0], 0.3)
+    writer.close()
+    assert len(read_samples(str(path))[1]) == 6
+    with pytest.raises(ValueError):
+        SampleLogWriter(str(path), 3)
+
+
+def test_not_a_sample_log(tmp_path):
+    path = tmp_path / "run.txt"
+    path.write_text("Count, Time, Vrms_CH1\n")
+    with pytest.raises(ValueError):
+        read_samples(str(path))
+
+
+def test_csv_export_matches_the_text_log(tmp_path):
+    path = tmp_path / "run.bin"
+    write_log(path)
+    csv_path = to_csv(str(path))
+    with open(csv_path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "Count, Time, Vrms_CH1, Vrms_CH2, Sample_Time, Skipped"
+    # Same text as Power Monitoring-Synchronous' add_sample_to_file()
+    assert lines[1] == f"{1:4d}, {0.05:9.3f}, {120.125:6.3f}, {4.999:6.3f}, {0.0512:10.4f}, 0"
+
+    binary, text = read_log(str(path)), read_log(csv_path)
+    assert binary.schema == text.schema == "synchronous"
+    assert binary.names == text.names
+    for name in binary.names:
+        np.testing.assert_allclose(binary[name], text[name], atol=1e-3)
@@ -0,0 +1,102 @@
+import datetime
+import math
+
+import numpy as np
+import pytest
+
+from cycle_rms import zero_crossings, CycleRms, CycleMonitor, find_events, find_runs
+
+RATE = 100_000          # samples/s
+XINCR = 1.0 / RATE
+
+
+def line(cycles=10, vrms=120.0, scale=None):
+    """60 Hz sine starting at a rising crossing; scale(half cycle index) sets each half cycle's amplitude."""
+    t = np.arange(int(cycles * RATE / 60)) * XINCR
+    volts = vrms * math.sqrt(2) * np.sin(2 * np.pi * 60 * t)
+    if scale is not None:
+        half = np.floor(t * 120).astype(int)
+        volts *= np.array([scale(i) for i in range(half.max() + 1)])[half]
+    return volts
+
+
+def test_zero_crossings_of_a_sine():
+    volts = line(5) + 1e-3                  # offset keeps the sample at t = 0 off zero
+    crossings = zero_crossings(volts)
+    expected = np.arange(1, 10) * RATE / 120
+    np.testing.assert_allclose(crossings, expected, atol=0.05)
+
+
+def test_steady_line_rms():
+    cycles = CycleRms(line(10), XINCR)
+    assert len(cycles.half_rms) >= 18
+    np.testing.assert_allclose(cycles.half_rms, 120.0, rtol=2e-3)
+    np.testing.assert_allclose(cycles.cycle_rms, 120.0, rtol=2e-3)
+    assert find_events(cycles, 120.0) == []
+
+
+def test_sag_bounded_by_its_crossings():
+    cycles = CycleRms(line(12, scale=lambda i: 0.5 if 6 <= i < 12 else 1.0), XINCR)
+    events = find_events(cycles, 120.0)
+    assert [event["kind"] for event in events] == ["sag"]
+    sag = events[0]
+    assert sag["cycles"] == 3.0
+    assert sag["extreme"] == pytest.approx(60.0, rel=5e-3)
+    assert sag["start"] == pytest.approx(6 / 120, abs=2 * XINCR)
+    assert sag["end"] == pytest.approx(12 / 120, abs=2 * XINCR)
+
+
+def test_lost_line_is_a_dropout_inside_a_sag():
+    cycles = CycleRms(line(12, scale=lambda i: 0.0 if 8 <= i < 12 else 1.0), XINCR)
+    events = find_events(cycles, 120.0)
+    kinds = sorted(event["kind"] for event in events)
+    assert kinds == ["dropout", "sag"]
+    dropout = next(event for event in events if event["kind"] == "dropout")
+    assert dropout["cycles"] == pytest.approx(2.0, abs=0.5)
+    assert dropout["extreme"] < 12.0
+
+
+def test_swell():
+    cycles = CycleRms(line(12, scale=lambda i: 1.2 if i in (10, 11) else 1.0), XINCR)
+    events = find_events(cycles, 120.0)
+    assert [(event["kind"], event["cycles"]) for event in events] == [("swell", 1.0)]
+
+
+def test_find_runs():
+    assert find_runs(np.array([0, 1, 1, 0, 1], dtype=bool)) == [(1, 2), (4, 4)]
+    assert find_runs(np.zeros(3, dtype=bool)) == []
+
+
+def test_monitor_logs_events_at_absolute_times(tmp_path):
+    volts = line(12, scale=lambda i: 0.5 if 6 <= i < 12 else 1.0)
+    ymult = 0.01
+    waveform = {"codes": np.round(volts / ymult).astype(np.int16), "xincr": XINCR, "xzero": -0.02,
+                "ymult": ymult, "yoff": 0.0, "yzero": 0.0}
+    path = tmp_path / "run_cycles.csv"
+    monitor = CycleMonitor(str(path), nominal=120.0)
+    trigger = datetime.datetime(2026, 10, 19, 8, 0, 0)
+    events = monitor.analyze(waveform, trigger, count=7)
+    assert len(events) == 1 and monitor.counts["sag"] == 1
+    expected_start = trigger + datetime.timedelta(seconds=-0.02 + 6 / 120)
+    assert abs((events[0]["start_time"] - expected_start).total_seconds()) < 1e-4
+    lines = path.read_text().splitlines()
+    assert lines[0].startswith("Start_Time,End_Time,Time_Uncertainty_s,Kind")
+    assert lines[1].split(",")[3] == "sag" and lines[1].endswith(",7")
+
+
+def test_monitor_logs_timing_uncertainty(tmp_path):
+    volts = line(12, scale=lambda i: 1.2 if i in (10, 11) else 1.0)
+    ymult = 0.01
+    waveform = {"codes": np.round(volts / ymult).astype(np.int16), "xincr": XINCR, "xzero": 0.0,
+                "ymult": ymult, "yoff": 0.0, "yzero": 0.0}
+    path = tmp_path / "run_cycles.csv"
+    monitor = CycleMonitor(str(path), nominal=120.0)
+    trigger = datetime.datetime(2026, 10, 19, 8, 0, 0)
+    events = monitor.analyze(waveform, trigger, uncertainty=0.0125)
+    assert events[0]["uncertainty"] == 0.0125
+    monitor.analyze(waveform, trigger)
+    header, dated, undated = path.read_text().splitlines()
+    column = header.split(",").index("Time_Uncertainty_s")
+    assert column == 2
+    assert float(dated.split(",")[column]) == pytest.approx(0.0125)
+    assert undated.split(",")[column] == ""
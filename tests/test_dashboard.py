@@ -0,0 +1,81 @@
+import datetime
+import json
+import math
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from dashboard import DashboardServer, LiveSnapshot, HISTORY_POINTS
+from ring_buffer import ReadingRing
+
+
+def test_publish_swaps_a_new_snapshot():
+    snapshot = LiveSnapshot(state="UNKNOWN")
+    first = snapshot.read()
+    snapshot.publish(state="ON", events=3)
+    snapshot.publish(loop_hz=14.2)
+    current = snapshot.read()
+    assert first == {"state": "UNKNOWN", "seq": 0, "published": first["published"]}    # never modified
+    assert current["state"] == "ON" and current["events"] == 3 and current["loop_hz"] == 14.2
+    assert current["seq"] == 2
+
+
+def test_readers_always_see_a_complete_snapshot():
+    snapshot = LiveSnapshot(a=0, b=0)
+    stop = threading.Event()
+
+    def writer():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            snapshot.publish(a=n, b=n)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(20000):
+            data = snapshot.read()
+            assert data["a"] == data["b"]
+    finally:
+        stop.set()
+        thread.join()
+
+
+@pytest.fixture
+def server():
+    ring = ReadingRing(2000, 2)
+    for i in range(HISTORY_POINTS + 50):
+        ring.append(1000.0 + i, [100.0 + i, None])
+    snapshot = LiveSnapshot()
+    server = DashboardServer(snapshot, port=0, ring=ring, title="Bench")
+    server.url = f"http://127.0.0.1:{server._httpd.server_address[1]}"
+    server.start()
+    yield server
+    server.close()
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=5) as reply:
+        return reply.headers["Content-Type"], reply.read()
+
+
+def test_page_and_snapshot_json(server):
+    server.snapshot.publish(time=datetime.datetime(2026, 10, 19, 8, 0, 0, 123456), readings=[120.5, math.nan],
+                            loop_hz=np.float64(14.25), state="ON")
+    content_type, body = get(server.url + "/")
+    assert content_type.startswith("text/html") and b"Bench" in body
+
+    content_type, body = get(server.url + "/snapshot.json?t=1")
+    data = json.loads(body)
+    assert content_type == "application/json"
+    assert data["time"] == "2026-10-19 08:00:00.123"
+    assert data["readings"] == [120.5, None]                # NaN is not valid JSON
+    assert data["loop_hz"] == 14.25 and data["state"] == "ON" and data["seq"] == 1
+    assert len(data["history"]) == HISTORY_POINTS and data["history"][-1] == 100.0 + HISTORY_POINTS + 49
+
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(server.url + "/missing")
+    assert error.value.code == 404
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+from deadline_scheduler import DeadlineScheduler
+
+
+def test_samples_stay_on_the_grid():
+    scheduler = DeadlineScheduler(0.02)
+    for expected in range(5):
+        index, scheduled, actual, skipped = scheduler.wait_next()
+        assert index == expected and skipped == 0
+        assert scheduled == pytest.approx(scheduler.start + expected * 0.02)
+        assert actual >= scheduled
+        time.sleep(0.005)           # processing time does not shift the grid
+    assert scheduler.samples == 5 and scheduler.overruns == 0
+
+
+def test_first_index():
+    scheduler = DeadlineScheduler(0.02, first_index=1)
+    index, scheduled, _, _ = scheduler.wait_next()
+    assert index == 1
+    assert scheduled == pytest.approx(scheduler.start + 0.02)
+    assert scheduler.offset(index) == pytest.approx(0.02)
+
+
+def test_overrun_skips_slots_instead_of_bursting():
+    scheduler = DeadlineScheduler(0.1, start=time.perf_counter() - 0.35)
+    index, scheduled, actual, skipped = scheduler.wait_next()
+    assert (index, skipped) == (3, 3)
+    assert actual - scheduled < 0.1
+    assert scheduler.wait_next()[0] == 4
+    assert scheduler.overruns == 1 and scheduler.skipped == 3
+
+
+def test_stop_event_interrupts_the_wait():
+    stop = threading.Event()
+    scheduler = DeadlineScheduler(10.0, stop, first_index=1)
+    threading.Timer(0.05, stop.set).start()
+    t_start = time.perf_counter()
+    assert scheduler.wait_next() is None
+    assert time.perf_counter() - t_start < 5.0
+
+
+def test_period_must_be_positive():
+    with pytest.raises(ValueError):
+        DeadlineScheduler(0)
+
+
+def test_spin_margin_covers_the_timer_resolution(monkeypatch):
+    import deadline_scheduler
+    scheduler = DeadlineScheduler(0.05)
+    assert scheduler.spin_margin == deadline_scheduler.SPIN_MARGIN      # not Windows, or 1 ms timer obtained
+    scheduler.close()
+    # Windows without a raised timer resolution spins longer than its ~15.6 ms tick
+    monkeypatch.setattr(deadline_scheduler.sys, "platform", "win32")
+    monkeypatch.setattr(deadline_scheduler, "_begin_timer_period", lambda: None)
+    assert DeadlineScheduler(0.05).spin_margin > 0.0156
@@ -0,0 +1,79 @@
+import csv
+import datetime
+
+import numpy as np
+import pytest
+
+from event_context import ContextDumper, waveform_volts
+from ring_buffer import ReadingRing
+from scope_sim import sim_waveform
+from waveform_codec import WaveformReader, WaveformWriter
+
+T0 = datetime.datetime(2026, 10, 19, 8, 0, 0)
+PERIOD = 0.1
+
+
+def ring_with_readings(seconds=30.0):
+    """Readings every PERIOD from T0: CH1 = seconds since T0, CH2 only read every 10th reading."""
+    ring = ReadingRing(1000, 2)
+    for i in range(int(seconds / PERIOD)):
+        ring.append(T0.timestamp() + i * PERIOD, [i * PERIOD, 5.0 if i % 10 == 0 else None])
+    return ring
+
+
+def read_csv(path):
+    with open(path) as f:
+        return list(csv.reader(f))
+
+
+def test_snippet_is_cut_once_the_post_window_has_passed(tmp_path):
+    dumper = ContextDumper(ring_with_readings(), str(tmp_path), "run", pre_seconds=2.0, post_seconds=1.0)
+    event_time = T0 + datetime.timedelta(seconds=10)
+    dumper.schedule(7, event_time, "OFF", label="line lost")
+    dumper.poll(event_time.timestamp() + 0.5)
+    assert len(dumper._pending) == 1            # post window not over yet
+    dumper.poll(event_time.timestamp() + 1.0)
+    assert not dumper._pending
+    dumper.close()
+
+    rows = read_csv(tmp_path / "run_evt0007.csv")
+    assert rows[0] == ["Time", "CH1", "CH2"]
+    ch1 = [float(row[1]) for row in rows[1:]]
+    assert ch1[0] == pytest.approx(8.0) and ch1[-1] == pytest.approx(11.0)
+    assert len(ch1) == 31
+    # Channels that were not read are blank
+    assert [row[2] for row in rows[1:4]] == ["5.000", "", ""]
+
+    index = read_csv(tmp_path / "run_context.csv")
+    assert index[1] == ["7", "2026-10-19 08:00:10.000000", "OFF", "line lost", "run_evt0007.csv", "31", ""]
+
+
+def test_close_cuts_pending_events_with_the_readings_so_far(tmp_path):
+    dumper = ContextDumper(ring_with_readings(seconds=10.0), str(tmp_path), "run", pre_seconds=1.0, post_seconds=5.0)
+    dumper.schedule(1, T0 + datetime.timedelta(seconds=9.5), "ON")
+    dumper.close()
+    rows = read_csv(tmp_path / "run_evt0001.csv")
+    assert float(rows[-1][1]) == pytest.approx(9.9)          # the ring ends before the post window does
+
+
+def test_waveform_csv_and_store(tmp_path):
+    waveform = sim_waveform("line", points=2000)
+    event_time = T0 + datetime.timedelta(seconds=5)
+
+    dumper = ContextDumper(ring_with_readings(), str(tmp_path), "run", 1.0, 1.0)
+    dumper.schedule(3, event_time, "dropout", waveform=waveform)
+    dumper.close()
+    times, volts = waveform_volts(waveform)
+    saved = np.loadtxt(tmp_path / "run_evt0003_wfm.csv", delimiter=",", skiprows=1)
+    np.testing.assert_allclose(saved[:, 1], volts, rtol=1e-5)
+    np.testing.assert_allclose(saved[:, 0], times, rtol=1e-8)
+
+    store = WaveformWriter(str(tmp_path / "store.wfz"))
+    dumper = ContextDumper(ring_with_readings(), str(tmp_path), "stored", 1.0, 1.0, waveform_store=store)
+    dumper.schedule(4, event_time, "OFF", waveform=waveform)
+    dumper.close()
+    store.close()
+    assert read_csv(tmp_path / "stored_context.csv")[1][-1] == "store.wfz#0"
+    record = WaveformReader(str(tmp_path / "store.wfz")).read(0)
+    np.testing.assert_array_equal(record["codes"], waveform["codes"])
+    assert record["count"] == 4 and record["kind"] == "OFF"
@@ -0,0 +1,63 @@
+import csv
+import datetime
+import os
+import threading
+
+from image_store import ImageStore, MANIFEST_HEADER
+
+T0 = datetime.datetime(2026, 10, 19, 8, 0, 0)
+
+
+def manifest(store):
+    with open(store.manifest_path) as f:
+        return [[field.strip() for field in row] for row in csv.reader(f)]
+
+
+def test_identical_images_are_stored_once(tmp_path):
+    store = ImageStore(str(tmp_path))
+    digest, path, is_new = store.put(b"png one", 1, T0)
+    assert is_new and os.path.exists(path)
+    assert path == os.path.join(str(tmp_path), "images", digest[:2], digest[2:4], digest + ".png")
+    again, same_path, is_new = store.put(bytearray(b"png one"), 2, T0)
+    assert again == digest and same_path == path and not is_new
+    _, other_path, is_new = store.put(memoryview(b"png two"), 3, T0)
+    assert is_new and other_path != path
+    with open(path, "rb") as f:
+        assert f.read() == b"png one"
+
+    rows = manifest(store)
+    assert rows[0] == [name.strip() for name in MANIFEST_HEADER.split(",")]
+    assert [(row[0], row[4]) for row in rows[1:]] == [("1", "new"), ("2", "duplicate"), ("3", "new")]
+    assert rows[1][2] == digest and rows[1][3] == "7" and rows[1][5] == os.path.relpath(path, store.root)
+    # No temporary files left behind
+    assert not [name for _, _, files in os.walk(store.root) for name in files if name.endswith(".tmp")]
+
+
+def test_skipped_captures_and_reopening(tmp_path):
+    store = ImageStore(str(tmp_path))
+    store.put(b"png", 1, T0)
+    store.skip(2, T0)
+    # A second store on the same directory keeps the manifest (one header)
+    ImageStore(str(tmp_path)).put(b"png", 3, T0)
+    rows = manifest(store)
+    assert [row[4] for row in rows[1:]] == ["new", "skipped", "duplicate"]
+    assert rows[2] == ["2", "2026-10-19 08:00:00.000000", "", "", "skipped", ""]
+
+
+def test_manifest_rows_from_several_threads_stay_whole(tmp_path):
+    store = ImageStore(str(tmp_path))
+
+    def worker(offset):
+        for i in range(50):
+            if i % 5:
+                store.put(bytes([offset, i]), offset * 100 + i, T0)
+            else:
+                store.skip(offset * 100 + i, T0)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows = manifest(store)[1:]
+    assert len(rows) == 200 and all(len(row) == 6 for row in rows)
@@ -0,0 +1,93 @@
+import datetime
+import os
+import random
+
+import numpy as np
+
+from log_index import LogIndex, read_range
+from log_reader import read_log
+from onoff_state import csv_header, format_event_row
+
+T0 = datetime.datetime(2026, 10, 19, 8, 0, 0)
+
+
+def write_logged(path, rows=400, seed=0, index=True):
+    """Writes an ON/OFF log the way the logger does, LogIndex.add() before each row.  Returns the row times."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write(csv_header(True, 10) + "\n")
+    log_index = LogIndex(str(path)) if index else None
+    t, times = T0, []
+    for count in range(1, rows + 1):
+        t += datetime.timedelta(seconds=rng.choice((0.5, 5.0, 45.0, 400.0)))
+        end = t + datetime.timedelta(seconds=1)
+        if log_index is not None:
+            log_index.add(t)
+        with open(path, "a") as f:
+            f.write(format_event_row(count, t, end, 120.0, "ON", 1.0) + "\n")
+        times.append(t)
+    return times
+
+
+def expected(path, start, end):
+    table = read_log(str(path))
+    times = table["Start_Time_Absolute"]
+    return table["Event_Count"][(times >= np.datetime64(start)) & (times < np.datetime64(end))]
+
+
+def test_query_matches_a_full_read(tmp_path):
+    path = tmp_path / "events.csv"
+    times = write_logged(path)
+    log_index = LogIndex(str(path))
+    rng = random.Random(1)
+    for _ in range(50):
+        start = rng.choice(times) + datetime.timedelta(seconds=rng.uniform(-90, 90))
+        end = start + datetime.timedelta(seconds=rng.uniform(0, 3600))
+        assert list(log_index.query(start, end)["Event_Count"]) == list(expected(path, start, end))
+
+
+def test_query_reads_only_part_of_the_log(tmp_path):
+    path = tmp_path / "events.csv"
+    times = write_logged(path)
+    first_byte, end_byte, first_row, end_row = LogIndex(str(path)).locate(times[100], times[110])
+    assert 0 < first_byte < end_byte < os.path.getsize(path)
+    assert first_row <= 100 and end_row >= 110
+
+
+def test_rebuild_matches_the_incremental_index(tmp_path):
+    path = tmp_path / "events.csv"
+    write_logged(path)
+    with open(str(path) + ".idx") as f:
+        incremental = f.read()
+    LogIndex(str(path)).rebuild()
+    with open(str(path) + ".idx") as f:
+        assert f.read() == incremental
+
+
+def test_missing_or_stale_index_is_rebuilt(tmp_path):
+    path = tmp_path / "events.csv"
+    times = write_logged(path, index=False)
+    assert not os.path.exists(str(path) + ".idx")
+    start, end = times[50], times[60]
+    assert list(read_range(str(path), start, end)["Event_Count"]) == list(expected(path, start, end))
+
+    # Editing the log moves every row, so the sidecar no longer points at row starts
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text.replace("ON,", "ON ,", 1))
+    assert list(read_range(str(path), start, end)["Event_Count"]) == list(expected(path, start, end))
+
+
+def test_reopened_index_continues_row_numbers(tmp_path):
+    path = tmp_path / "events.csv"
+    write_logged(path, rows=30)
+    assert LogIndex(str(path)).rows == 30
+
+
+def test_string_bounds(tmp_path):
+    path = tmp_path / "events.csv"
+    write_logged(path)
+    table = LogIndex(str(path)).query("2026-10-19 09:00", "2026-10-19 10:00")
+    assert list(table["Event_Count"]) == list(expected(path, "2026-10-19T09:00", "2026-10-19T10:00"))
+    assert len(table) > 0
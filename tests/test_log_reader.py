@@ -0,0 +1,115 @@
+import csv
+import datetime
+import io
+import math
+import random
+
+import numpy as np
+import pytest
+
+from log_reader import read_log, detect_schema
+from onoff_state import csv_header, format_event_row
+
+T0 = datetime.datetime(2026, 10, 19, 8, 0, 0, 125000)
+
+
+def onoff_log(rows=500, dropout=True, seed=0):
+    """ON/OFF log text with state rows, drop-out rows (N/A duration, label) and blank summaries."""
+    rng = random.Random(seed)
+    lines = [csv_header(dropout, 10)]
+    t = T0
+    for count in range(1, rows + 1):
+        duration = rng.uniform(0.5, 600.0)
+        end = t + datetime.timedelta(seconds=duration)
+        if rng.random() < 0.2:
+            lines.append(format_event_row(count, end, end, 119.5, "ON", "N/A", label="* Amp Out MIN: 2.1Vrms"))
+        elif count % 2:
+            summary = {"count": 10, "mean": 120.0, "min": 118.25, "max": 121.5, "p": 121.0}
+            lines.append(format_event_row(count, t, end, rng.uniform(110, 125), "ON", duration, summary=summary))
+        else:
+            lines.append(format_event_row(count, t, end, 0.0, "OFF", duration))
+        t = end
+    return "\n".join(lines) + "\n"
+
+
+def expected_columns(text):
+    """Columns the way csv.reader + strptime/float would read them."""
+    reader = csv.reader(io.StringIO(text))
+    header = [name.strip() for name in next(reader)]
+    rows = list(reader)
+    return header, rows
+
+
+def as_float(field):
+    field = field.strip()
+    try:
+        return float(field)
+    except ValueError:
+        return math.nan
+
+
+@pytest.mark.parametrize("dropout", [True, False])
+def test_onoff_log_matches_csv_reader(tmp_path, dropout):
+    text = onoff_log(dropout=dropout)
+    path = tmp_path / "log.txt"
+    path.write_text(text)
+    log = read_log(str(path))
+    header, rows = expected_columns(text)
+    assert log.schema == "onoff" and len(log) == len(rows)
+    # The label field is named by the drop-out header when there is one
+    assert log.names[-1].startswith("Drop-out Check") if dropout else log.names[-1] == "Label"
+
+    for i, name in enumerate(log.names):
+        column = log[name]
+        cells = [row[i] for row in rows]
+        if name in ("Start_Time_Absolute", "End_Time_Absolute"):
+            expected = [np.datetime64(datetime.datetime.strptime(c, "%Y-%m-%d %H:%M:%S.%f")) for c in cells]
+            assert list(column) == expected
+        elif name in ("State",) or column.dtype.kind == "U":
+            assert list(column) == [c.strip() for c in cells]
+        else:
+            np.testing.assert_array_equal(column, [as_float(c) for c in cells])
+    assert log["Event_Count"].dtype == np.int64
+
+
+def test_rows_keep_not_available_durations_as_text(tmp_path):
+    text = onoff_log()
+    path = tmp_path / "log.txt"
+    path.write_text(text)
+    log = read_log(str(path))
+    _, rows = expected_columns(text)
+    durations = [row[log.names.index("Duration_Seconds")] for row in log.rows()]
+    assert durations == ["N/A" if row[5].strip() == "N/A" else float(row[5]) for row in rows]
+    # Blank summaries stay empty cells, and select() keeps the N/A rows with their own
+    assert all(row[log.names.index("Line_Min")] is None for row in log.rows() if row[4] == "OFF")
+    dropouts = log.select(log.not_available["Duration_Seconds"])
+    assert len(dropouts) and all(row[5] == "N/A" for row in dropouts.rows())
+
+
+def test_windows_line_ends_and_partial_last_row(tmp_path):
+    text = onoff_log(rows=20)
+    partial = text.rstrip("\n").rsplit("\n", 1)[0] + "\n21,2026-10-19 09:00:00.000000"
+    path = tmp_path / "log.txt"
+    path.write_bytes(partial.replace("\n", "\r\n").encode())
+    log = read_log(str(path))
+    assert len(log) == 20
+    assert np.isnat(log["End_Time_Absolute"][-1])
+    assert log["State"][-1] == ""
+
+
+def test_synchronous_log(tmp_path):
+    path = tmp_path / "sync.txt"
+    path.write_text("Count, Time, Vrms_CH1, Vrms_CH2, Sample_Time, Skipped\n"
+                    "   1,     0.0500, 120.125,   5.000,     0.0512, 0\n"
+                    "   2,     0.1000, 119.875,        ,     0.1011, 1\n")
+    log = read_log(str(path))
+    assert log.schema == "synchronous"
+    assert list(log["Count"]) == [1, 2]
+    np.testing.assert_array_equal(log["Vrms_CH2"], [5.0, math.nan])
+    assert list(log["Skipped"]) == [0, 1]
+
+
+def test_detect_schema():
+    assert detect_schema("Event_Count, Start_Time_Absolute, End_Time_Absolute, State, Duration_Seconds") == "triggered"
+    with pytest.raises(ValueError):
+        detect_schema("a,b,c")
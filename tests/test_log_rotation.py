@@ -0,0 +1,100 @@
+import datetime
+import math
+import os
+import sys
+
+import pytest
+
+import log_rotation
+from log_rotation import RotatingLog, SegmentSummary, read_summary, summary_path
+from onoff_state import csv_header
+
+T0 = datetime.datetime(2026, 10, 19, 20, 0, 0)
+HEADER = csv_header(True, 10)
+
+
+def rows(count=40, step=datetime.timedelta(minutes=10)):
+    """Alternating ON/OFF rows, every 7th a drop-out (N/A duration, label), ON rows with a line summary."""
+    t = T0
+    for n in range(1, count + 1):
+        end = t + step
+        if n % 7 == 0:
+            yield dict(count=n, start_time=end, end_time=end, line_v=119.0, state="ON", duration="N/A",
+                       label="* Amp Out MIN: 2.0Vrms")
+        elif n % 2:
+            summary = {"count": 5, "mean": 120.0, "min": 110.0 + n % 5, "max": 125.0 + n % 3, "p": 124.0}
+            yield dict(count=n, start_time=t, end_time=end, line_v=120.0, state="ON",
+                       duration=step.total_seconds(), summary=summary)
+        else:
+            yield dict(count=n, start_time=t, end_time=end, line_v=0.0, state="OFF", duration=step.total_seconds())
+        t = end
+
+
+def write_all(log, items):
+    summaries = []
+    current = SegmentSummary()
+    for row in items:
+        before = len(log.segments)
+        log.write(row)
+        if len(log.segments) != before:
+            summaries.append(current)
+            current = SegmentSummary()
+        current.update(row)
+    log.close()
+    return summaries + [current]
+
+
+def test_rotates_by_size(tmp_path):
+    closed = []
+    log = RotatingLog(str(tmp_path), "run.csv", HEADER, max_bytes=1500, on_close=closed.append)
+    expected = write_all(log, rows())
+    assert len(log.segments) > 2 and closed == log.segments
+    assert os.path.basename(log.segments[0]) == "run.csv"
+    for path in log.segments:
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == HEADER and len(lines) > 1
+        assert os.path.getsize(path) <= 1500
+    # Every row is in exactly one segment, in order
+    counts = [int(line.split(",")[0]) for path in log.segments for line in open(path).read().splitlines()[1:]]
+    assert counts == list(range(1, 41))
+    assert [read_summary(summary_path(path))["Events"] for path in log.segments] == [s.events for s in expected]
+
+
+def test_rotates_by_day(tmp_path):
+    log = RotatingLog(str(tmp_path), "run.csv", HEADER, period="day")
+    write_all(log, rows(count=30))            # 20:00 to 01:00, across midnight
+    assert len(log.segments) == 2
+    assert os.path.basename(log.segments[1]) == "20261020_000000.csv"
+    first = read_summary(summary_path(log.segments[0]))
+    assert first["Last_End"].startswith("2026-10-19")
+    second = read_summary(summary_path(log.segments[1]))
+    assert second["First_Start"].startswith("2026-10-19 23:50") and second["Last_End"].startswith("2026-10-20")
+
+
+def test_summary_from_log_matches_the_running_summary(tmp_path):
+    log = RotatingLog(str(tmp_path), "run.csv", HEADER, max_bytes=2500)
+    write_all(log, rows())
+    for path in log.segments:
+        rebuilt = SegmentSummary.from_log(path)
+        with open(summary_path(path)) as f:
+            running = f.read().splitlines()[1].split(",")
+        assert rebuilt.fields() == running
+
+
+def test_report_total_skips_segments_without_line_voltage(tmp_path, monkeypatch, capsys):
+    off_only = [dict(count=1, start_time=T0, end_time=T0 + datetime.timedelta(minutes=5), line_v=0.0, state="OFF",
+                     duration=300.0)]
+    log = RotatingLog(str(tmp_path), "a.csv", HEADER)
+    write_all(log, off_only)
+    log = RotatingLog(str(tmp_path), "b.csv", HEADER)
+    write_all(log, rows(count=6))
+    assert math.isnan(read_summary(summary_path(str(tmp_path / "a.csv")))["Line_Min"])     # no ON period
+    os.remove(summary_path(str(tmp_path / "b.csv")))              # rebuilt from the log by the report
+
+    monkeypatch.setattr(sys, "argv", ["log_rotation.py", str(tmp_path)])
+    log_rotation.main()
+    total = capsys.readouterr().out.splitlines()[-1].split()
+    assert total[0] == "Total"
+    assert float(total[6]) == pytest.approx(110.0) and float(total[7]) == pytest.approx(127.0)
+    assert os.path.exists(summary_path(str(tmp_path / "b.csv")))
@@ -0,0 +1,114 @@
+import datetime
+
+import pytest
+
+from onoff_state import OnOffStateMachine, LoadCheckGate, csv_header, format_event_row
+
+T0 = datetime.datetime(2026, 1, 1, 8, 0, 0)
+PERIOD = 0.1
+
+
+def run(machine, trace, amps=None):
+    """Steps a list of line Vrms readings (PERIOD apart).  Returns the events, each with its reading index."""
+    events = []
+    for i, line in enumerate(trace):
+        when = T0 + datetime.timedelta(seconds=i * PERIOD)
+        amp_readings = amps[i] if amps is not None else ()
+        events += [(i, event) for event in machine.step(when, line, amp_readings)]
+    return events
+
+
+def kinds(events):
+    return [(i, event.kind) for i, event in events]
+
+
+def machine(**kwargs):
+    kwargs.setdefault("settling_time", 0.0)
+    return OnOffStateMachine(85.0, 75.0, **kwargs)
+
+
+def test_initial_state_from_first_clear_reading():
+    m = machine()
+    assert kinds(run(m, [80.0, 80.0, 120.0])) == [(2, "initial")]
+    assert m.current_state == "ON"
+
+
+def test_on_needs_consecutive_confirmations():
+    m = machine()
+    # OFF, a single ON reading (reset by the next OFF reading), then two ON readings
+    events = run(m, [0.0, 120.0, 0.0, 120.0, 120.0])
+    assert kinds(events) == [(0, "initial"), (4, "first")]
+    assert m.current_state == "ON"
+
+
+def test_in_band_readings_do_not_reset_the_count():
+    m = machine()
+    events = run(m, [0.0, 120.0, 80.0, 120.0])
+    assert kinds(events) == [(0, "initial"), (3, "first")]
+
+
+def test_off_row_logs_steady_voltage_and_on_period_stats():
+    m = machine()
+    trace = [0.0, 120.0, 120.0] + [118.0, 122.0, 120.0] * 10 + [0.0, 0.0, 0.0, 120.0, 120.0]
+    events = run(m, trace)
+    assert [event.kind for _, event in events] == ["initial", "first", "OFF", "ON"]
+    off_row = events[2][1].row
+    assert off_row["state"] == "ON"
+    assert off_row["line_v"] == pytest.approx(120.0)
+    # The readings of the confirmed OFF are not part of the ON period
+    assert off_row["summary"]["min"] == 118.0
+    assert off_row["summary"]["max"] == 122.0
+    on_row = events[3][1].row
+    assert on_row["state"] == "OFF" and on_row["line_v"] == 0.0
+    assert on_row["duration"] == pytest.approx(3 * PERIOD)
+
+
+def test_cancelled_off_confirmation_keeps_the_readings():
+    m = machine(off_confirmations=3)
+    trace = [0.0, 120.0, 120.0, 120.0, 10.0, 10.0, 120.0, 120.0, 0.0, 0.0, 0.0]
+    events = run(m, trace)
+    assert [event.kind for _, event in events] == ["initial", "first", "OFF"]
+    assert events[2][1].row["summary"]["min"] == 10.0
+
+
+def test_dropout_after_delay_only():
+    m = machine(num_amp_channels=1, dropout_enabled=True, dropout_delay=1.0)
+    trace = [0.0, 120.0, 120.0] + [120.0] * 20
+    amps = [(None,)] * 3 + [(2.0,)] * 20
+    events = run(m, trace, amps)
+    dropouts = [i for i, event in events if event.kind == "dropout"]
+    # ON at reading 2, so readings more than 1 s later (index 13 on) are checked
+    assert dropouts == list(range(13, 23))
+    row = events[-1][1].row
+    assert row["start_time"] == row["end_time"] and row["label"].startswith("* Amp Out MIN")
+
+
+def test_no_dropout_near_the_off_level_or_with_a_channel_missing():
+    m = machine(num_amp_channels=2, dropout_enabled=True, dropout_delay=0.0)
+    trace = [0.0, 120.0, 120.0, 88.0, 120.0]
+    amps = [(None, None)] * 3 + [(2.0, 2.0), (2.0, None)]
+    assert "dropout" not in [event.kind for _, event in run(m, trace, amps)]
+
+
+def test_finish_logs_the_state_in_progress():
+    m = machine()
+    run(m, [0.0, 120.0, 120.0, 120.0])
+    event = m.finish(T0 + datetime.timedelta(seconds=10))
+    assert event.kind == "final" and event.row["state"] == "ON"
+    assert event.row["duration"] == pytest.approx(10 - 2 * PERIOD)
+
+
+def test_load_check_gate():
+    gate = LoadCheckGate()
+    assert gate.due(0.0, "UNKNOWN", 120.0, 10)
+    assert not gate.due(5.0, "ON", 120.0, 10)
+    assert not gate.due(11.0, "ON", 70.0, 10, low_limit=75.0, high_limit=85.0)     # OFF pending
+    assert gate.due(11.0, "ON", 120.0, 10, low_limit=75.0, high_limit=85.0)
+    assert gate.due(12.0, "ON", 120.0, 10, force=True)
+    assert not gate.due(13.0, "OFF", 120.0, 10, low_limit=75.0, high_limit=85.0)    # ON pending
+
+
+def test_event_row_matches_header():
+    header = csv_header(True, 10)
+    row = format_event_row(1, T0, T0, 120.0, "ON", 1.5, label="x")
+    assert len(row.split(",")) == len(header.split(","))
@@ -0,0 +1,76 @@
+import datetime
+import math
+
+import numpy as np
+import pytest
+
+from power_meter import PowerMeter, PowerPair, parse_power_pairs, waveform_power, format_power, POWER_COLUMNS
+
+T0 = datetime.datetime(2026, 10, 19, 8, 0, 0)
+
+
+def at(seconds):
+    return T0 + datetime.timedelta(seconds=seconds)
+
+
+def test_parse_power_pairs():
+    pairs = parse_power_pairs("2:3, 4@8")
+    assert repr(pairs) == "[2:3, 4@8]"
+    assert pairs[0].channels == (2, 3) and pairs[1].load_ohms == 8.0
+    for spec in ("2", "2:x", "2:3,3@8"):
+        with pytest.raises(ValueError):
+            parse_power_pairs(spec)
+    with pytest.raises(ValueError):
+        PowerPair(2, load_ohms=0)
+
+
+def test_waveform_power_of_a_phase_shifted_sine():
+    t = np.arange(10_000) / 10_000              # one second, whole cycles
+    volts = 10 * math.sqrt(2) * np.sin(2 * np.pi * 60 * t)
+    amps = 2 * math.sqrt(2) * np.sin(2 * np.pi * 60 * t - np.pi / 3)
+    real, apparent, factor = waveform_power(volts, amps)
+    assert apparent[0] == pytest.approx(20.0, rel=1e-6)
+    assert factor[0] == pytest.approx(0.5, rel=1e-6)
+    assert real[0] == pytest.approx(10.0, rel=1e-6)
+
+
+def test_resistive_load_energy():
+    meter = PowerMeter(parse_power_pairs("2@8"))
+    meter.reset(at(0))
+    meter.update(at(0), [120.0, 8.0])           # 8 W
+    meter.update(at(1800), [120.0, 4.0])        # 2 W for the second half hour
+    summary = meter.summary(at(3600))[0]
+    assert summary["energy_wh"] == pytest.approx(5.0)
+    assert summary["real_w"] == pytest.approx(5.0)
+    assert summary["pf"] == pytest.approx(1.0)
+
+
+def test_current_pair_needs_a_capture_for_real_power():
+    meter = PowerMeter(parse_power_pairs("2:3"))
+    meter.reset(at(0))
+    meter.update(at(0), [120.0, 10.0, 2.0])
+    meter.update(at(10), [120.0, 10.0, 2.0])
+    assert math.isnan(meter.summary(at(10))[0]["real_w"])     # power factor still unknown
+
+    t = np.arange(1000) / 1000
+    meter.update_waveforms({2: np.sin(2 * np.pi * 60 * t), 3: np.sin(2 * np.pi * 60 * t)})
+    meter.update(at(20), [120.0, 10.0, 2.0])
+    meter.update(at(30), [120.0, 10.0, 2.0])
+    summary = meter.summary(at(30))[0]
+    assert summary["real_w"] == pytest.approx(20.0, rel=1e-3)
+    assert summary["energy_wh"] == pytest.approx(20.0 * 10 / 3600, rel=1e-3)      # known from 20 s on
+
+
+def test_reset_starts_a_new_period():
+    meter = PowerMeter(parse_power_pairs("2@8"))
+    meter.reset(at(0))
+    meter.update(at(0), [120.0, 8.0])
+    meter.summary(at(60))
+    meter.reset(at(60))
+    assert math.isnan(meter.summary(at(120))[0]["energy_wh"])
+
+
+def test_format_power():
+    assert format_power([None]) == "," * (len(POWER_COLUMNS) - 1)
+    fields = format_power([dict(real_w=1.5, apparent_va=2.0, pf=0.75, energy_wh=math.nan)]).split(",")
+    assert fields == ["1.500", "2.000", "0.7500", ""]
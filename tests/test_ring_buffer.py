@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ring_buffer import ReadingRing, capacity_for
+
+
+def filled(capacity=10, readings=25, path=None):
+    ring = ReadingRing(capacity, 2, path)
+    for i in range(readings):
+        ring.append(1000.0 + i, [100.0 + i, None if i % 5 == 0 else 5.0])
+    return ring
+
+
+def test_latest_after_wrapping():
+    ring = filled()
+    assert len(ring) == 10
+    times, values = ring.latest(3)
+    assert list(times) == [1022.0, 1023.0, 1024.0]
+    assert list(values[:, 0]) == [122.0, 123.0, 124.0]
+    assert np.isnan(ring.latest()[1][0, 1])          # reading 15 had CH2 not read
+
+
+@pytest.mark.parametrize("t_start, t_end", [(1016.0, 1020.0), (1014.5, 1022.5), (900.0, 2000.0), (1019.0, 1019.0)])
+def test_between_matches_a_full_scan(t_start, t_end):
+    ring = filled(readings=23)                      # wrapped: slots hold readings 13..22 out of order
+    all_times, all_values = ring.latest()
+    keep = (all_times >= t_start) & (all_times <= t_end)
+    times, values = ring.between(t_start, t_end)
+    np.testing.assert_array_equal(times, all_times[keep])
+    np.testing.assert_array_equal(values, all_values[keep])
+
+
+def test_between_outside_the_ring_is_empty():
+    times, values = filled().between(0.0, 10.0)
+    assert times.shape == (0,) and values.shape == (0, 2)
+    assert ReadingRing(4, 2).between(0.0, 1e12)[1].shape == (0, 2)
+
+
+def test_short_readings_are_padded():
+    ring = ReadingRing(4, 3)
+    ring.append(1.0, [120.0])
+    assert np.isnan(ring.latest()[1][0, 1:]).all()
+
+
+def test_memory_mapped_ring_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "run.ring")
+    ring = filled(path=path)
+    ring.close()
+    reopened = ReadingRing.open(path)
+    assert len(reopened) == 10
+    np.testing.assert_array_equal(reopened.latest()[0], np.arange(1015.0, 1025.0))
+    reopened.append(2000.0, [1.0, 2.0])
+    assert reopened.latest(1)[0][0] == 2000.0
+
+
+def test_readers_never_see_torn_readings():
+    ring = ReadingRing(64, 2)
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            ring.append(float(i), [float(i), float(i)])
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(2000):
+            times, values = ring.latest()
+            assert np.array_equal(times, values[:, 0]) and np.array_equal(times, values[:, 1])
+            assert (np.diff(times) == 1).all()
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_capacity_for():
+    assert capacity_for(1.0, 0.1) == 36000
+    assert capacity_for(0.0) == 1
@@ -0,0 +1,80 @@
+import pytest
+
+pyvisa = pytest.importorskip("pyvisa")
+
+from scope_files import read_file, save_screenshot, transfer_report
+from scope_sim import SimScope
+
+StatusCode = pyvisa.constants.StatusCode
+
+
+class BlockScope:
+    """Answers FILESystem:READfile with an IEEE 488.2 definite-length block, at most max_read bytes per read."""
+    def __init__(self, files, max_read=1000):
+        self.files = files
+        self.max_read = max_read
+        self.visalib = self
+        self.session = 0
+        self.commands = []
+        self.sizes = []
+        self._pending = b""
+
+    def write(self, message):
+        self.commands.append(message)
+        command, _, path = message.partition(" ")
+        if command == "FILESystem:READfile":
+            data = self.files[path.strip('"')]
+            length = str(len(data)).encode()
+            self._pending = b"#" + str(len(length)).encode() + length + data + b"\n"
+
+    def query(self, message):
+        self.commands.append(message)
+        return "1"
+
+    def read(self, session, size):
+        self.sizes.append(size)
+        size = min(size, self.max_read)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data, StatusCode.success_max_count_read if self._pending else StatusCode.success
+
+
+class Driver:
+    """tm_devices style driver: the resource is its visa_resource."""
+    def __init__(self, resource):
+        self.visa_resource = resource
+
+
+DATA = bytes(range(256)) * 40       # 10240 bytes
+
+
+@pytest.mark.parametrize("chunk_size", [64, 4096, 1 << 20])
+def test_definite_length_block_is_reassembled(tmp_path, chunk_size):
+    scope = BlockScope({"C:/a.png": DATA})
+    data, stats = read_file(scope, "C:/a.png", chunk_size=chunk_size)
+    assert bytes(data) == DATA and stats["bytes"] == len(DATA)
+    assert not scope._pending                       # the terminator was read too
+    assert max(scope.sizes) <= chunk_size
+
+    path = tmp_path / "a.png"
+    data, _ = read_file(Driver(BlockScope({"C:/a.png": DATA})), "C:/a.png", str(path), chunk_size=chunk_size)
+    assert data is None and path.read_bytes() == DATA
+
+
+def test_delete_after_reading():
+    scope = BlockScope({"C:/a.png": DATA})
+    read_file(scope, "C:/a.png", delete=True)
+    assert scope.commands[-1] == 'FILESystem:DELEte "C:/a.png";*OPC?'
+
+
+def test_bare_file_is_streamed_until_end(tmp_path):
+    scope = SimScope(rtt=0.0, image_bytes=64 * 100, transfer_rate=1e12)
+    data, stats = save_screenshot(scope, chunk_size=1000)
+    assert len(data) == 6400 and stats["bytes"] == 6400
+    assert "MB in" in transfer_report(stats)
+    assert not scope._files                         # scope copy deleted
+
+    scope.query('SAVE:IMAGe "C:/b.png";*OPC?')
+    expected = scope._files["C:/b.png"]
+    path = tmp_path / "b.png"
+    assert read_file(scope, "C:/b.png", str(path), chunk_size=512)[0] is None
+    assert path.read_bytes() == expected
@@ -0,0 +1,97 @@
+import datetime
+import time
+
+import pytest
+
+import scope_session
+from scope_session import TimedSession
+
+RTT = 0.004
+
+
+class FakeInstrument:
+    """Answers every query (';' joined or queued on a socket) after one simulated round trip per message."""
+    def __init__(self, resource_name="TCPIP::10.0.0.1::INSTR", fail=()):
+        self.resource_name = resource_name
+        self.fail = fail
+        self.timeout = 1000
+        self._queued = []
+        self.cleared = 0
+
+    def _answer(self, command):
+        if command in self.fail:
+            raise IOError(command)
+        return command.strip(":?").upper()
+
+    def query(self, message):
+        time.sleep(RTT * len(message.split(";")))
+        return ";".join(self._answer(command) for command in message.split(";"))
+
+    def write(self, message):
+        self._queued.append(message)
+
+    def read(self):
+        time.sleep(RTT)
+        return self._answer(self._queued.pop(0))
+
+    def clear(self):
+        self._queued = []
+        self.cleared += 1
+
+
+def test_single_queries_feed_the_rtt_estimate():
+    session = TimedSession(FakeInstrument())
+    for _ in range(5):
+        session.query("*IDN?")
+    stats = session.rtt_stats()
+    assert stats["count"] == 5
+    assert RTT <= stats["min"] and stats["srtt"] < 3 * RTT
+    assert session.last_send <= session.sample_instant() <= session.last_recv
+
+
+@pytest.mark.parametrize("resource, compound", [("TCPIP::10.0.0.1::INSTR", True),
+                                                ("TCPIP::10.0.0.1::4000::SOCKET", False)])
+def test_batches_stay_out_of_the_rtt_estimate(resource, compound):
+    session = TimedSession(FakeInstrument(resource))
+    session.query("*IDN?")
+    srtt = session.srtt
+    commands = [f":MEAS{i}?" for i in range(1, 9)]
+    assert session.query_many(commands, compound=compound) == [f"MEAS{i}" for i in range(1, 9)]
+    assert session.count == 1 and session.srtt == srtt
+    assert session.batch_count == 1 and session.batch_last >= 8 * RTT
+    # The sample instant is the last reply, half a single RTT before it arrived
+    assert session.sample_instant() == pytest.approx(session.last_recv - srtt / 2)
+    assert "batches: 1" in session.rtt_report()
+
+
+def test_failed_command_falls_back_to_single_queries():
+    session = TimedSession(FakeInstrument(fail=(":MEAS2?",)))
+    replies = session.query_many([":MEAS1?", ":MEAS2?", ":MEAS3?"], compound=True)
+    assert replies[0] == "MEAS1" and replies[2] == "MEAS3"
+    assert isinstance(replies[1], IOError)
+
+
+def test_timeout_is_passed_to_the_instrument():
+    instrument = FakeInstrument()
+    session = TimedSession(instrument)
+    session.timeout = 5000
+    assert instrument.timeout == 5000 and session.timeout == 5000
+
+
+def test_report_before_any_query():
+    assert TimedSession(FakeInstrument()).rtt_report() == "RTT: no queries yet"
+
+
+def test_timestamps_are_reanchored(monkeypatch):
+    session = TimedSession(FakeInstrument())
+    now = time.perf_counter()
+    assert abs((session.to_datetime(now) - datetime.datetime.now()).total_seconds()) < 0.05
+    # Wall clock corrected (or perf_counter drifted) by 2 s: kept until the anchor ages out
+    session._wall_ref -= datetime.timedelta(seconds=2)
+    assert (datetime.datetime.now() - session.to_datetime(time.perf_counter())).total_seconds() > 1.9
+    monkeypatch.setattr(scope_session, "REANCHOR_PERIOD", 0.0)
+    assert abs((session.to_datetime(time.perf_counter()) - datetime.datetime.now()).total_seconds()) < 0.05
+    monkeypatch.setattr(scope_session, "REANCHOR_PERIOD", 300.0)
+    session._wall_ref -= datetime.timedelta(seconds=2)
+    session.rtt_report()
+    assert abs((session.to_datetime(time.perf_counter()) - datetime.datetime.now()).total_seconds()) < 0.05
@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+import pytest
+
+from stream_stats import Ewma, Welford, RollingWindow, P2Quantile, ChannelStats
+
+
+def test_ewma_starts_at_first_sample():
+    ewma = Ewma(alpha=0.5)
+    assert ewma.update(10.0) == 10.0
+    assert ewma.update(20.0) == 15.0
+
+
+def test_welford_matches_numpy():
+    data = np.random.default_rng(1).normal(120.0, 2.0, 10_000)
+    stats = Welford()
+    for x in data:
+        stats.update(x)
+    assert stats.count == data.size
+    assert stats.mean == pytest.approx(data.mean())
+    assert stats.variance == pytest.approx(data.var(ddof=1))
+    assert (stats.min, stats.max) == (data.min(), data.max())
+
+
+def test_welford_variance_of_one_sample_is_zero():
+    stats = Welford()
+    stats.update(5.0)
+    assert stats.variance == 0.0
+
+
+def test_rolling_window_matches_slices():
+    data = np.random.default_rng(2).normal(0.0, 1.0, 500)
+    window = RollingWindow(7)
+    for i, x in enumerate(data):
+        window.update(x)
+        recent = data[max(0, i - 6):i + 1]
+        assert len(window) == recent.size
+        assert window.mean == pytest.approx(recent.mean())
+        assert window.min == recent.min()
+        assert window.max == recent.max()
+
+
+@pytest.mark.parametrize("p", [0.5, 0.9, 0.99])
+@pytest.mark.parametrize("dist", ["normal", "uniform", "exponential"])
+def test_p2_quantile_close_to_numpy(p, dist):
+    rng = np.random.default_rng(3)
+    data = {"normal": lambda: rng.normal(120.0, 2.0, 50_000),
+            "uniform": lambda: rng.uniform(0.0, 10.0, 50_000),
+            "exponential": lambda: rng.exponential(1.0, 50_000)}[dist]()
+    estimator = P2Quantile(p)
+    for x in data:
+        estimator.update(x)
+    exact = np.quantile(data, p)
+    spread = np.quantile(data, 0.999) - np.quantile(data, 0.001)
+    assert abs(estimator.value - exact) < 0.02 * spread
+
+
+def test_p2_quantile_exact_below_five_samples():
+    estimator = P2Quantile(0.5)
+    for x in (3.0, 1.0, 2.0):
+        estimator.update(x)
+    assert estimator.value == 2.0
+
+
+def test_channel_stats_skips_missing_readings():
+    stats = ChannelStats()
+    for x in (1.0, None, math.nan, 3.0):
+        stats.update(x)
+    summary = stats.summary()
+    assert summary["count"] == 2
+    assert summary["mean"] == 2.0
+    assert (summary["min"], summary["max"]) == (1.0, 3.0)
+
+
+def test_channel_stats_empty_summary():
+    assert ChannelStats().summary()["count"] == 0
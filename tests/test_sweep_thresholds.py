@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from log_reader import read_log
+from onoff_state import OnOffStateMachine
+from replay_onoff import replay
+from scope_sim import profile_readings
+from sweep_thresholds import sweep, parse_values
+
+DURATION = 1200.0       # seconds of simulated readings
+
+
+def trace(profile):
+    rows = list(profile_readings(profile, DURATION, num_amp_channels=1, seed=1))
+    start = rows[0][0]
+    t = np.array([(row[0] - start).total_seconds() for row in rows])
+    line = np.array([row[1] for row in rows])
+    amp = np.array([row[2] for row in rows], dtype=np.float64).reshape(len(rows), 1)
+    return rows, t, line, amp
+
+
+@pytest.mark.parametrize("profile", ["dropouts", "amp_dropout", "brownout"])
+@pytest.mark.parametrize("high, low, on_confirm, off_confirm", [(85, 75, 2, 2), (90, 70, 1, 3)])
+def test_sweep_matches_replay(tmp_path, profile, high, low, on_confirm, off_confirm):
+    rows, t, line, amp = trace(profile)
+    (result,) = sweep(t, line, amp, [high], [low], [on_confirm], [off_confirm], [10.0], interval=10.0)
+
+    machine = OnOffStateMachine(high, low, num_amp_channels=1, dropout_enabled=True, dropout_delay=10.0,
+                                on_confirmations=on_confirm, off_confirmations=off_confirm)
+    path = tmp_path / "replay.txt"
+    replay(iter(rows), machine, str(path), dropout_enabled=True, dropout_interval=10.0)
+    log = read_log(str(path))
+    dropout = log.not_available.get("Duration_Seconds", np.zeros(len(log), dtype=bool))
+
+    assert result["dropouts"] == np.count_nonzero(dropout)
+    # The first transition only starts timing; every later one and the end of the run log a state row
+    state_rows = log.select(~dropout)
+    assert len(state_rows) == max(result["transitions"], 1)
+    if result["transitions"]:
+        # The replay log starts at the first transition, the sweep at the initial state
+        first = (state_rows["Start_Time_Absolute"][0] - np.datetime64(rows[0][0])) / np.timedelta64(1, "s")
+        initial_on = state_rows["State"][0] == "OFF"
+        on_time = state_rows["Duration_Seconds"][state_rows["State"] == "ON"].sum() + (first if initial_on else 0.0)
+        assert result["on_time"] == pytest.approx(on_time, abs=1e-3)
+
+
+def test_grid_skips_inverted_limits():
+    _, t, line, amp = trace("cycling")
+    results = sweep(t, line, amp, [80, 85], [75, 85], [1, 2], [2], [5, 10])
+    # (80, 85) and (85, 85) have low >= high: 2 limit pairs x 2 x 1 confirmations x 2 delays
+    assert len(results) == 8
+    assert set(zip(results["high"], results["low"])) == {(80.0, 75.0), (85.0, 75.0)}
+
+
+def test_parse_values():
+    assert parse_values("80:86:2") == [80.0, 82.0, 84.0]
+    assert parse_values("1,2,3", int) == [1, 2, 3]
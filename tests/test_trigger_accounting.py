@@ -0,0 +1,59 @@
+import random
+
+from scope_sim import SimScope
+from trigger_accounting import TriggerAccounting, parse_numacq, format_missed, read_source_period
+
+
+def test_counter_method():
+    accounting = TriggerAccounting()
+    assert accounting.update(1, 0.0) is None
+    assert accounting.update(2, 1.0) == 0
+    assert accounting.update(5, 2.0) == 2
+    assert accounting.method == "counter"
+    assert accounting.missed == 2
+    assert accounting.coverage() == 3 / 5
+
+
+def test_interval_method_with_a_nominal_period():
+    accounting = TriggerAccounting(nominal_period=0.05)
+    captured = [0, 1, 2, 5, 6, 10]          # source trigger numbers the loop saw
+    results = [accounting.update(1, n * 0.05) for n in captured]
+    assert results == [None, 0, 0, 2, 0, 3]
+    assert accounting.method == "interval"
+    assert accounting.coverage() == 6 / 11
+
+
+def test_interval_jitter_does_not_add_up():
+    rng = random.Random(0)
+    accounting = TriggerAccounting(nominal_period=0.01)
+    for n in range(0, 10_000, 3):           # every third trigger, timestamps jittered by 40% of a period
+        accounting.update(1, n * 0.01 + rng.uniform(-0.002, 0.002))
+    assert abs(accounting.missed - 2 * (accounting.captured - 1)) <= 1
+
+
+def test_aperiodic_source_leaves_misses_unknown():
+    accounting = TriggerAccounting()
+    for t in (0.0, 0.5, 30.0, 31.0, 600.0):
+        assert accounting.update(1, t) is None
+    assert accounting.coverage() is None
+    assert "n/a" in accounting.report()
+
+
+def test_parse_and_format():
+    assert parse_numacq(":ACQUIRE:NUMACQ 12\n") == 12
+    assert parse_numacq("3.0") == 3
+    assert parse_numacq("") is None
+    assert format_missed(None) == "" and format_missed(0) == "0"
+
+
+class _NoCounter:
+    def write(self, message):
+        pass
+
+    def query(self, message):
+        return "9.91E+37"
+
+
+def test_read_source_period_from_the_trigger_counter():
+    assert abs(read_source_period(SimScope(trigger_rate=20.0, rtt=0.0), settle_time=0.0) - 0.05) < 1e-9
+    assert read_source_period(_NoCounter(), settle_time=0.0) is None
@@ -0,0 +1,82 @@
+import csv
+import datetime
+
+import numpy as np
+import pytest
+
+from scope_sim import sim_waveform
+from waveform_analysis import (ANALYSIS_FIELDS, RAIL_CODE, WaveformAnalyzer, analyze, analyze_capture,
+                               format_analysis_row)
+
+XINCR = 1e-6            # 1 MS/s
+POINTS = 50_000         # 50 ms: 50 cycles of 1 kHz
+
+
+def tone(h3=0.0, clip=None, amplitude=10.0, frequency=1000.0):
+    t = np.arange(POINTS) * XINCR
+    volts = amplitude * (np.sin(2 * np.pi * frequency * t) + h3 * np.sin(2 * np.pi * 3 * frequency * t))
+    if clip is not None:
+        volts = np.clip(volts, -clip * amplitude, clip * amplitude)
+    return volts
+
+
+def test_pure_tone():
+    result = analyze(tone(), XINCR)
+    assert result["Fundamental_Hz"] == pytest.approx(1000.0, abs=0.5)
+    assert result["Fundamental_Vrms"] == pytest.approx(10.0 / np.sqrt(2), rel=1e-3)
+    assert result["Vrms"] == pytest.approx(10.0 / np.sqrt(2), rel=1e-4)
+    assert result["THD_N_Percent"] < 0.01
+    assert result["Crest_Factor"] == pytest.approx(np.sqrt(2), rel=1e-3)
+    assert not result["Clipped"] and not result["Overrange"]
+
+
+def test_one_percent_third_harmonic():
+    result = analyze(tone(h3=0.01), XINCR)
+    assert f"{result['THD_N_Percent']:.3f}" == "1.000"
+    assert result["THD_Percent"] == pytest.approx(1.0, abs=1e-3)
+    assert result["H3_dB"] == pytest.approx(-40.0, abs=0.01)
+    assert result["H2_dB"] < -120.0
+    assert not result["Clipped"]
+
+
+def test_clipping_flagged_at_five_percent():
+    assert analyze(tone(clip=0.99), XINCR)["Clipped"] is False
+    result = analyze(tone(clip=0.95), XINCR)
+    assert result["Clipped"] is True
+    assert result["Flat_Fraction"] > 0.2 and result["Crest_Factor"] < np.sqrt(2)
+
+
+def test_scope_overrange_from_raw_codes():
+    waveform = sim_waveform("amp", points=POINTS, record_time=POINTS * XINCR)
+    assert not analyze_capture(waveform)["Overrange"]
+    waveform["codes"] = waveform["codes"].copy()
+    waveform["codes"][100] = RAIL_CODE
+    assert analyze_capture(waveform)["Overrange"]
+    one_byte = sim_waveform("amp", points=POINTS, record_time=POINTS * XINCR, width=1)
+    one_byte["codes"][100] = 127
+    assert analyze_capture(one_byte)["Overrange"]
+
+
+def test_record_too_short():
+    with pytest.raises(ValueError):
+        analyze(tone()[:8], XINCR)
+
+
+def test_analyzer_appends_one_row_per_capture(tmp_path):
+    path = str(tmp_path / "run_analysis.csv")
+    results = []
+    analyzer = WaveformAnalyzer(path, workers=1, on_result=lambda *args: results.append(args))
+    when = datetime.datetime(2026, 10, 19, 8, 0, 0)
+    waveform = sim_waveform("amp", points=POINTS, record_time=POINTS * XINCR)
+    assert analyzer.submit(5, when, 2, waveform)
+    assert analyzer.submit(5, when, 3, waveform)
+    analyzer.close()
+    assert analyzer.completed == 2 and analyzer.failed == 0 and len(results) == 2
+
+    with open(path) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(ANALYSIS_FIELDS)
+    assert sorted(row[2] for row in rows[1:]) == ["CH2", "CH3"]
+    assert rows[1][0] == "5" and rows[1][1] == "2026-10-19 08:00:00.000000"
+    assert float(rows[1][3]) == pytest.approx(1000.0, abs=0.5)
+    assert rows[1] == format_analysis_row(5, when, int(rows[1][2][2:]), results[0][3]).split(",")
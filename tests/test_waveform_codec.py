@@ -0,0 +1,84 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from scope_sim import sim_waveform, WAVEFORM_PROFILES
+from waveform_codec import (encode_chunk, decode_chunk, WaveformWriter, WaveformReader, FILTER_DELTA, FILTER_NONE,
+                            _filtered)
+
+
+@pytest.mark.parametrize("delta", [False, True])
+@pytest.mark.parametrize("dtype", [np.int8, np.int16])
+def test_chunk_round_trip_with_wrapping_deltas(dtype, delta):
+    info = np.iinfo(dtype)
+    codes = np.random.default_rng(0).integers(info.min, info.max, 10_000, endpoint=True).astype(dtype)
+    codes[:4] = [info.min, info.max, info.min, 0]           # largest jumps wrap in the code type
+    data = zlib.compress(_filtered(codes, delta))
+    decoded = decode_chunk(data, codes.dtype.str, codes.size, FILTER_DELTA if delta else FILTER_NONE)
+    np.testing.assert_array_equal(decoded, codes)
+
+    chunk_filter, data = encode_chunk(codes)
+    np.testing.assert_array_equal(decode_chunk(data, codes.dtype.str, codes.size, chunk_filter), codes)
+
+
+def test_smooth_codes_use_delta():
+    codes = (1000 * np.sin(np.linspace(0, 20 * np.pi, 65536))).astype(np.int16)
+    chunk_filter, data = encode_chunk(codes)
+    assert chunk_filter == FILTER_DELTA
+    assert len(data) < codes.nbytes / 3
+
+
+@pytest.mark.parametrize("profile", WAVEFORM_PROFILES)
+@pytest.mark.parametrize("bits, width", [(8, 2), (12, 2), (8, 1)])
+def test_store_round_trip(tmp_path, profile, bits, width):
+    waveform = sim_waveform(profile, points=50_000, bits=bits, width=width)
+    path = str(tmp_path / "run.wfz")
+    writer = WaveformWriter(path, chunk_points=8192)
+    assert writer.append(waveform, channel=2, time="2026-10-19 08:00:00") == 0
+    writer.close()
+    assert writer.stored_bytes < writer.raw_bytes
+
+    record = WaveformReader(path).read(0)
+    np.testing.assert_array_equal(record["codes"], waveform["codes"])
+    assert record["channel"] == 2
+    for key in ("xincr", "xzero", "ymult", "yoff", "yzero"):
+        assert record[key] == pytest.approx(waveform[key])
+
+
+def test_range_read_decodes_only_its_chunks(tmp_path):
+    waveform = sim_waveform("line", points=50_000)
+    path = str(tmp_path / "run.wfz")
+    writer = WaveformWriter(path, chunk_points=8192)
+    writer.append(waveform)
+    writer.close()
+    record = WaveformReader(path).read(0, 10_000, 10_500)
+    np.testing.assert_array_equal(record["codes"], waveform["codes"][10_000:10_500])
+    assert record["xzero"] == pytest.approx(waveform["xzero"] + 10_000 * waveform["xincr"])
+    assert WaveformReader(path).read(0, 60_000, 70_000)["codes"].size == 0
+
+
+def test_partial_record_is_dropped_and_appending_continues(tmp_path):
+    path = str(tmp_path / "run.wfz")
+    writer = WaveformWriter(path, chunk_points=4096)
+    for seed in range(3):
+        writer.append(sim_waveform("noise", points=10_000, seed=seed))
+    writer.close()
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 100)                      # the last record was being written
+    assert len(WaveformReader(path)) == 2
+
+    writer = WaveformWriter(path)
+    assert writer.chunk_points == 4096
+    assert writer.append(sim_waveform("noise", points=10_000, seed=9)) == 2
+    writer.close()
+    reader = WaveformReader(path)
+    assert len(reader) == 3
+    np.testing.assert_array_equal(reader.read(2)["codes"], sim_waveform("noise", points=10_000, seed=9)["codes"])
+
+
+def test_not_a_store(tmp_path):
+    path = tmp_path / "x.wfz"
+    path.write_bytes(b"hello")
+    with pytest.raises(ValueError):
+        WaveformReader(str(path))
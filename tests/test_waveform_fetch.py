@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pytest
+
+from waveform_fetch import WaveformRequest, FetchStats, plan_window, fetch_waveform, FULL_RECORD, BLOCK_HEADER
+
+XINCR = 1e-5            # 100 kS/s: 1666.7 samples per 60 Hz cycle
+LENGTH = 100_000        # 1 s record
+XZERO = -0.25           # trigger 25000 points into the record
+
+
+def test_full_record():
+    assert plan_window(FULL_RECORD, LENGTH, XINCR, XZERO)[:2] == (1, LENGTH)
+
+
+@pytest.mark.parametrize("align, first", [("start", 0), ("end", LENGTH - 5001), ("center", (LENGTH - 5001) // 2),
+                                          ("trigger", 25_000)])
+def test_window_alignment(align, first):
+    start, stop, _ = plan_window(WaveformRequest(cycles=3, align=align), LENGTH, XINCR, XZERO)
+    assert stop - start + 1 == 5001             # ceil(3 cycles * 1666.7) + 1 points
+    assert start == first + 1
+
+
+def test_window_is_clamped_to_the_record():
+    start, stop, _ = plan_window(WaveformRequest(cycles=3), LENGTH, XINCR, -0.999)
+    assert (start, stop) == (LENGTH - 5000, LENGTH)
+    start, stop, _ = plan_window(WaveformRequest(cycles=1000), LENGTH, XINCR, XZERO)
+    assert (start, stop) == (1, LENGTH)
+
+
+def test_oversampling():
+    _, _, oversampling = plan_window(WaveformRequest(cycles=1, samples_per_cycle=100), LENGTH, XINCR, XZERO)
+    assert oversampling == pytest.approx(1 / (XINCR * 60) / 100)
+    assert math.isnan(plan_window(WaveformRequest(cycles=1), LENGTH, XINCR, XZERO)[2])
+
+
+def test_request_width_and_alignment():
+    assert WaveformRequest(bits=8).width == 1 and WaveformRequest(bits=12).width == 2
+    with pytest.raises(ValueError):
+        WaveformRequest(align="middle")
+
+
+class FakeTek:
+    """Answers the preamble queries and CURVe? for the DATa:STARt/STOP window."""
+    def __init__(self):
+        self.writes = []
+        self.codes = np.arange(LENGTH) % 200 - 100
+
+    def write(self, message):
+        self.writes.append(message)
+
+    def query_many(self, commands, compound=False):
+        values = {":HORizontal:RECOrdlength?": LENGTH, ":WFMOutpre:XINcr?": XINCR, ":WFMOutpre:XZEro?": XZERO,
+                  ":WFMOutpre:YMUlt?": 0.5, ":WFMOutpre:YOFf?": 0.0, ":WFMOutpre:YZEro?": 0.0}
+        return [f"{command[1:-1].upper()} {values[command]}" for command in commands]
+
+    def query_binary_values(self, command, datatype, is_big_endian, container):
+        window = dict(part.split() for part in self.writes[-1].lstrip(":").split(";:"))
+        return container(self.codes[int(window["DATa:STARt"]) - 1:int(window["DATa:STOP"])])
+
+
+def test_fetch_window_and_stats():
+    scope, stats = FakeTek(), FetchStats()
+    waveform = fetch_waveform(scope, 1, WaveformRequest(cycles=3, bits=8), stats)
+    assert ":DATa:WIDth 1" in scope.writes[0]
+    assert (waveform["start"], waveform["stop"], waveform["record_length"]) == (25_001, 30_001, LENGTH)
+    np.testing.assert_array_equal(waveform["codes"], scope.codes[25_000:30_001])
+    assert waveform["xzero"] == pytest.approx(XZERO + 25_000 * XINCR)        # time of the first fetched point
+    assert stats.fetches == 1
+    assert stats.bytes == 5001 + BLOCK_HEADER and stats.full_bytes == 2 * LENGTH + BLOCK_HEADER
+    assert "saved" in stats.report()
@@ -0,0 +1,125 @@
+"""
+Trigger Accounting
+
+Description- Missed-trigger accounting for the trigger capture loops (TekCaptureDPO4034, TekCaptureMSO58, Triggered).
+
+Each capture cycle reads the scope's acquisition counter (ACQuire:NUMACq?) before re-arming, and is timestamped at the
+trigger.  TriggerAccounting.update() turns that into the number of triggers missed since the previous capture:
+    counter   while the counter keeps counting across captures (scope left in RUNSTop, or a multi-sequence
+              acquisition), every acquisition the host did not capture is a missed trigger:  NUMACq - previous - 1
+    interval  a single sequence re-armed with ACQuire:STATE 1 restarts the counter, so NUMACq stays at 1 and cannot
+              show anything the scope did not acquire.  Only for a repetitive source with a known nominal_period is
+              the gap between captured triggers compared with it:  round(gap / period) - 1
+              The rounding remainder is carried to the next gap, so host timing jitter on the trigger timestamps
+              cancels out instead of adding up.
+The capture scripts all re-arm a single sequence, so the interval method is the one that counts, and it needs the
+period.  A configured period wins; otherwise read_source_period() takes it from the scope's trigger frequency counter
+(TRIGger:FREQuency?, which keeps counting the source's trigger events whatever the acquisition does).  With neither,
+the scripts print MISSING_PERIOD_WARNING.
+Without a period (or for aperiodic sources, e.g. power ON/OFF events or manual triggers) the number missed cannot be
+known: update() returns None and the Missed column is left blank, since a period guessed from the gaps would turn
+every long pause of an aperiodic source into made-up misses.
+Coverage is captured / (captured + missed), i.e., the fraction of the source's triggers the pipeline really saw
+(n/a when no misses could be counted).
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import time
+
+NUMACQ_QUERY = "ACQuire:NUMACq?"
+TRIGGER_FREQUENCY_ON = "DISplay:TRIGFrequency ON"     # the counter only runs while its readout is on (DPO/MSO4000)
+TRIGGER_FREQUENCY_QUERY = "TRIGger:FREQuency?"
+COUNTER_SETTLE_TIME = 1.1       # seconds: the counter is a one second gate
+MISSING_PERIOD_WARNING = ("Warning: trigger source period unknown (not configured and no trigger frequency reading). "
+                          "Missed-trigger counts stay blank; set the source period to count them.")
+
+
+def parse_numacq(response):
+    """NUMACq? reply to int, None if unreadable."""
+    try:
+        return int(float(str(response).strip().split()[-1]))
+    except (ValueError, IndexError):
+        return None
+
+
+def read_source_period(scope, settle_time=COUNTER_SETTLE_TIME):
+    """
+    Trigger source period (seconds) from the scope's trigger frequency counter, None if it has no reading.  The
+    scope must be seeing the source's triggers (acquiring) while this runs.
+    """
+    try:
+        scope.write(TRIGGER_FREQUENCY_ON)
+        time.sleep(settle_time)
+        frequency = float(str(scope.query(TRIGGER_FREQUENCY_QUERY)).strip().split()[-1])
+    except Exception:       # VISA timeout / error, or an unreadable reply: no counter on this scope
+        return None
+    if not 0 < frequency < 1e30:        # 9.91E37 is Tek's "no value"
+        return None
+    return 1.0 / frequency
+
+
+class TriggerAccounting:
+    """
+    Args:
+        nominal_period: Known trigger source period (seconds) for the interval method; None = no interval method
+                        (aperiodic source), misses are then only counted while NUMACq keeps counting.
+    """
+    def __init__(self, nominal_period=None):
+        self.nominal_period = nominal_period
+        self.captured = 0
+        self.counted = 0        # captures whose misses were known
+        self.missed = 0
+        self.method = None
+        self._last_numacq = None
+        self._last_time = None
+        self._carry = 0.0
+
+    def update(self, numacq, trigger_time):
+        """
+        Accounts one captured trigger.
+
+        Args:
+            numacq: ACQuire:NUMACq? value read before re-arming (int or None).
+            trigger_time: Trigger time, seconds (time.perf_counter() or datetime.timestamp()).
+
+        Returns:
+            Number of triggers missed between the previous capture and this one, None if it cannot be known.
+        """
+        missed = None
+        if numacq is not None and self._last_numacq is not None and numacq > self._last_numacq:
+            missed = numacq - self._last_numacq - 1
+            self.method = "counter"
+        elif self.nominal_period and self._last_time is not None:
+            gap = trigger_time - self._last_time
+            if gap > 0:
+                uncounted = gap / self.nominal_period - 1 + self._carry
+                missed = max(0, round(uncounted))
+                self._carry = uncounted - missed
+                self.method = "interval"
+        self.captured += 1
+        if missed is not None:
+            self.counted += 1
+            self.missed += missed
+        self._last_numacq = numacq
+        self._last_time = trigger_time
+        return missed
+
+    def coverage(self):
+        """Fraction of the source's triggers captured, None if no misses could be counted."""
+        if not self.counted:
+            return None
+        return self.captured / (self.captured + self.missed)
+
+    def report(self):
+        if self.coverage() is None:
+            return f"Captured: {self.captured}, missed: n/a (no acquisition counter or nominal trigger period)"
+        return (f"Captured: {self.captured}, missed: {self.missed} ({self.method}), "
+                f"coverage: {self.coverage() * 100:.1f}%")
+
+
+def format_missed(missed):
+    """Missed column / console text: blank for unknown."""
+    return "" if missed is None else str(missed)
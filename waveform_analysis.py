@@ -0,0 +1,233 @@
+"""
+Waveform Analysis
+
+Description- Spectrum, THD+N and clipping analysis of amplifier output waveform captures, in a process pool.
+
+analyze() works on one record (volts, sample interval):
+    spectrum      Blackman-Harris windowed FFT (one-sided, bins in Vrms^2)
+    fundamental   largest spectral peak above DC, frequency refined by interpolation, and its Vrms
+    THD+N         everything in the band (default up to 20 kHz) except DC and the fundamental, relative to the
+                  fundamental (percent and dB); THD and H2..H5 from the harmonic bins only
+    clipping      crest factor, and the fraction of samples within 1% of the peak: a sine has about 9%, a
+                  flat-topped (clipped) one much more.  Raw codes at the digitizer rail flag a scope overrange
+                  (the record is clipped by the scope, not the amplifier).
+The record should hold at least ~10 cycles of the fundamental (a 1 kHz tone at 5 ms/div is 50).
+
+WaveformAnalyzer runs analyze_capture() on scope waveforms (Scope.fetch_waveform dicts) in a ProcessPoolExecutor,
+so the FFTs of long records never take CPU time from the acquisition thread, and appends one row per channel to the
+analysis log as each finishes:
+    Event_Count, Time, Channel, Fundamental_Hz, Fundamental_Vrms, Vrms, THD_N_Percent, THD_N_dB, THD_Percent,
+    H2_dB, H3_dB, H4_dB, H5_dB, Crest_Factor, Flat_Fraction, Clipped, Overrange
+Captures arriving while max_pending are still being analyzed are skipped (counted), so memory stays bounded.
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from event_context import waveform_volts
+
+ANALYSIS_FIELDS = ("Event_Count", "Time", "Channel", "Fundamental_Hz", "Fundamental_Vrms", "Vrms", "THD_N_Percent",
+                   "THD_N_dB", "THD_Percent", "H2_dB", "H3_dB", "H4_dB", "H5_dB", "Crest_Factor", "Flat_Fraction",
+                   "Clipped", "Overrange")
+DEFAULT_BANDWIDTH = 20000.0     # Hz, upper edge of the THD+N band (audio)
+MAINLOBE_BINS = 4               # Blackman-Harris main lobe half width, bins
+MAX_HARMONIC = 10               # harmonics summed for THD
+PEAK_LEVEL = 0.99               # samples at or above this fraction of the peak count as "at the peak"
+CLIP_FRACTION = 0.2             # flat fraction above which a record is flagged clipped (sine: 0.09)
+RAIL_CODE = 127 * 256           # 16 bit code of the top/bottom of an 8 bit digitizer's range
+RAIL_CODE_8BIT = 127            # the same in 1 byte (DATa:WIDth 1) transfers
+
+
+def blackman_harris(n):
+    """4-term Blackman-Harris window (periodic), -92 dB side lobes."""
+    k = np.arange(n) * (2 * np.pi / n)
+    return 0.35875 - 0.48829 * np.cos(k) + 0.14128 * np.cos(2 * k) - 0.01168 * np.cos(3 * k)
+
+
+def spectrum(volts, xincr):
+    """
+    One-sided power spectrum of a record.
+
+    Returns:
+        (frequencies in Hz, power per bin in Vrms^2; the bins of one tone add up to its Vrms^2)
+    """
+    volts = np.asarray(volts, dtype=np.float64)
+    window = blackman_harris(len(volts))
+    power = np.abs(np.fft.rfft((volts - volts.mean()) * window)) ** 2
+    power *= 2.0 / (len(volts) * np.dot(window, window))
+    power[0] /= 2.0
+    if len(volts) % 2 == 0:
+        power[-1] /= 2.0
+    return np.fft.rfftfreq(len(volts), xincr), power
+
+
+def _band_power(power, center, half_width=MAINLOBE_BINS):
+    return float(power[max(center - half_width, 0):center + half_width + 1].sum())
+
+
+def _db(ratio):
+    return 20 * np.log10(ratio) if ratio > 0 else -np.inf
+
+
+def analyze(volts, xincr, bandwidth=DEFAULT_BANDWIDTH, codes=None, rail=RAIL_CODE):
+    """
+    Fundamental, THD+N, harmonics and clipping of one record.
+
+    Args:
+        volts: Samples in volts.
+        xincr: Sample interval in seconds.
+        bandwidth: Upper edge of the THD+N band in Hz (None or above Nyquist = Nyquist).
+        codes: Raw digitizer codes of the record, to check for a scope overrange (optional).
+        rail: Code of the top/bottom of the digitizer range in codes.
+
+    Returns:
+        Dict with the ANALYSIS_FIELDS from Fundamental_Hz on.
+    """
+    volts = np.asarray(volts, dtype=np.float64)
+    freqs, power = spectrum(volts, xincr)
+    df = freqs[1]
+    top = len(power) - 1 if bandwidth is None else min(int(bandwidth / df), len(power) - 1)
+    first = MAINLOBE_BINS + 1       # above DC and its window leakage
+    if top <= first + MAINLOBE_BINS:
+        raise ValueError("Record too short for the analysis band")
+
+    peak = first + int(np.argmax(power[first:top + 1]))
+    if peak <= first:
+        raise ValueError("Fundamental too close to DC for this record length")
+    # Gaussian (log-parabolic) interpolation of the peak for the frequency
+    a, b, c = np.log(power[peak - 1:peak + 2] + 1e-300)
+    shift = 0.5 * (a - c) / (a - 2 * b + c) if (a - 2 * b + c) < 0 else 0.0
+    f0 = (peak + shift) * df
+    fundamental = _band_power(power, peak)
+
+    in_band = float(power[first:top + 1].sum())
+    noise = max(in_band - fundamental, 0.0)
+    harmonics = []
+    for h in range(2, MAX_HARMONIC + 1):
+        center = int(round(h * f0 / df))
+        harmonics.append(_band_power(power, center) if center + MAINLOBE_BINS <= top else 0.0)
+
+    ac = volts - volts.mean()
+    vrms = float(np.sqrt(np.mean(ac ** 2)))
+    peak_volts = float(np.abs(ac).max())
+    flat_fraction = float(np.count_nonzero(np.abs(ac) >= PEAK_LEVEL * peak_volts)) / len(ac) if peak_volts else 0.0
+    overrange = bool(np.any(np.abs(np.asarray(codes)) >= rail)) if codes is not None else False
+
+    ratio = np.sqrt(noise / fundamental) if fundamental > 0 else np.nan
+    return {
+        "Fundamental_Hz": f0,
+        "Fundamental_Vrms": float(np.sqrt(fundamental)),
+        "Vrms": vrms,
+        "THD_N_Percent": 100 * ratio,
+        "THD_N_dB": _db(ratio),
+        "THD_Percent": 100 * np.sqrt(sum(harmonics) / fundamental) if fundamental > 0 else np.nan,
+        **{f"H{h}_dB": _db(np.sqrt(harmonics[h - 2] / fundamental)) if fundamental > 0 else np.nan
+           for h in range(2, 6)},
+        "Crest_Factor": peak_volts / vrms if vrms else np.nan,
+        "Flat_Fraction": flat_fraction,
+        "Clipped": flat_fraction > CLIP_FRACTION,
+        "Overrange": overrange,
+    }
+
+
+def analyze_capture(waveform, bandwidth=DEFAULT_BANDWIDTH):
+    """analyze() of a raw scope waveform (dict from Scope.fetch_waveform).  Runs in the pool processes."""
+    _, volts = waveform_volts(waveform)
+    rail = RAIL_CODE_8BIT if waveform.get("width", 2) == 1 else RAIL_CODE
+    return analyze(volts, waveform["xincr"], bandwidth, codes=waveform["codes"], rail=rail)
+
+
+def format_analysis_row(count, timestamp, channel, result):
+    values = [str(count), timestamp.strftime('%Y-%m-%d %H:%M:%S.%f'), f"CH{channel}"]
+    for name in ANALYSIS_FIELDS[3:]:
+        value = result[name]
+        if isinstance(value, (bool, np.bool_)):
+            values.append("1" if value else "0")
+        elif np.isfinite(value):
+            values.append(f"{value:.4f}" if name.endswith("Percent") or name.startswith("Flat") else f"{value:.3f}")
+        else:
+            values.append("")
+    return ",".join(values)
+
+
+class WaveformAnalyzer:
+    """
+    Args:
+        path: Analysis log (CSV) to append to, created with its header if missing.
+        workers: Pool processes (None = one less than the CPU count, at least 1).
+        bandwidth: THD+N band upper edge, Hz.
+        max_pending: Captures in the pool at most; more are skipped.
+        on_result: Called in the parent with (count, timestamp, channel, result dict) as each analysis finishes.
+    """
+    def __init__(self, path, workers=None, bandwidth=DEFAULT_BANDWIDTH, max_pending=None, on_result=None):
+        self.path = path
+        self.bandwidth = bandwidth
+        self.on_result = on_result
+        workers = workers or max((os.cpu_count() or 2) - 1, 1)
+        self.max_pending = max_pending or 2 * workers
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        if not os.path.exists(path) or not os.path.getsize(path):
+            with open(path, "w") as f:
+                f.write(",".join(ANALYSIS_FIELDS) + "\n")
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+
+    def submit(self, count, timestamp, channel, waveform):
+        """
+        Queues one capture for analysis.  Returns False if it was skipped (pool busy).
+
+        Args:
+            count: Event_Count of the last event row logged before the capture.
+            timestamp: Datetime of the capture.
+            channel: Scope channel number.
+            waveform: Raw waveform dict (Scope.fetch_waveform).
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.skipped += 1
+                return False
+            self._pending += 1
+            self.submitted += 1
+        # int16 array pickles far faster than the list of codes from the VISA read
+        waveform = dict(waveform, codes=np.asarray(waveform["codes"], dtype=np.int16))
+        future = self._pool.submit(analyze_capture, waveform, self.bandwidth)
+        future.add_done_callback(lambda done: self._finished(done, count, timestamp, channel))
+        return True
+
+    def _finished(self, future, count, timestamp, channel):
+        """Pool callback (parent process): appends the result row."""
+        with self._lock:
+            self._pending -= 1
+            try:
+                result = future.result()
+            except Exception as e:
+                self.failed += 1
+                print(f"Waveform analysis of CH{channel} failed: {e}")
+                return
+            self.completed += 1
+            try:
+                with open(self.path, "a") as f:
+                    f.write(format_analysis_row(count, timestamp, channel, result) + "\n")
+            except IOError as e:
+                print(f"Error appending data to file '{self.path}': {e}")
+        if self.on_result is not None:
+            self.on_result(count, timestamp, channel, result)
+
+    def close(self):
+        """Waits for the captures in the pool and shuts it down."""
+        self._pool.shutdown(wait=True)
+
+    def report(self):
+        return (f"Waveform analyses: {self.completed} (failed {self.failed}, skipped while busy {self.skipped}) "
+                f"in {self.path}")
@@ -0,0 +1,244 @@
+"""
+Waveform Codec
+
+Description- Compressed on-disk store of raw scope waveform records, in independently decompressible chunks.
+
+Stored as CSV text a 100k point record is about 2 MB, and as raw codes still 200 kB, although neighbouring samples of
+a line or amplifier waveform differ by only a few codes.  Each record's codes are cut into chunks of chunk_points
+and every chunk is coded on its own:
+    delta       first difference of the codes (wrapping in the code type, so it is lossless), first sample kept,
+                zigzagged so small negative and positive deltas are small unsigned values (0, -1, 1, -2 -> 0, 1, 2, 3)
+    shuffle     low bytes of the chunk, then high bytes (2 byte codes), so the nearly constant high bytes form runs
+    zlib        level 1 (fast) general-purpose compression
+Delta helps high-res (12+ bit) and 1 byte records most, but an 8 bit record in a 2 byte transfer often compresses
+better without it (the deltas of its noise are busier than the codes), so each chunk uses delta only if a trial
+compression of its first TRIAL_POINTS says so; the chunk header records the choice.  Any sample range is read by
+decoding only the chunks it touches (WaveformReader.read(record, start, stop)).
+
+File layout (little-endian):
+    b"WFMZIP01", uint32 length, JSON {"schema", "version", "codec", "chunk_points"} padded to a multiple of 8 bytes
+    per record: b"WREC", uint32 length, JSON {"points", "dtype", "xincr", "xzero", "ymult", "yoff", "yzero", ... meta}
+                then per chunk: uint32 points, uint32 bytes, uint8 filter (FILTER_NONE / FILTER_DELTA), the chunk
+A run that dies leaves at most a partial last record, which the reader drops.  The reader finds the records and
+chunks by hopping over their headers, without decompressing anything.
+
+Example:
+    store = WaveformWriter("run_waveforms.wfz")
+    store.append(scope.fetch_waveform(1), channel=1, time=now.isoformat())
+    store.close()
+    reader = WaveformReader("run_waveforms.wfz")
+    waveform = reader.read(0, 5000, 6000)       # raw waveform dict of points 5000-5999, for waveform_volts()
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import json
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+STORE_MAGIC = b"WFMZIP01"
+RECORD_MAGIC = b"WREC"
+STORE_VERSION = 1
+CODEC = "delta-zigzag-shuffle-zlib"
+CHUNK_POINTS = 65536            # points per independently decompressible chunk
+COMPRESS_LEVEL = 1              # zlib level: 1 is several times faster than the default for a few % less ratio
+TRIAL_POINTS = 4096             # points of a chunk compressed both ways to pick its filter
+FILTER_NONE = 0
+FILTER_DELTA = 1
+PREAMBLE_KEYS = ("xincr", "xzero", "ymult", "yoff", "yzero")
+_CHUNK = struct.Struct("<IIB")
+_LENGTH = struct.Struct("<I")
+
+
+def _filtered(codes, delta):
+    """Shuffled bytes of little-endian signed codes, zigzagged deltas if delta."""
+    if delta:
+        diff = np.diff(codes, prepend=codes.dtype.type(0))          # wraps in the code type
+        codes = (diff << 1) ^ (diff >> (8 * codes.itemsize - 1))
+    return codes.view(np.uint8).reshape(-1, codes.itemsize).T.tobytes()
+
+
+def encode_chunk(codes, level=COMPRESS_LEVEL):
+    """(filter, compressed bytes) of one chunk of int8 or int16 codes."""
+    codes = np.ascontiguousarray(codes, dtype=np.asarray(codes).dtype.newbyteorder("<"))
+    trial = codes[:TRIAL_POINTS]
+    delta = len(zlib.compress(_filtered(trial, True), level)) < len(zlib.compress(_filtered(trial, False), level))
+    return (FILTER_DELTA if delta else FILTER_NONE), zlib.compress(_filtered(codes, delta), level)
+
+
+def decode_chunk(data, dtype, points, chunk_filter=FILTER_DELTA):
+    """Codes of one chunk from encode_chunk() bytes."""
+    signed = np.dtype(dtype).newbyteorder("<")
+    unsigned = np.dtype(f"<u{signed.itemsize}")
+    shuffled = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(signed.itemsize, points)
+    values = np.ascontiguousarray(shuffled.T).view(unsigned).ravel()
+    if chunk_filter == FILTER_NONE:
+        return values.view(signed)
+    delta = ((values >> 1) ^ (0 - (values & 1))).view(signed)
+    return np.cumsum(delta, dtype=signed)       # wraps back like the deltas
+
+
+def _pack_json(fields, prefix, align=1):
+    text = json.dumps(fields).encode("utf-8")
+    text += b" " * (-(len(prefix) + _LENGTH.size + len(text)) % align)
+    return prefix + _LENGTH.pack(len(text)) + text
+
+
+class WaveformWriter:
+    """
+    Appends raw waveform records to a compressed store.
+
+    Args:
+        path: Store file.  An existing store is appended to (with its own chunk size).
+        chunk_points: Points per chunk (random access granularity) for a new store.
+        level: zlib compression level.
+    """
+    def __init__(self, path, chunk_points=CHUNK_POINTS, level=COMPRESS_LEVEL):
+        self.path = path
+        self.level = level
+        self.records = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.encode_seconds = 0.0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            reader = WaveformReader(path)
+            self.chunk_points = reader.chunk_points
+            self.records = len(reader.records)
+            self._file = open(path, "r+b")
+            self._file.truncate(reader.end_offset)      # drop a partial last record
+            self._file.seek(reader.end_offset)
+        else:
+            self.chunk_points = int(chunk_points)
+            header = {"schema": "waveforms", "version": STORE_VERSION, "codec": CODEC,
+                      "chunk_points": self.chunk_points}
+            self._file = open(path, "wb")
+            self._file.write(_pack_json(header, STORE_MAGIC, align=8))
+            self._file.flush()
+
+    def append(self, waveform, **meta):
+        """
+        Appends one record.  Returns its index in the store.
+
+        Args:
+            waveform: Raw waveform dict (Scope.fetch_waveform, scope_sim.sim_waveform).
+            meta: Extra JSON-serializable fields kept with the record (e.g. channel, time, event count).
+        """
+        t_start = time.perf_counter()
+        codes = np.asarray(waveform["codes"])
+        if codes.dtype.kind != "i" or codes.dtype.itemsize > 2:
+            codes = codes.astype(np.int16)      # e.g. the list of a VISA read
+        fields = {"points": int(codes.size), "dtype": codes.dtype.newbyteorder("<").str}
+        fields.update({key: float(waveform[key]) for key in PREAMBLE_KEYS})
+        fields.update(meta)
+        parts = [_pack_json(fields, RECORD_MAGIC)]
+        for first in range(0, codes.size, self.chunk_points):
+            chunk = codes[first:first + self.chunk_points]
+            chunk_filter, data = encode_chunk(chunk, self.level)
+            parts.append(_CHUNK.pack(chunk.size, len(data), chunk_filter))
+            parts.append(data)
+        blob = b"".join(parts)
+        self.encode_seconds += time.perf_counter() - t_start
+        self._file.write(blob)          # one write per record, so a crash leaves at most that record partial
+        self._file.flush()
+        self.raw_bytes += codes.nbytes
+        self.stored_bytes += len(blob)
+        self.records += 1
+        return self.records - 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def report(self):
+        ratio = self.raw_bytes / self.stored_bytes if self.stored_bytes else 0.0
+        rate = self.raw_bytes / self.encode_seconds / 1e6 if self.encode_seconds else 0.0
+        return (f"Waveform store: {self.records} records, {self.stored_bytes / 1e6:.2f} MB "
+                f"({ratio:.1f}x smaller than raw codes, encoded at {rate:.0f} MB/s) in {self.path}")
+
+
+class WaveformReader:
+    """
+    Random access to the records of a store.
+
+    Attributes:
+        records: One dict per record: the record's fields plus "chunks", a list of (first point, points, offset,
+            bytes, filter) of its compressed chunks.
+        chunk_points: Points per chunk of the store.
+        end_offset: End of the last complete record.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            preamble = f.read(len(STORE_MAGIC) + _LENGTH.size)
+            if len(preamble) < len(STORE_MAGIC) + _LENGTH.size or preamble[:len(STORE_MAGIC)] != STORE_MAGIC:
+                raise ValueError("Not a waveform store")
+            length, = _LENGTH.unpack(preamble[len(STORE_MAGIC):])
+            self.header = json.loads(f.read(length).decode("utf-8"))
+            self.chunk_points = self.header["chunk_points"]
+            self.end_offset = f.tell()
+            while True:
+                record = self._scan_record(f, size)
+                if record is None:
+                    break
+                self.records.append(record)
+                self.end_offset = f.tell()
+
+    @staticmethod
+    def _scan_record(f, size):
+        """Next record's fields and chunk index, or None at the end of the file / a partial record."""
+        preamble = f.read(len(RECORD_MAGIC) + _LENGTH.size)
+        if len(preamble) < len(RECORD_MAGIC) + _LENGTH.size or preamble[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+            return None
+        length, = _LENGTH.unpack(preamble[len(RECORD_MAGIC):])
+        text = f.read(length)
+        if len(text) < length:
+            return None
+        record = json.loads(text.decode("utf-8"))
+        record["chunks"] = []
+        first = 0
+        while first < record["points"]:
+            head = f.read(_CHUNK.size)
+            if len(head) < _CHUNK.size:
+                return None
+            points, nbytes, chunk_filter = _CHUNK.unpack(head)
+            offset = f.tell()
+            if offset + nbytes > size:
+                return None
+            record["chunks"].append((first, points, offset, nbytes, chunk_filter))
+            f.seek(nbytes, os.SEEK_CUR)
+            first += points
+        return record
+
+    def __len__(self):
+        return len(self.records)
+
+    def read(self, index, start=0, stop=None):
+        """
+        Points start..stop - 1 of a record, decoding only the chunks they are in.
+
+        Returns:
+            Raw waveform dict (codes, preamble with xzero of the first returned point, record fields).
+        """
+        record = self.records[index]
+        stop = record["points"] if stop is None else min(stop, record["points"])
+        start = max(0, min(start, stop))
+        pieces = []
+        with open(self.path, "rb") as f:
+            for first, points, offset, nbytes, chunk_filter in record["chunks"]:
+                if first + points <= start or first >= stop:
+                    continue
+                f.seek(offset)
+                codes = decode_chunk(f.read(nbytes), record["dtype"], points, chunk_filter)
+                pieces.append(codes[max(start - first, 0):stop - first])
+        waveform = {key: value for key, value in record.items() if key not in ("chunks", "points", "dtype")}
+        waveform["codes"] = np.concatenate(pieces) if pieces else np.empty(0, dtype=record["dtype"])
+        waveform["xzero"] = record["xzero"] + start * record["xincr"]
+        return waveform
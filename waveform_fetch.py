@@ -0,0 +1,159 @@
+"""
+Waveform Fetch
+
+Description- Tek CURVe? transfers sized to what the analysis needs (record window, 1 or 2 byte points).
+
+A whole record at 2 bytes per point is 20 kB to 20 MB over the LAN, while the per-cycle RMS check is fine with
+8 bit points and THD+N/power need only ten cycles.  A WaveformRequest says what the analysis needs:
+    cycles              line cycles (None = the whole record)
+    samples_per_cycle   minimum sample density (the record's must be at least this)
+    bits                vertical resolution (8 or less -> DATa:WIDth 1, else 2)
+    align               where the window sits: "trigger" (from the trigger on), "start", "end" or "center"
+and plan_window() turns it into DATa:STARt/STOP and DATa:WIDth for the record at hand (one compound query for the
+record length and preamble), so only those points are sent.  CURVe? has no point stride on these scopes, so the
+sample density cannot be cut on the wire: the report gives how oversampled the fetches were, i.e. how far the
+record length could come down for them.
+
+FetchStats counts bytes sent against the whole 2 byte record and estimates the time saved from the measured
+transfer rate of each fetch.
+
+Example:
+    waveform = fetch_waveform(scope.instr, 1, WaveformRequest(cycles=3, samples_per_cycle=20, bits=8), stats)
+    print(stats.report())
+
+Author: C. Wong
+v0.1
+Last Modified: 20261019
+"""
+
+import math
+import time
+
+import numpy as np
+
+LINE_FREQUENCY = 60.0           # Hz
+BLOCK_HEADER = 10               # approximate bytes of the #<n><length> block header and terminator
+ALIGNMENTS = ("trigger", "start", "end", "center")
+
+
+class WaveformRequest:
+    """
+    What an analysis needs from a record.  Defaults = the whole record at full resolution.
+    """
+    def __init__(self, cycles=None, samples_per_cycle=None, bits=16, align="trigger", line_frequency=LINE_FREQUENCY):
+        if align not in ALIGNMENTS:
+            raise ValueError(f"align must be one of {ALIGNMENTS}")
+        self.cycles = cycles
+        self.samples_per_cycle = samples_per_cycle
+        self.bits = bits
+        self.align = align
+        self.line_frequency = line_frequency
+
+    @property
+    def width(self):
+        return 1 if self.bits <= 8 else 2
+
+
+FULL_RECORD = WaveformRequest()
+
+
+def plan_window(request, record_length, xincr, xzero):
+    """
+    DATa:STARt / STOP (1-based, inclusive) for a request.
+
+    Args:
+        request: WaveformRequest.
+        record_length: Points in the record.
+        xincr: Sample interval, seconds.
+        xzero: Time of the first record point relative to the trigger, seconds.
+
+    Returns:
+        (start, stop, oversampling): oversampling is the record's samples per cycle over the requested density
+        (below 1 = the record is too coarse for the request; NaN if no density was requested).
+    """
+    record_length = int(record_length)
+    samples_per_cycle = 1.0 / (xincr * request.line_frequency)
+    oversampling = samples_per_cycle / request.samples_per_cycle if request.samples_per_cycle else math.nan
+    if request.cycles is None:
+        return 1, record_length, oversampling
+    points = min(record_length, max(2, int(math.ceil(request.cycles * samples_per_cycle)) + 1))
+    if request.align == "start":
+        first = 0
+    elif request.align == "end":
+        first = record_length - points
+    elif request.align == "center":
+        first = (record_length - points) // 2
+    else:
+        first = int(round(-xzero / xincr))         # trigger point
+    first = min(max(first, 0), record_length - points)
+    return first + 1, first + points, oversampling
+
+
+class FetchStats:
+    """Bytes and time of the fetches against whole 2 byte records."""
+    def __init__(self):
+        self.fetches = 0
+        self.bytes = 0
+        self.full_bytes = 0
+        self.seconds = 0.0
+        self.saved_seconds = 0.0
+        self.oversampling = []
+
+    def add(self, transferred, full, seconds, oversampling=math.nan):
+        self.fetches += 1
+        self.bytes += transferred
+        self.full_bytes += full
+        self.seconds += seconds
+        if transferred and seconds > 0:
+            self.saved_seconds += (full - transferred) * seconds / transferred
+        if math.isfinite(oversampling):
+            self.oversampling.append(oversampling)
+
+    def report(self):
+        if not self.fetches:
+            return "Waveform fetches: none"
+        saved = 100 * (1 - self.bytes / self.full_bytes) if self.full_bytes else 0.0
+        line = (f"Waveform fetches: {self.fetches}, {self.bytes / 1e6:.2f} MB sent of {self.full_bytes / 1e6:.2f} MB "
+                f"whole records ({saved:.0f}% saved), {self.seconds:.3f} s transferring, "
+                f"about {self.saved_seconds:.3f} s saved")
+        if self.oversampling:
+            line += f", records {min(self.oversampling):.1f}x oversampled for the requested densities"
+        return line
+
+
+def fetch_waveform(instr, channel, request=FULL_RECORD, stats=None):
+    """
+    Fetches the part of a channel's record a request needs.
+
+    Args:
+        instr: Tek VISA session (TimedSession or pyvisa resource).
+        channel: Scope channel number.
+        request: WaveformRequest.
+        stats: FetchStats to add this fetch to (optional).
+
+    Returns:
+        Raw waveform dict (codes, xincr, xzero of the first fetched point, ymult, yoff, yzero, width, start, stop,
+        record_length) as used by event_context.waveform_volts.  Raises pyvisa errors / ValueError like any query.
+    """
+    width = request.width
+    instr.write(f":DATa:SOUrce CH{channel};:DATa:ENCdg RIBinary;:DATa:WIDth {width};:DATa:STARt 1")
+    keys = ["record_length", "xincr", "xzero", "ymult", "yoff", "yzero"]
+    replies = instr.query_many([":HORizontal:RECOrdlength?", ":WFMOutpre:XINcr?", ":WFMOutpre:XZEro?",
+                                ":WFMOutpre:YMUlt?", ":WFMOutpre:YOFf?", ":WFMOutpre:YZEro?"], compound=True)
+    for reply in replies:
+        if isinstance(reply, Exception):
+            raise reply
+    waveform = {key: float(str(reply).strip().split()[-1]) for key, reply in zip(keys, replies)}
+    record_length = int(waveform.pop("record_length"))
+    start, stop, oversampling = plan_window(request, record_length, waveform["xincr"], waveform["xzero"])
+
+    instr.write(f":DATa:STARt {start};:DATa:STOP {stop}")
+    t_start = time.perf_counter()
+    codes = instr.query_binary_values(":CURVe?", datatype='b' if width == 1 else 'h', is_big_endian=True,
+                                      container=np.array)
+    seconds = time.perf_counter() - t_start
+    waveform.update(codes=codes, width=width, start=start, stop=stop, record_length=record_length)
+    waveform["xzero"] += (start - 1) * waveform["xincr"]      # time of the first fetched point
+    if stats is not None:
+        stats.add(len(codes) * width + BLOCK_HEADER, record_length * 2 + BLOCK_HEADER, seconds, oversampling)
+    return waveform